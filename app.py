@@ -1,7 +1,7 @@
 import os
 import logging
 from flask import Flask, send_from_directory
-from database import db, migrate
+from database import db, init_migrate
 from config import config
 
 def create_app(config_name=None):
@@ -22,11 +22,21 @@ def create_app(config_name=None):
         app.logger.info('Application started')
 
     # Initialize extensions
+    # (métriques avant la base : le pool de connexions mesure l'attente d'une connexion)
+    from services.metrics import metrics_exporter
+    metrics_exporter.init_app(app)
     db.init_app(app)
-    migrate.init_app(app, db)
+
+    # Temps par requête (SQL, appels sortants) : en-tête Server-Timing et logs JSON
+    from services.timing import request_timing
+    request_timing.init_app(app)
+
+    # Flask-Migrate (alembic) seulement pour la CLI `flask db ...`
+    if os.environ.get('FLASK_RUN_FROM_CLI') == 'true':
+        init_migrate(app)
 
     # Import models
-    from models import prestations, commandes, paires
+    from models import prestations, commandes, paires, outbox, stripe_events
 
     # Register blueprints
     from routes.main import main_bp
@@ -35,6 +45,14 @@ def create_app(config_name=None):
     app.register_blueprint(main_bp)
     app.register_blueprint(api_bp, url_prefix='/api')
 
+    # Envoi des emails en arrière-plan (table email_outbox)
+    from services.outbox import email_outbox
+    email_outbox.init_app(app)
+
+    # Événements Stripe reçus par le webhook, appliqués en arrière-plan
+    from services.stripe_events import stripe_event_processor
+    stripe_event_processor.init_app(app)
+
     # Note: Plus de stockage local - toutes les photos sont sur Google Cloud Storage
 
     return app
@@ -17,6 +17,7 @@ class Config:
         'pool_pre_ping': True,  # Validate connections before use
         'pool_recycle': 300,    # Recycle connections every 5 minutes
         'pool_timeout': 20,     # Timeout when getting connection from pool
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),  # Sized by gunicorn.conf.py
         'max_overflow': 0,      # Don't allow overflow connections
     }
 
@@ -1,5 +1,11 @@
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 
 db = SQLAlchemy()
-migrate = Migrate()
\ No newline at end of file
+
+def init_migrate(app):
+    """Register Flask-Migrate and the `flask db` commands.
+
+    Alembic is only imported here: the web workers never need it.
+    """
+    from flask_migrate import Migrate
+    return Migrate(app, db)
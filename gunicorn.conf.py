@@ -0,0 +1,69 @@
+# Configuration gunicorn, chargée automatiquement depuis le répertoire de travail
+# (scripts/entrypoint.sh lance simplement `gunicorn app:app`)
+
+import os
+import shutil
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8080)}"
+
+# Modèle de workers :
+# - gthread (défaut) : chaque worker sert `threads` requêtes à la fois, un appel
+#   lent à Stripe, GCS ou SMTP ne bloque plus tout le worker ;
+# - gevent : greenlets, `worker_connections` requêtes par worker (nécessite les
+#   paquets gevent et psycogreen, non installés par défaut) ;
+# - sync : une requête par worker, comportement historique.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+# 2 x 12 threads : les 25 connexions admises par Fly.io ([services.concurrency])
+# sont servies sans attendre dans la file d'accept
+threads = int(os.environ.get('GUNICORN_THREADS', 12))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 50))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+
+if worker_class == 'sync':
+    # gunicorn passe en gthread dès que threads > 1
+    threads = 1
+
+# Requêtes simultanées par worker
+if worker_class == 'gevent':
+    concurrency = worker_connections
+else:
+    concurrency = threads
+
+# Pool SQLAlchemy de chaque worker (max_overflow = 0, voir config.py) : une
+# connexion par requête simultanée, plus une pour chacun des deux threads
+# d'arrière-plan (envoi des emails, traitement des événements Stripe).
+# Plafonné par DB_POOL_MAX pour rester sous max_connections de PostgreSQL
+# (workers x DB_POOL_SIZE connexions au total) ; au-delà, les requêtes
+# attendent une connexion libre (pool_timeout).
+os.environ.setdefault('DB_POOL_SIZE', str(min(concurrency, int(os.environ.get('DB_POOL_MAX', 20))) + 2))
+
+# Métriques Prometheus partagées entre workers : chaque processus écrit ses
+# valeurs dans ce répertoire, /metrics les agrège (doit être défini avant que
+# les workers importent prometheus_client)
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus-metrics')
+
+def on_starting(server):
+    # Repartir de zéro à chaque démarrage : les fichiers d'anciens workers fausseraient les totaux
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        # psycopg2 bloque la boucle gevent sans ce patch
+        try:
+            from psycogreen.gevent import patch_psycopg
+            patch_psycopg()
+        except ImportError:
+            server.log.warning("psycogreen absent : les requêtes SQL bloquent le worker gevent")
+
+    # Construire le client Google Cloud Storage dans chaque worker dès son
+    # démarrage (jeton OAuth et connexion TLS préparés en arrière-plan)
+    # plutôt qu'à la première photo envoyée après un réveil de la machine
+    from services.storage import gcs_manager
+    gcs_manager.preload()
@@ -0,0 +1,74 @@
+"""Align with the schema created by db.create_all()
+
+Revision ID: 002b
+Revises: 002
+Create Date: 2026-10-18 16:00:00.000000
+
+Until migrations ran at startup, the tables were created by db.create_all()
+from the models, which had diverged from 001. This revision turns a 001/002
+schema into that one, so that a new database and a database created by
+create_all (stamped 002b, see deploy-production.md) share the same history.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002b'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Statuts du modèle StatutCommande
+    op.execute("ALTER TYPE statutcommande RENAME TO statutcommande_001")
+    op.execute("CREATE TYPE statutcommande AS ENUM ('PENDING', 'PAID', 'PROCESSING', 'COMPLETED', 'CANCELLED')")
+    op.execute("ALTER TABLE commandes ALTER COLUMN statut TYPE statutcommande USING statut::text::statutcommande")
+    op.execute("DROP TYPE statutcommande_001")
+
+    # Commande : entreprise au lieu du numéro, du prénom et de l'adresse ;
+    # stripe_session_id n'existait pas dans le modèle (ajouté par 008)
+    op.drop_column('commandes', 'numero_commande')
+    op.drop_column('commandes', 'prenom')
+    op.drop_column('commandes', 'adresse')
+    op.drop_column('commandes', 'stripe_session_id')
+    op.add_column('commandes', sa.Column('entreprise', sa.String(length=100), nullable=False, server_default=''))
+    op.alter_column('commandes', 'entreprise', server_default=None)
+    op.alter_column('commandes', 'email', type_=sa.String(length=120))
+    op.alter_column('commandes', 'telephone', nullable=False)
+    op.alter_column('commandes', 'total', nullable=False)
+    op.alter_column('commandes', 'updated_at', nullable=False)
+
+    # Paire : nom du fichier photo, description et ordre au lieu des commentaires
+    op.drop_column('paires', 'commentaires')
+    op.add_column('paires', sa.Column('photo_filename', sa.String(length=200), nullable=True))
+    op.add_column('paires', sa.Column('description', sa.Text(), nullable=True))
+    op.add_column('paires', sa.Column('ordre', sa.Integer(), nullable=False, server_default='1'))
+    op.alter_column('paires', 'ordre', server_default=None)
+
+
+def downgrade():
+    op.drop_column('paires', 'ordre')
+    op.drop_column('paires', 'description')
+    op.drop_column('paires', 'photo_filename')
+    op.add_column('paires', sa.Column('commentaires', sa.Text(), nullable=True))
+
+    op.alter_column('commandes', 'updated_at', nullable=True)
+    op.alter_column('commandes', 'total', nullable=True)
+    op.alter_column('commandes', 'telephone', nullable=True)
+    op.alter_column('commandes', 'email', type_=sa.String(length=150))
+    op.drop_column('commandes', 'entreprise')
+    op.add_column('commandes', sa.Column('stripe_session_id', sa.String(length=200), nullable=True))
+    op.add_column('commandes', sa.Column('adresse', sa.Text(), nullable=True))
+    op.add_column('commandes', sa.Column('prenom', sa.String(length=100), nullable=False, server_default=''))
+    op.alter_column('commandes', 'prenom', server_default=None)
+    op.add_column('commandes', sa.Column('numero_commande', sa.String(length=50), nullable=True))
+    op.execute("UPDATE commandes SET numero_commande = id::text")
+    op.alter_column('commandes', 'numero_commande', nullable=False)
+    op.create_unique_constraint('commandes_numero_commande_key', 'commandes', ['numero_commande'])
+
+    op.execute("ALTER TYPE statutcommande RENAME TO statutcommande_002b")
+    op.execute("CREATE TYPE statutcommande AS ENUM ('PENDING', 'PAID', 'IN_PROGRESS', 'READY', 'DELIVERED', 'CANCELLED')")
+    op.execute("ALTER TABLE commandes ALTER COLUMN statut TYPE statutcommande USING statut::text::statutcommande")
+    op.execute("DROP TYPE statutcommande_002b")
@@ -0,0 +1,43 @@
+"""Add email outbox table
+
+Revision ID: 003
+Revises: 002b
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create email_outbox table (emails envoyés en arrière-plan)
+    op.create_table('email_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('type_email', sa.Enum('ORDER_CONFIRMATION', 'ADMIN_NOTIFICATION', 'PAYMENT_FAILED', name='typeemail'), nullable=False),
+        sa.Column('commande_id', sa.Integer(), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=True),
+        sa.Column('statut', sa.Enum('PENDING', 'SENT', 'FAILED', name='statutemail'), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['commande_id'], ['commandes.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_email_outbox_statut', 'email_outbox', ['statut'])
+    op.create_index('ix_email_outbox_next_attempt_at', 'email_outbox', ['next_attempt_at'])
+
+
+def downgrade():
+    op.drop_index('ix_email_outbox_next_attempt_at', table_name='email_outbox')
+    op.drop_index('ix_email_outbox_statut', table_name='email_outbox')
+    op.drop_table('email_outbox')
+    op.execute('DROP TYPE statutemail')
+    op.execute('DROP TYPE typeemail')
\ No newline at end of file
@@ -0,0 +1,28 @@
+"""Add photo derivative URLs to paires
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18 10:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Thumbnail, medium and WebP versions of the pair photo
+    op.add_column('paires', sa.Column('photo_thumb_url', sa.String(length=500), nullable=True))
+    op.add_column('paires', sa.Column('photo_medium_url', sa.String(length=500), nullable=True))
+    op.add_column('paires', sa.Column('photo_webp_url', sa.String(length=500), nullable=True))
+
+
+def downgrade():
+    op.drop_column('paires', 'photo_webp_url')
+    op.drop_column('paires', 'photo_medium_url')
+    op.drop_column('paires', 'photo_thumb_url')
@@ -0,0 +1,24 @@
+"""Index paires.photo_gcs_path
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Photos are content-addressed and may be shared: reference lookups by path
+    op.create_index('ix_paires_photo_gcs_path', 'paires', ['photo_gcs_path'])
+
+
+def downgrade():
+    op.drop_index('ix_paires_photo_gcs_path', table_name='paires')
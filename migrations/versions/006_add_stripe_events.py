@@ -0,0 +1,34 @@
+"""Add stripe_events ledger
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Événements Stripe déjà traités (déduplication des webhooks)
+    op.create_table('stripe_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event_id', sa.String(length=255), nullable=False),
+        sa.Column('type', sa.String(length=100), nullable=False),
+        sa.Column('commande_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('event_id', name='uq_stripe_events_event_id')
+    )
+    op.create_index('ix_stripe_events_commande_id', 'stripe_events', ['commande_id'])
+
+
+def downgrade():
+    op.drop_index('ix_stripe_events_commande_id', table_name='stripe_events')
+    op.drop_table('stripe_events')
@@ -0,0 +1,46 @@
+"""Store Stripe event payloads for background processing
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    statut = sa.Enum('PENDING', 'PROCESSED', 'FAILED', name='statutevenement')
+    statut.create(op.get_bind())
+
+    # Événement brut, traité en arrière-plan après l'accusé de réception du webhook
+    # (les événements déjà présents ont été traités dans le webhook : PROCESSED)
+    op.add_column('stripe_events', sa.Column('payload', sa.JSON(), nullable=True))
+    op.add_column('stripe_events', sa.Column('statut', statut, nullable=False, server_default='PROCESSED'))
+    op.add_column('stripe_events', sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('stripe_events', sa.Column('next_attempt_at', sa.DateTime(), nullable=False, server_default=sa.func.now()))
+    op.add_column('stripe_events', sa.Column('last_error', sa.Text(), nullable=True))
+    op.add_column('stripe_events', sa.Column('processed_at', sa.DateTime(), nullable=True))
+    op.alter_column('stripe_events', 'statut', server_default=None)
+    op.alter_column('stripe_events', 'attempts', server_default=None)
+    op.alter_column('stripe_events', 'next_attempt_at', server_default=None)
+    op.create_index('ix_stripe_events_statut', 'stripe_events', ['statut'])
+    op.create_index('ix_stripe_events_next_attempt_at', 'stripe_events', ['next_attempt_at'])
+
+
+def downgrade():
+    op.drop_index('ix_stripe_events_next_attempt_at', table_name='stripe_events')
+    op.drop_index('ix_stripe_events_statut', table_name='stripe_events')
+    op.drop_column('stripe_events', 'processed_at')
+    op.drop_column('stripe_events', 'last_error')
+    op.drop_column('stripe_events', 'next_attempt_at')
+    op.drop_column('stripe_events', 'attempts')
+    op.drop_column('stripe_events', 'statut')
+    op.drop_column('stripe_events', 'payload')
+    op.execute('DROP TYPE statutevenement')
@@ -0,0 +1,28 @@
+"""Add and index commandes.stripe_session_id
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Absente des bases créées par db.create_all() avec l'ancien modèle Commande,
+    # présente sur celles créées par 001
+    op.execute('ALTER TABLE commandes ADD COLUMN IF NOT EXISTS stripe_session_id VARCHAR(200)')
+    # La page de retour /checkout retrouve la commande par sa session Stripe
+    op.create_index('ix_commandes_stripe_session_id', 'commandes', ['stripe_session_id'])
+
+
+def downgrade():
+    op.drop_index('ix_commandes_stripe_session_id', table_name='commandes')
+    op.drop_column('commandes', 'stripe_session_id')
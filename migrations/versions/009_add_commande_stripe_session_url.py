@@ -0,0 +1,26 @@
+"""Store the Stripe Checkout session URL and expiry on commandes
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Session Stripe réutilisée tant qu'elle est ouverte (double clic, retour arrière)
+    op.add_column('commandes', sa.Column('stripe_session_url', sa.Text(), nullable=True))
+    op.add_column('commandes', sa.Column('stripe_session_expires_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('commandes', 'stripe_session_expires_at')
+    op.drop_column('commandes', 'stripe_session_url')
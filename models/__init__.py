@@ -1,5 +1,7 @@
 from .prestations import Prestation
 from .commandes import Commande
 from .paires import Paire, PairePrestation
+from .outbox import EmailOutbox
+from .stripe_events import StripeEvent
 
-__all__ = ['Prestation', 'Commande', 'Paire', 'PairePrestation']
\ No newline at end of file
+__all__ = ['Prestation', 'Commande', 'Paire', 'PairePrestation', 'EmailOutbox', 'StripeEvent']
\ No newline at end of file
@@ -1,6 +1,8 @@
 from database import db
 from datetime import datetime
 from enum import Enum
+from sqlalchemy.orm import selectinload
+from .paires import Paire, PairePrestation
 
 class StatutCommande(Enum):
     PENDING = 'pending'
@@ -19,6 +21,9 @@ class Commande(db.Model):
     entreprise = db.Column(db.String(100), nullable=False)
     statut = db.Column(db.Enum(StatutCommande), default=StatutCommande.PENDING, nullable=False)
     total = db.Column(db.Numeric(10, 2), nullable=False)
+    stripe_session_id = db.Column(db.String(200), index=True)
+    stripe_session_url = db.Column(db.Text)
+    stripe_session_expires_at = db.Column(db.DateTime)
     stripe_payment_intent_id = db.Column(db.String(200))
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -29,6 +34,24 @@ class Commande(db.Model):
     def __repr__(self):
         return f'<Commande #{self.id} - {self.nom} - {self.statut.value}>'
 
+    @classmethod
+    def full_order_graph(cls):
+        """Loader options for the full order graph (paires -> paire_prestations -> prestation).
+
+        Loads any number of paires in 3 statements instead of the lazy N+1
+        triggered by to_dict(), calculate_total() and the email builders.
+        """
+        return (
+            selectinload(cls.paires)
+            .selectinload(Paire.paire_prestations)
+            .joinedload(PairePrestation.prestation),
+        )
+
+    @classmethod
+    def get_full_order(cls, commande_id):
+        """Load a commande with its full order graph, or None"""
+        return cls.query.options(*cls.full_order_graph()).filter_by(id=commande_id).first()
+
     def calculate_total(self):
         total = 0
         for paire in self.paires:
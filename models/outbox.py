@@ -0,0 +1,33 @@
+from database import db
+from datetime import datetime
+from enum import Enum
+
+class StatutEmail(Enum):
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+class TypeEmail(Enum):
+    ORDER_CONFIRMATION = 'order_confirmation'
+    ADMIN_NOTIFICATION = 'admin_notification'
+    PAYMENT_FAILED = 'payment_failed'
+
+class EmailOutbox(db.Model):
+    __tablename__ = 'email_outbox'
+
+    id = db.Column(db.Integer, primary_key=True)
+    type_email = db.Column(db.Enum(TypeEmail), nullable=False)
+    commande_id = db.Column(db.Integer, db.ForeignKey('commandes.id'), nullable=False)
+    payload = db.Column(db.JSON)
+    statut = db.Column(db.Enum(StatutEmail), default=StatutEmail.PENDING, nullable=False, index=True)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = db.Column(db.DateTime)
+
+    # Relationships
+    commande = db.relationship('Commande')
+
+    def __repr__(self):
+        return f'<EmailOutbox #{self.id} - {self.type_email.value} - Commande #{self.commande_id} - {self.statut.value}>'
@@ -9,8 +9,11 @@ class Paire(db.Model):
     commande_id = db.Column(db.Integer, db.ForeignKey('commandes.id'), nullable=False)
     type_chaussure = db.Column(db.Enum(TypeChaussure), nullable=False)
     photo_url = db.Column(db.String(500))
-    photo_gcs_path = db.Column(db.String(500))
+    photo_gcs_path = db.Column(db.String(500), index=True)
     photo_filename = db.Column(db.String(200))
+    photo_thumb_url = db.Column(db.String(500))
+    photo_medium_url = db.Column(db.String(500))
+    photo_webp_url = db.Column(db.String(500))
     description = db.Column(db.Text)
     ordre = db.Column(db.Integer, nullable=False, default=1)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -32,6 +35,9 @@ class Paire(db.Model):
             'type_chaussure': self.type_chaussure.value,
             'photo_url': self.photo_url,
             'photo_filename': self.photo_filename,
+            'photo_thumb_url': self.photo_thumb_url,
+            'photo_medium_url': self.photo_medium_url,
+            'photo_webp_url': self.photo_webp_url,
             'description': self.description,
             'ordre': self.ordre,
             'created_at': self.created_at.isoformat(),
@@ -0,0 +1,32 @@
+from database import db
+from datetime import datetime
+from enum import Enum
+
+class StatutEvenement(Enum):
+    PENDING = 'pending'
+    PROCESSED = 'processed'
+    FAILED = 'failed'
+
+class StripeEvent(db.Model):
+    """Stripe webhook events, stored on receipt and applied in the background.
+
+    The unique event_id makes duplicate deliveries and Stripe retries fail
+    on insert, so each event is stored once; the raw payload is kept so an
+    event can be processed again (services/stripe_events.py).
+    """
+    __tablename__ = 'stripe_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.String(255), nullable=False, unique=True)
+    type = db.Column(db.String(100), nullable=False)
+    commande_id = db.Column(db.Integer, index=True)
+    payload = db.Column(db.JSON)
+    statut = db.Column(db.Enum(StatutEvenement), default=StatutEvenement.PENDING, nullable=False, index=True)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    processed_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<StripeEvent {self.event_id} - {self.type} - {self.statut.value}>'
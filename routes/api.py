@@ -1,17 +1,18 @@
-from flask import Blueprint, request, jsonify, current_app
-from werkzeug.utils import secure_filename
+from flask import Blueprint, request, jsonify, current_app, abort
+from werkzeug.exceptions import RequestEntityTooLarge
 from models.prestations import Prestation
 from models.enums import TypeChaussure
 from models.commandes import Commande, StatutCommande
 from models.paires import Paire, PairePrestation
 from services.storage import gcs_manager
-from services.email import email_manager
+from services.images import image_pool, ImagePoolBusy, DERIVATIVES
+from services.derivatives import derivative_builder
+from services.catalog import prestation_catalog
+from services.checkout import stripe_checkout
+from services.timing import request_timing
+from services.metrics import metrics_exporter, UPLOAD_BYTES, PHOTOS_UPLOADED, ORDERS_CREATED
 from database import db
-import stripe
-import os
 import uuid
-from PIL import Image
-import io
 import base64
 
 api_bp = Blueprint('api', __name__)
@@ -20,10 +21,9 @@ api_bp = Blueprint('api', __name__)
 def get_prestations():
     """Récupérer toutes les prestations actives"""
     try:
-        prestations = Prestation.query.filter_by(actif=True).all()
         return jsonify({
             'success': True,
-            'prestations': [p.to_dict() for p in prestations]
+            'prestations': prestation_catalog.get_prestations()
         })
     except ValueError as e:
         return jsonify({'success': False, 'error': str(e)}), 400
@@ -44,14 +44,9 @@ def get_prestations_by_type(type_chaussure):
         else:
             return jsonify({'success': False, 'error': 'Type de chaussure invalide'}), 400
 
-        prestations = Prestation.query.filter_by(
-            type_chaussure=type_enum,
-            actif=True
-        ).all()
-
         return jsonify({
             'success': True,
-            'prestations': [p.to_dict() for p in prestations]
+            'prestations': prestation_catalog.get_prestations(type_enum)
         })
     except ValueError as e:
         return jsonify({'success': False, 'error': str(e)}), 400
@@ -59,39 +54,68 @@ def get_prestations_by_type(type_chaussure):
         current_app.logger.error(f'Erreur dans get_prestations_by_type: {str(e)}')
         return jsonify({'success': False, 'error': 'Erreur serveur'}), 500
 
+def _read_upload_stream(stream, max_size, chunk_size=64 * 1024):
+    """Lire un flux d'upload par morceaux en s'arrêtant dès que max_size est dépassé"""
+    chunks = []
+    size = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_size:
+            raise RequestEntityTooLarge()
+        chunks.append(chunk)
+    return b''.join(chunks)
+
 @api_bp.route('/upload-photo', methods=['POST'])
 def upload_photo():
-    """Upload d'une photo pour une paire de chaussures"""
+    """Upload d'une photo pour une paire de chaussures.
+
+    Accepte le corps binaire brut (Content-Type image/*, envoyé depuis
+    canvas.toBlob), un formulaire multipart (champ `photo`) ou l'ancien
+    format JSON avec la photo en base64.
+    """
     try:
-        # Récupérer les données de la photo (base64)
-        if not request.json:
-            current_app.logger.error('No JSON data in upload request')
-            return jsonify({'success': False, 'error': 'Aucune donnée JSON fournie'}), 400
+        max_size = current_app.config['MAX_CONTENT_LENGTH']
+
+        if request.mimetype.startswith('image/'):
+            # Corps binaire lu par morceaux, taille limitée au fil de l'eau
+            image_data = _read_upload_stream(request.stream, max_size)
+        elif request.mimetype == 'multipart/form-data':
+            photo_file = request.files.get('photo')
+            image_data = _read_upload_stream(photo_file.stream, max_size) if photo_file else None
+        else:
+            # Récupérer les données de la photo (base64)
+            if not request.json:
+                current_app.logger.error('No JSON data in upload request')
+                return jsonify({'success': False, 'error': 'Aucune donnée JSON fournie'}), 400
+            image_data = request.json.get('photo')
 
-        photo_data = request.json.get('photo')
-        if not photo_data:
+        if not image_data:
             current_app.logger.error('No photo data provided')
             return jsonify({'success': False, 'error': 'Aucune photo fournie'}), 400
 
-        # Décoder la photo base64
         try:
-            # Retirer le préfixe data:image/...;base64,
-            if 'base64,' in photo_data:
-                photo_data = photo_data.split('base64,')[1]
-
-            image_data = base64.b64decode(photo_data)
-            image = Image.open(io.BytesIO(image_data))
+            if isinstance(image_data, str):
+                # Retirer le préfixe data:image/...;base64,
+                if 'base64,' in image_data:
+                    image_data = image_data.split('base64,')[1]
 
-            # Redimensionner l'image si nécessaire
-            max_size = (1024, 1024)
-            if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
-                image.thumbnail(max_size, Image.Resampling.LANCZOS)
+                image_data = base64.b64decode(image_data)
+            UPLOAD_BYTES.observe(len(image_data))
 
-            # Convertir en JPEG
-            if image.mode in ('RGBA', 'LA', 'P'):
-                background = Image.new('RGB', image.size, (255, 255, 255))
-                background.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
-                image = background
+            # Redimensionner et convertir en JPEG + déclinaisons (miniature,
+            # taille moyenne, WebP) en un seul décodage, dans le pool de
+            # traitement d'images hors du thread de la requête
+            try:
+                with request_timing.track('images'):
+                    images = image_pool.process_set(image_data)
+            except ImagePoolBusy:
+                current_app.logger.warning(f'Image pool busy: {image_pool.stats()}')
+                response = jsonify({'success': False, 'error': 'Serveur occupé, veuillez réessayer dans quelques secondes'})
+                response.headers['Retry-After'] = '2'
+                return response, 503
 
             # Upload vers Google Cloud Storage (obligatoire)
             if not gcs_manager.is_configured():
@@ -102,24 +126,21 @@ def upload_photo():
                 }), 500
 
             try:
-                # Convert image to bytes
-                img_byte_arr = io.BytesIO()
-                image.save(img_byte_arr, format='JPEG', quality=85, optimize=True)
-                img_byte_arr.seek(0)
-
-                # For temporary upload, use a temporary ID
+                # Identifiant renvoyé au client, comme pour l'upload direct
                 temp_id = str(uuid.uuid4())
-                result = gcs_manager.upload_image(
-                    img_byte_arr.getvalue(),
-                    temp_id,
-                    temp_id
-                )
+                photo = images.pop('photo')
+                with request_timing.track('gcs'):
+                    result = gcs_manager.upload_image(photo, derivatives=images)
+                PHOTOS_UPLOADED.labels(str(result['deduplicated']).lower()).inc()
 
                 return jsonify({
                     'success': True,
                     'photo_url': result['public_url'],
                     'filename': result['filename'],
-                    'temp_id': temp_id
+                    'gcs_path': result['gcs_path'],
+                    'temp_id': temp_id,
+                    'deduplicated': result['deduplicated'],
+                    **result['derivatives']
                 })
 
             except Exception as gcs_error:
@@ -133,6 +154,8 @@ def upload_photo():
             current_app.logger.error(f'Image processing error: {str(e)}')
             return jsonify({'success': False, 'error': f'Erreur de traitement de l\'image: {str(e)}'}), 400
 
+    except RequestEntityTooLarge:
+        return jsonify({'success': False, 'error': 'Photo trop volumineuse'}), 413
     except IOError as e:
         current_app.logger.error(f'File IO error: {str(e)}')
         return jsonify({'success': False, 'error': f'Erreur de fichier: {str(e)}'}), 400
@@ -140,94 +163,267 @@ def upload_photo():
         current_app.logger.error(f'Unexpected error in upload_photo: {str(e)}')
         return jsonify({'success': False, 'error': 'Erreur serveur'}), 500
 
-@api_bp.route('/commande', methods=['POST'])
-def create_commande():
-    """Créer une nouvelle commande"""
+@api_bp.route('/upload-photo/stats', methods=['GET'])
+def upload_photo_stats():
+    """Profondeur de file et temps de traitement des photos (worker courant), réseau privé uniquement"""
+    if not metrics_exporter.authorized(request):
+        abort(404)
+    return jsonify({
+        'success': True,
+        'image_pool': image_pool.stats(),
+        'derivatives_queue': derivative_builder.pending()
+    })
+
+@api_bp.route('/upload-url', methods=['POST'])
+def create_upload_url():
+    """Créer une URL d'upload signée pour envoyer la photo directement vers GCS"""
     try:
-        data = request.json
-
-        # Validation des données
-        required_fields = ['nom', 'email', 'telephone', 'entreprise', 'paires']
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return jsonify({'success': False, 'error': f'Champ requis manquant: {field}'}), 400
-
-        if not data['paires'] or len(data['paires']) == 0:
-            return jsonify({'success': False, 'error': 'Au moins une paire de chaussures est requise'}), 400
-
-        # Créer la commande
-        commande = Commande(
-            nom=data['nom'],
-            email=data['email'],
-            telephone=data['telephone'],
-            entreprise=data['entreprise'],
-            statut=StatutCommande.PENDING,
-            total=0  # Sera calculé plus tard
-        )
-
-        db.session.add(commande)
-        db.session.flush()  # Pour obtenir l'ID de la commande
-
-        total_commande = 0
-
-        # Créer les paires et leurs prestations
-        for i, paire_data in enumerate(data['paires']):
-            # Validation des données de la paire
-            if 'type_chaussure' not in paire_data or 'prestations' not in paire_data:
-                return jsonify({'success': False, 'error': f'Données manquantes pour la paire {i+1}'}), 400
-
-            if not paire_data['prestations']:
-                return jsonify({'success': False, 'error': f'Aucune prestation sélectionnée pour la paire {i+1}'}), 400
-
-            # Convertir la string en enum
-            type_chaussure_str = paire_data['type_chaussure']
-            if type_chaussure_str == 'HOMME':
-                type_chaussure_enum = TypeChaussure.HOMME
-            elif type_chaussure_str == 'FEMME':
-                type_chaussure_enum = TypeChaussure.FEMME
-            else:
-                return jsonify({'success': False, 'error': f'Type de chaussure invalide: {type_chaussure_str}'}), 400
-
-            paire = Paire(
-                commande_id=commande.id,
-                type_chaussure=type_chaussure_enum,
-                photo_url=paire_data.get('photo_url'),
-                photo_gcs_path=paire_data.get('gcs_path'),
-                photo_filename=paire_data.get('photo_filename'),
-                description=paire_data.get('description'),
-                ordre=i + 1
+        data = request.json or {}
+
+        size = data.get('size')
+        if not isinstance(size, int) or size <= 0:
+            return jsonify({'success': False, 'error': 'Taille de la photo manquante'}), 400
+
+        if size > current_app.config['MAX_CONTENT_LENGTH']:
+            return jsonify({'success': False, 'error': 'Photo trop volumineuse'}), 413
+
+        if data.get('content_type', 'image/jpeg') != 'image/jpeg':
+            return jsonify({'success': False, 'error': 'Seules les photos JPEG sont acceptées'}), 400
+
+        if not gcs_manager.is_configured():
+            current_app.logger.error('GCS not configured')
+            return jsonify({
+                'success': False,
+                'error': 'Google Cloud Storage non configuré. Veuillez configurer GCS.'
+            }), 500
+
+        # For temporary upload, use a temporary ID
+        temp_id = str(uuid.uuid4())
+        with request_timing.track('gcs'):
+            result = gcs_manager.create_upload_session(
+                temp_id,
+                temp_id,
+                size,
+                origin=request.headers.get('Origin') or request.host_url.rstrip('/')
             )
 
-            db.session.add(paire)
-            db.session.flush()  # Pour obtenir l'ID de la paire
+        return jsonify({
+            'success': True,
+            'upload_url': result['upload_url'],
+            'gcs_path': result['gcs_path'],
+            'temp_id': temp_id
+        })
 
-            # Ajouter les prestations pour cette paire
-            for prestation_id in paire_data['prestations']:
-                prestation = Prestation.query.get(prestation_id)
-                if not prestation or not prestation.actif:
-                    return jsonify({'success': False, 'error': f'Prestation invalide: {prestation_id}'}), 400
+    except Exception as e:
+        current_app.logger.error(f'Erreur dans create_upload_url: {str(e)}')
+        return jsonify({'success': False, 'error': 'Erreur serveur'}), 500
 
-                # Vérifier que le type de chaussure correspond
-                if prestation.type_chaussure != type_chaussure_enum:
-                    return jsonify({'success': False, 'error': f'Type de chaussure incompatible pour la prestation {prestation_id}'}), 400
+@api_bp.route('/upload-photo/finalize', methods=['POST'])
+def finalize_upload_photo():
+    """Enregistrer une photo envoyée directement vers GCS"""
+    try:
+        data = request.json or {}
+        temp_id = data.get('temp_id')
+        gcs_path = data.get('gcs_path')
 
-                paire_prestation = PairePrestation(
-                    paire_id=paire.id,
-                    prestation_id=prestation.id,
-                    prix_unitaire=prestation.prix
-                )
+        if not temp_id or not gcs_path:
+            return jsonify({'success': False, 'error': 'Données manquantes'}), 400
 
-                db.session.add(paire_prestation)
-                total_commande += float(prestation.prix)
+        # N'accepter que les objets créés par /upload-url pour ce temp_id
+        try:
+            temp_id = str(uuid.UUID(temp_id))
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Identifiant invalide'}), 400
+
+        if not gcs_path.startswith('photos/') or f'/{temp_id}/{temp_id}_' not in gcs_path:
+            return jsonify({'success': False, 'error': 'Chemin de photo invalide'}), 400
+
+        if not gcs_manager.is_configured():
+            current_app.logger.error('GCS not configured')
+            return jsonify({
+                'success': False,
+                'error': 'Google Cloud Storage non configuré. Veuillez configurer GCS.'
+            }), 500
+
+        # Ranger la photo sous son empreinte (copie dans le bucket, sans la
+        # télécharger), puis supprimer l'objet temporaire
+        with request_timing.track('gcs'):
+            result = gcs_manager.finalize_upload(gcs_path, current_app.config['MAX_CONTENT_LENGTH'])
+        UPLOAD_BYTES.observe(result['size'])
+        PHOTOS_UPLOADED.labels(str(result['deduplicated']).lower()).inc()
+
+        # Déclinaisons (miniature, taille moyenne, WebP) générées en arrière-plan
+        # à partir du bucket, sauf si la photo stockée les a déjà. Seules les
+        # URLs des déclinaisons existantes sont renvoyées : en attendant, le
+        # client affiche la photo complète, et la commande vérifie à nouveau.
+        derivatives_pending = len(result['derivatives']) < len(DERIVATIVES)
+        if derivatives_pending:
+            derivative_builder.enqueue(result['gcs_path'])
 
-        # Mettre à jour le total de la commande
-        commande.total = total_commande
+        return jsonify({
+            'success': True,
+            'photo_url': result['public_url'],
+            'filename': result['filename'],
+            'gcs_path': result['gcs_path'],
+            'temp_id': temp_id,
+            'deduplicated': result['deduplicated'],
+            'derivatives_pending': derivatives_pending,
+            **result['derivatives']
+        })
+
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f'Erreur dans finalize_upload_photo: {str(e)}')
+        return jsonify({'success': False, 'error': 'Erreur serveur'}), 500
+
+def _prestation_id(value):
+    """Identifiant de prestation en entier ; ValueError s'il est invalide"""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f'Prestation invalide: {value}')
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'Prestation invalide: {value}')
+
+def _photo_derivatives(paire_data):
+    """URLs des déclinaisons de la photo d'une paire, seulement si elles existent.
+
+    Le client n'a reçu que celles déjà stockées lors de l'upload ; s'il en
+    manque (génération en arrière-plan pas terminée, ou perdue au
+    redémarrage d'une machine), les métadonnées de la photo font foi.
+    """
+    urls = {name: paire_data.get(name) for name in ('thumb_url', 'medium_url', 'webp_url')}
+    gcs_path = paire_data.get('gcs_path')
+    if all(urls.values()) or not gcs_path:
+        return urls
+    try:
+        with request_timing.track('gcs'):
+            stored = gcs_manager.stored_derivative_urls(gcs_path)
+    except Exception as e:
+        current_app.logger.warning(f'Déclinaisons de {gcs_path} non vérifiées: {e}')
+        stored = {}
+    return {name: stored.get(name) for name in urls}
+
+def _build_commande(data):
+    """Valider les données du formulaire et construire la commande en mémoire.
+
+    Lève ValueError (message pour le client) si les données sont invalides.
+    Les prestations sont chargées en une seule requête ; la commande, ses
+    paires et leurs prestations sont ajoutées à la session sans flush.
+    """
+    if not data:
+        raise ValueError('Données manquantes')
+
+    # Validation des données
+    required_fields = ['nom', 'email', 'telephone', 'entreprise', 'paires']
+    for field in required_fields:
+        if field not in data or not data[field]:
+            raise ValueError(f'Champ requis manquant: {field}')
+
+    if not data['paires'] or len(data['paires']) == 0:
+        raise ValueError('Au moins une paire de chaussures est requise')
+
+    # Valider les paires et collecter les prestations référencées
+    types_chaussure = []
+    paires_prestation_ids = []
+    prestation_ids = set()
+    for i, paire_data in enumerate(data['paires']):
+        # Validation des données de la paire
+        if not isinstance(paire_data, dict) or 'type_chaussure' not in paire_data or 'prestations' not in paire_data:
+            raise ValueError(f'Données manquantes pour la paire {i+1}')
+
+        if not paire_data['prestations'] or not isinstance(paire_data['prestations'], list):
+            raise ValueError(f'Aucune prestation sélectionnée pour la paire {i+1}')
+
+        # Convertir la string en enum
+        type_chaussure_str = paire_data['type_chaussure']
+        if type_chaussure_str == 'HOMME':
+            type_chaussure_enum = TypeChaussure.HOMME
+        elif type_chaussure_str == 'FEMME':
+            type_chaussure_enum = TypeChaussure.FEMME
+        else:
+            raise ValueError(f'Type de chaussure invalide: {type_chaussure_str}')
+
+        # Identifiants envoyés en nombre ou en texte ("12"), comme l'acceptait Query.get
+        ids = [_prestation_id(value) for value in paire_data['prestations']]
+        types_chaussure.append(type_chaussure_enum)
+        paires_prestation_ids.append(ids)
+        prestation_ids.update(ids)
+
+    # Charger toutes les prestations en une seule requête (IN)
+    prestations = {
+        prestation.id: prestation
+        for prestation in Prestation.query.filter(Prestation.id.in_(prestation_ids)).all()
+    }
+
+    for ids, type_chaussure_enum in zip(paires_prestation_ids, types_chaussure):
+        for prestation_id in ids:
+            prestation = prestations.get(prestation_id)
+            if not prestation or not prestation.actif:
+                raise ValueError(f'Prestation invalide: {prestation_id}')
+
+            # Vérifier que le type de chaussure correspond
+            if prestation.type_chaussure != type_chaussure_enum:
+                raise ValueError(f'Type de chaussure incompatible pour la prestation {prestation_id}')
+
+    # Créer la commande, ses paires et leurs prestations en mémoire.
+    # Le flush insère chaque table en un seul lot (insertmanyvalues).
+    commande = Commande(
+        nom=data['nom'],
+        email=data['email'],
+        telephone=data['telephone'],
+        entreprise=data['entreprise'],
+        statut=StatutCommande.PENDING,
+        total=0
+    )
+
+    total_commande = 0
+    for i, (paire_data, ids, type_chaussure_enum) in enumerate(zip(data['paires'], paires_prestation_ids, types_chaussure)):
+        derivatives = _photo_derivatives(paire_data)
+        paire = Paire(
+            type_chaussure=type_chaussure_enum,
+            photo_url=paire_data.get('photo_url'),
+            photo_gcs_path=paire_data.get('gcs_path'),
+            photo_filename=paire_data.get('photo_filename'),
+            photo_thumb_url=derivatives['thumb_url'],
+            photo_medium_url=derivatives['medium_url'],
+            photo_webp_url=derivatives['webp_url'],
+            description=paire_data.get('description'),
+            ordre=i + 1
+        )
+
+        for prestation_id in ids:
+            prestation = prestations[prestation_id]
+            paire.paire_prestations.append(PairePrestation(
+                prestation=prestation,
+                prix_unitaire=prestation.prix
+            ))
+            total_commande += prestation.prix
+
+        commande.paires.append(paire)
+
+    commande.total = total_commande
+
+    db.session.add(commande)
+    return commande
+
+@api_bp.route('/commande', methods=['POST'])
+def create_commande():
+    """Créer une nouvelle commande"""
+    try:
+        commande = _build_commande(request.json)
+        db.session.flush()
+
+        # Sérialiser avant le commit pour éviter de recharger le graphe expiré
+        commande_data = commande.to_dict()
 
         db.session.commit()
+        ORDERS_CREATED.inc()
 
         return jsonify({
             'success': True,
-            'commande': commande.to_dict()
+            'commande': commande_data
         })
 
     except ValueError as e:
@@ -238,58 +434,89 @@ def create_commande():
         current_app.logger.error(f'Erreur dans save_prestations: {str(e)}')
         return jsonify({'success': False, 'error': 'Erreur serveur'}), 500
 
+@api_bp.route('/commande/checkout', methods=['POST'])
+def create_commande_checkout():
+    """Créer la commande et sa session de paiement Stripe en une seule requête.
+
+    Les lignes de la session Stripe sont construites à partir de la commande
+    encore en mémoire (prestations et prix qui viennent d'être validés),
+    sans recharger le graphe. La commande est enregistrée avant l'appel à
+    Stripe pour ne pas garder de transaction ouverte pendant celui-ci ; si
+    Stripe échoue, elle reste en attente et /api/commande/<id>/checkout
+    permet de réessayer.
+    """
+    # Import différé : stripe n'est chargé qu'au premier paiement
+    stripe = stripe_checkout.stripe
+
+    try:
+        commande = _build_commande(request.json)
+        db.session.flush()
+
+        # Sérialiser avant le commit pour éviter de recharger le graphe expiré
+        commande_data = commande.to_dict()
+        line_items = stripe_checkout.line_items(commande)
+
+        db.session.commit()
+        ORDERS_CREATED.inc()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Erreur dans create_commande_checkout: {str(e)}')
+        return jsonify({'success': False, 'error': 'Erreur serveur'}), 500
+
+    try:
+        domain = request.host_url.rstrip('/')
+        fields = stripe_checkout.create_session(commande_data['id'], commande_data['email'], line_items, domain)
+        Commande.query.filter_by(id=commande_data['id']).update(fields, synchronize_session=False)
+        db.session.commit()
+
+        return jsonify({
+            'success': True,
+            'commande': commande_data,
+            'checkout_url': fields['stripe_session_url'],
+            'session_id': fields['stripe_session_id']
+        })
+
+    except stripe.error.StripeError as e:
+        db.session.rollback()
+        current_app.logger.error(f'Erreur Stripe dans create_commande_checkout: {str(e)}')
+        return jsonify({'success': False, 'error': 'Erreur de paiement', 'commande': commande_data}), 500
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Erreur dans create_commande_checkout: {str(e)}')
+        return jsonify({'success': False, 'error': 'Erreur serveur', 'commande': commande_data}), 500
+
 @api_bp.route('/commande/<int:commande_id>/checkout', methods=['POST'])
 def create_checkout_session(commande_id):
-    """Créer une session de paiement Stripe"""
+    """Créer (ou reprendre) la session de paiement Stripe de la commande"""
+    # Import différé : stripe n'est chargé qu'au premier paiement
+    stripe = stripe_checkout.stripe
+
     try:
-        commande = Commande.query.get(commande_id)
+        commande = Commande.get_full_order(commande_id)
         if not commande:
             return jsonify({'success': False, 'error': 'Commande introuvable'}), 404
 
         if commande.statut != StatutCommande.PENDING:
             return jsonify({'success': False, 'error': 'Commande déjà traitée'}), 400
 
-        # Configurer Stripe
-        stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
-
-        # Créer les line items pour Stripe
-        line_items = []
-        for paire in commande.paires:
-            for paire_prestation in paire.paire_prestations:
-                prestation = paire_prestation.prestation
-                line_items.append({
-                    'price_data': {
-                        'currency': 'eur',
-                        'product_data': {
-                            'name': f"{prestation.nom} - {paire.type_chaussure.value.title()}",
-                            'description': prestation.description or f"Service de cordonnerie - {prestation.nom}",
-                        },
-                        'unit_amount': int(float(paire_prestation.prix_unitaire) * 100),  # Prix en centimes
-                    },
-                    'quantity': 1,
-                })
-
-        # Créer la session Stripe Checkout
+        # Session encore ouverte réutilisée telle quelle (double clic, retour arrière)
         domain = request.host_url.rstrip('/')
-        checkout_session = stripe.checkout.Session.create(
-            payment_method_types=['card'],
-            line_items=line_items,
-            mode='payment',
-            success_url=f"{domain}/checkout?session_id={{CHECKOUT_SESSION_ID}}",
-            cancel_url=f"{domain}/checkout/cancel",
-            metadata={
-                'commande_id': str(commande.id)
-            },
-            customer_email=commande.email,
-            billing_address_collection='required',
-        )
+        session_id, checkout_url = stripe_checkout.session_for(commande, domain)
+        db.session.commit()
 
         return jsonify({
             'success': True,
-            'checkout_url': checkout_session.url,
-            'session_id': checkout_session.id
+            'checkout_url': checkout_url,
+            'session_id': session_id
         })
 
+    except ValueError as e:
+        # Session précédente payée, webhook pas encore traité
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 409
     except stripe.error.CardError as e:
         return jsonify({'success': False, 'error': f'Carte refusée: {e.user_message}'}), 400
     except stripe.error.InvalidRequestError as e:
@@ -305,7 +532,7 @@ def create_checkout_session(commande_id):
 def get_commande(commande_id):
     """Récupérer une commande par son ID"""
     try:
-        commande = Commande.query.get(commande_id)
+        commande = Commande.get_full_order(commande_id)
         if not commande:
             return jsonify({'success': False, 'error': 'Commande introuvable'}), 404
 
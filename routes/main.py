@@ -1,9 +1,11 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from models.prestations import Prestation
+from flask import Blueprint, render_template, request, redirect, url_for, Response, abort, current_app
 from models.enums import TypeChaussure
 from models.commandes import Commande, StatutCommande
-from services.email import email_manager
-import stripe
+from services.stripe_events import stripe_event_processor
+from services.checkout import stripe_checkout
+from database import db
+from services.catalog import prestation_catalog
+from services.metrics import metrics_exporter
 import os
 
 main_bp = Blueprint('main', __name__)
@@ -13,6 +15,19 @@ def home():
     """Page d'accueil"""
     return render_template('home.html')
 
+@main_bp.route('/healthz')
+def healthz():
+    """Sonde de vie pour Fly.io : ni template ni base de données"""
+    return {'status': 'ok'}, 200
+
+@main_bp.route('/metrics')
+def metrics():
+    """Métriques Prometheus (agrégées sur tous les workers gunicorn), réseau privé uniquement"""
+    if not metrics_exporter.authorized(request):
+        abort(404)
+    body, content_type = metrics_exporter.render()
+    return Response(body, content_type=content_type)
+
 @main_bp.route('/choix-prestation')
 def choix_prestation():
     """Page de commande accessible via QR code"""
@@ -22,20 +37,10 @@ def choix_prestation():
         # Rediriger vers la page sans paramètre pour éviter les erreurs
         return redirect(url_for('main.choix_prestation'))
 
-    # Récupérer toutes les prestations actives
-    prestations_homme = Prestation.query.filter_by(
-        type_chaussure=TypeChaussure.HOMME,
-        actif=True
-    ).all()
-
-    prestations_femme = Prestation.query.filter_by(
-        type_chaussure=TypeChaussure.FEMME,
-        actif=True
-    ).all()
-
+    # Récupérer toutes les prestations actives (catalogue en cache)
     return render_template('choix_prestation.html',
-                         prestations_homme=[p.to_dict() for p in prestations_homme],
-                         prestations_femme=[p.to_dict() for p in prestations_femme])
+                         prestations_homme=prestation_catalog.get_prestations(TypeChaussure.HOMME),
+                         prestations_femme=prestation_catalog.get_prestations(TypeChaussure.FEMME))
 
 @main_bp.route('/cgv')
 def cgv():
@@ -44,7 +49,16 @@ def cgv():
 
 @main_bp.route('/checkout')
 def checkout():
-    """Page de résultat du checkout Stripe"""
+    """Page de résultat du checkout Stripe.
+
+    La commande est retrouvée par son stripe_session_id : une fois le
+    webhook traité, son statut suffit et Stripe n'est pas appelé. Tant
+    qu'elle est en attente, la session est lue chez Stripe (cache de
+    quelques secondes contre les rafraîchissements).
+    """
+    # Import différé : stripe prend ~450 ms à importer, inutile pour les autres pages
+    stripe = stripe_checkout.stripe
+
     session_id = request.args.get('session_id')
 
     if not session_id:
@@ -52,38 +66,35 @@ def checkout():
                              error_message='Session de paiement invalide')
 
     try:
-        # Configurer Stripe
-        stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
-
-        # Récupérer la session Stripe
-        checkout_session = stripe.checkout.Session.retrieve(session_id)
+        commande = Commande.query.filter_by(stripe_session_id=session_id).first()
+        if commande and commande.statut in (StatutCommande.PAID, StatutCommande.PROCESSING, StatutCommande.COMPLETED):
+            return render_template('checkout.html', status='success',
+                                 commande=commande)
 
-        print(f"Checkout session retrieved: {session_id}")
-        print(f"Payment status: {checkout_session.payment_status}")
-        print(f"Session status: {checkout_session.status}")
+        # Paiement pas encore confirmé par le webhook : demander à Stripe
+        checkout_session = stripe_checkout.retrieve(session_id)
 
-        if checkout_session.payment_status == 'paid':
+        if checkout_session['payment_status'] == 'paid':
             # Récupérer la commande associée
-            commande_id = checkout_session.metadata.get('commande_id')
-            commande = Commande.query.get(commande_id)
+            if commande is None and checkout_session['commande_id']:
+                commande = db.session.get(Commande, int(checkout_session['commande_id']))
 
             if commande:
-                print(f"Order found: #{commande.id}")
                 return render_template('checkout.html', status='success',
                                      commande=commande)
             else:
-                print(f"Order not found for commande_id: {commande_id}")
+                current_app.logger.warning(f"Order not found for commande_id: {checkout_session['commande_id']}")
                 return render_template('checkout.html', status='error',
                                      error_message='Commande introuvable')
         else:
-            print(f"Payment not confirmed - payment_status: {checkout_session.payment_status}, status: {checkout_session.status}")
+            current_app.logger.info(f"Payment not confirmed - payment_status: {checkout_session['payment_status']}, status: {checkout_session['status']}")
             return render_template('checkout.html', status='error',
-                                 error_message=f'Paiement non confirmé (statut: {checkout_session.payment_status})')
+                                 error_message=f"Paiement non confirmé (statut: {checkout_session['payment_status']})")
 
     except stripe.error.StripeError as e:
         return render_template('checkout.html', status='error',
                              error_message=f'Erreur Stripe: {str(e)}')
-    except Exception as e:
+    except Exception:
         return render_template('checkout.html', status='error',
                              error_message='Une erreur inattendue s\'est produite')
 
@@ -94,13 +105,19 @@ def checkout_cancel():
 
 @main_bp.route('/webhook/stripe', methods=['POST'])
 def stripe_webhook():
-    """Webhook Stripe pour traiter les événements de paiement"""
+    """Webhook Stripe : accusé de réception immédiat, traitement en arrière-plan.
+
+    La signature est vérifiée et l'événement brut enregistré dans
+    stripe_events (event_id unique : les livraisons en double sont
+    ignorées) ; services/stripe_events.py met ensuite à jour la commande et
+    envoie les emails.
+    """
+    stripe = stripe_checkout.stripe
+
     payload = request.get_data(as_text=True)
     sig_header = request.headers.get('Stripe-Signature')
 
     try:
-        # Configurer Stripe
-        stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
         endpoint_secret = os.environ.get('STRIPE_WEBHOOK_SECRET')
 
         # Vérifier la signature du webhook
@@ -108,55 +125,17 @@ def stripe_webhook():
             payload, sig_header, endpoint_secret
         )
 
-        # Traiter l'événement
-        if event['type'] == 'checkout.session.completed':
-            session = event['data']['object']
-
-            # Vérifier que le paiement est bien réussi
-            if session.get('payment_status') == 'paid':
-                # Mettre à jour le statut de la commande
-                commande_id = session.metadata.get('commande_id')
-                if commande_id:
-                    commande = Commande.query.get(commande_id)
-                    if commande:
-                        commande.statut = StatutCommande.PAID
-                        commande.stripe_payment_intent_id = session.get('payment_intent')
-                        from app import db
-                        db.session.commit()
-
-                        # Envoyer emails de confirmation
-                        try:
-                            # Email de confirmation au client
-                            email_manager.send_order_confirmation(commande)
-
-                            # Email de notification à l'admin
-                            email_manager.send_admin_notification(commande)
-
-                            print(f"Confirmation emails sent successfully for order #{commande.id}")
-                        except Exception as e:
-                            print(f"Error sending confirmation emails: {e}")
-
-        elif event['type'] == 'payment_intent.payment_failed':
-            payment_intent = event['data']['object']
-            # Traiter l'échec de paiement
-            commande_id = payment_intent.metadata.get('commande_id')
-            if commande_id:
-                commande = Commande.query.get(commande_id)
-                if commande:
-                    try:
-                        # Envoyer email d'échec de paiement
-                        error_message = payment_intent.get('last_payment_error', {}).get('message')
-                        email_manager.send_payment_failed_email(commande, error_message)
-                    except Exception as e:
-                        print(f"Error sending payment failed email: {e}")
+        if not stripe_event_processor.record(event, payload):
+            return {'status': 'duplicate'}, 200
 
         return {'status': 'success'}, 200
 
-    except ValueError as e:
+    except ValueError:
         # Payload invalide
         return {'error': 'Payload invalide'}, 400
-    except stripe.error.SignatureVerificationError as e:
+    except stripe.error.SignatureVerificationError:
         # Signature invalide
         return {'error': 'Signature invalide'}, 400
     except Exception as e:
-        return {'error': str(e)}, 500
\ No newline at end of file
+        db.session.rollback()
+        return {'error': str(e)}, 500
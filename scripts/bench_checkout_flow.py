@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Délai entre le clic « Payer » et la redirection vers Stripe
+
+Compare les deux parcours de commande.js sous gunicorn :
+
+- two-step : POST /api/commande puis POST /api/commande/<id>/checkout
+  (ancien parcours, deux allers-retours et un second chargement de la
+  commande) ;
+- combined : POST /api/commande/checkout (commande et session Stripe en
+  une requête).
+
+Stripe est remplacé par fake_stripe.py (latence réglable). Chaque requête
+HTTP est allongée de --rtt-ms côté client pour simuler un réseau mobile.
+Affiche p50/p95 du clic à la redirection et le temps passé côté serveur.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import statistics
+import http.client
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, SCRIPTS)
+
+from bench_workers import start_server
+from fake_stripe import start_fake_stripe, WEBHOOK_SECRET
+from loadtest import prepare_database, parse_config
+
+DB_PATH = os.path.join(tempfile.gettempdir(), 'bench-checkout-flow.db')
+LOG_PATH = os.path.join(tempfile.gettempdir(), 'bench-checkout-flow-gunicorn.log')
+
+class Client:
+    """Un navigateur : connexion keep-alive, aller-retour réseau simulé"""
+
+    def __init__(self, port, rtt):
+        self.connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        self.rtt = rtt
+        self.server_ms = 0.0
+
+    def post(self, path, payload):
+        time.sleep(self.rtt)
+        start = time.perf_counter()
+        self.connection.request('POST', path, json.dumps(payload), {'Content-Type': 'application/json'})
+        response = self.connection.getresponse()
+        data = response.read()
+        self.server_ms += (time.perf_counter() - start) * 1000
+        if response.status != 200:
+            raise RuntimeError(f'{path} : HTTP {response.status} {data[:200]!r}')
+        return json.loads(data)
+
+def order_payload(prestation_ids, paires):
+    return {
+        'nom': 'Bench checkout',
+        'email': 'client@example.com',
+        'telephone': '0600000000',
+        'entreprise': 'Bench',
+        'paires': [{'type_chaussure': 'HOMME', 'prestations': prestation_ids[:2]} for _ in range(paires)]
+    }
+
+def two_step(client, payload):
+    commande = client.post('/api/commande', payload)['commande']
+    return client.post(f"/api/commande/{commande['id']}/checkout", {})['checkout_url']
+
+def combined(client, payload):
+    return client.post('/api/commande/checkout', payload)['checkout_url']
+
+def run_flow(port, flow, payload, orders, users, rtt):
+    """`orders` commandes réparties sur `users` clients simultanés ; retourne (délais ms, temps serveur ms)"""
+    latencies, server = [], []
+    lock = threading.Lock()
+    remaining = [orders]
+
+    def user():
+        while True:
+            with lock:
+                if not remaining[0]:
+                    return
+                remaining[0] -= 1
+            client = Client(port, rtt)
+            start = time.perf_counter()
+            flow(client, payload)
+            elapsed = (time.perf_counter() - start) * 1000
+            client.connection.close()
+            with lock:
+                latencies.append(elapsed)
+                server.append(client.server_ms)
+
+    threads = [threading.Thread(target=user) for _ in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, server
+
+def percentile(values, p):
+    cuts = statistics.quantiles(values, n=100) if len(values) > 1 else values * 99
+    return cuts[p - 1]
+
+def main():
+    parser = argparse.ArgumentParser(description="Délai entre le clic « Payer » et la redirection vers Stripe")
+    parser.add_argument('--orders', type=int, default=100, help="commandes par parcours")
+    parser.add_argument('--users', type=int, default=4, help="clients simultanés")
+    parser.add_argument('--paires', type=int, default=3, help="paires par commande")
+    parser.add_argument('--rtt-ms', type=float, default=150, help="aller-retour réseau simulé par requête (mobile)")
+    parser.add_argument('--stripe-latency-ms', type=float, default=300)
+    parser.add_argument('--config', default='gthread:2x12', help="configuration gunicorn, classe:workers[xthreads]")
+    parser.add_argument('--database-url', help="base de test dédiée (défaut : SQLite jetable)")
+    parser.add_argument('--port', type=int, default=8092)
+    args = parser.parse_args()
+
+    database_url = args.database_url or f'sqlite:///{DB_PATH}'
+    if not args.database_url and os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+
+    stripe_api = start_fake_stripe(latency=args.stripe_latency_ms / 1000)
+    prestation_ids = prepare_database(database_url)
+    payload = order_payload(prestation_ids, args.paires)
+
+    _, overrides = parse_config(args.config)
+    env = dict(os.environ, DATABASE_URL=database_url, FLASK_ENV='production',
+               STRIPE_SECRET_KEY='sk_test_bench', STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET,
+               LOADTEST_STRIPE_URL=stripe_api.url, LOADTEST_GCS_LATENCY='0', **overrides)
+    env.pop('DB_POOL_SIZE', None)
+
+    print(f"💳 {args.orders} commandes de {args.paires} paires par parcours, {args.users} clients simultanés, "
+          f"RTT {args.rtt_ms:.0f} ms, Stripe {args.stripe_latency_ms:.0f} ms, {args.config}")
+    print(f"   logs de l'application : {LOG_PATH}")
+    print(f"   {'parcours':<10} {'p50':>8} {'p95':>8} {'serveur p50':>12}")
+    log = open(LOG_PATH, 'w')
+    server = start_server(args.port, env, 'loadtest:create_loadtest_app()', log)
+    try:
+        for name, flow in (('two-step', two_step), ('combined', combined)):
+            # Mise en route (import de stripe, connexions), non mesurée
+            run_flow(args.port, flow, payload, args.users, args.users, 0)
+            latencies, server_ms = run_flow(args.port, flow, payload, args.orders, args.users, args.rtt_ms / 1000)
+            print(f"   {name:<10} {percentile(latencies, 50):6.0f}ms {percentile(latencies, 95):6.0f}ms "
+                  f"{percentile(server_ms, 50):10.0f}ms")
+    finally:
+        server.terminate()
+        server.wait()
+        log.close()
+        if not args.database_url and os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+
+if __name__ == '__main__':
+    main()
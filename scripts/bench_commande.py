@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark de création de commande : latence et nombre de requêtes SQL
+en fonction du nombre de paires.
+
+Utilise la base configurée par DATABASE_URL (PostgreSQL recommandé : le
+regroupement des INSERT en lots n'est pas disponible avec SQLite).
+"""
+
+import os
+import sys
+import time
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from app import create_app
+from database import db
+from models.commandes import Commande
+from models.prestations import Prestation
+from models.enums import TypeChaussure
+
+PAIR_COUNTS = [1, 2, 5, 10, 20]
+ITERATIONS = 10
+
+def build_order(prestation_ids, nb_paires):
+    """Construire le payload d'une commande de test"""
+    return {
+        'nom': 'Benchmark',
+        'email': 'bench@example.com',
+        'telephone': '0000000000',
+        'entreprise': 'Benchmark SARL',
+        'paires': [
+            {
+                'type_chaussure': 'HOMME',
+                'prestations': prestation_ids,
+                'photo_url': 'https://storage.googleapis.com/bench/photo.jpg',
+                'photo_filename': 'photo.jpg'
+            }
+            for _ in range(nb_paires)
+        ]
+    }
+
+def main():
+    app = create_app()
+    client = app.test_client()
+    statements = []
+    created_ids = []
+
+    with app.app_context():
+        prestation_ids = [
+            p.id for p in Prestation.query.filter_by(
+                type_chaussure=TypeChaussure.HOMME, actif=True
+            ).limit(2).all()
+        ]
+        if not prestation_ids:
+            print("❌ Aucune prestation HOMME active. Lancez d'abord seed_data.py")
+            return
+
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda *args: statements.append(args[2]))
+
+    print("📊 Création de commande : latence vs nombre de paires")
+    print(f"{'paires':>7} {'requêtes':>9} {'p50 (ms)':>9} {'max (ms)':>9}")
+
+    for nb_paires in PAIR_COUNTS:
+        payload = build_order(prestation_ids, nb_paires)
+        durations = []
+        for _ in range(ITERATIONS):
+            statements.clear()
+            start = time.perf_counter()
+            response = client.post('/api/commande', json=payload)
+            durations.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                print(f"❌ Erreur: {response.json}")
+                return
+            created_ids.append(response.json['commande']['id'])
+
+        print(f"{nb_paires:>7} {len(statements):>9} "
+              f"{statistics.median(durations):>9.1f} {max(durations):>9.1f}")
+
+    # Nettoyage des commandes de test
+    with app.app_context():
+        for commande in Commande.query.filter(Commande.id.in_(created_ids)).all():
+            db.session.delete(commande)
+        db.session.commit()
+    print("🧹 Commandes de test supprimées")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark d'envoi d'emails contre le serveur SMTP local (smtp_stub.py)
+
+Compare :
+- une connexion SMTP (connect + STARTTLS + AUTH) par email
+- la session keep-alive d'EmailManager
+- send_many() sur une seule session
+"""
+
+import os
+import io
+import sys
+import time
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smtp_stub import start_stub
+
+PORT = 8025
+NB_EMAILS = 50
+
+os.environ.update({
+    'SMTP_HOST': 'localhost',
+    'SMTP_PORT': str(PORT),
+    'SMTP_USER': 'bench',
+    'SMTP_PASSWORD': 'bench',
+    'FROM_EMAIL': 'bench@example.com',
+    'ADMIN_EMAIL': 'admin@example.com',
+})
+
+from services.email import EmailManager
+
+def build_emails():
+    return [
+        {
+            'to_email': f'client{i}@example.com',
+            'subject': f'Benchmark #{i}',
+            'html_content': '<h2>Benchmark</h2>' + '<p>Lorem ipsum</p>' * 50,
+            'text_content': 'Benchmark\n' + 'Lorem ipsum\n' * 50
+        }
+        for i in range(NB_EMAILS)
+    ]
+
+def run(label, send):
+    # Les envois affichent une ligne chacun : on les masque pendant la mesure
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        results = send()
+        elapsed = time.perf_counter() - start
+    ok = sum(1 for r in results if r)
+    print(f"{label:<28} {ok:>4}/{NB_EMAILS} {elapsed * 1000:>9.0f} ms {ok / elapsed:>8.1f} emails/s")
+
+def main():
+    controller, _ = start_stub(port=PORT, quiet=True)
+    manager = EmailManager()
+    emails = build_emails()
+
+    print(f"📧 {NB_EMAILS} emails vers le serveur SMTP local (port {PORT})")
+
+    def one_connection_per_email():
+        results = []
+        for email in emails:
+            results.append(manager.send_email(**email))
+            manager.close()
+        return results
+
+    def keep_alive():
+        return [manager.send_email(**email) for email in emails]
+
+    def bulk():
+        return manager.send_many(emails)
+
+    try:
+        for label, send in [('connexion par email', one_connection_per_email),
+                            ('session keep-alive', keep_alive),
+                            ('send_many()', bulk)]:
+            manager.close()
+            run(label, send)
+    finally:
+        manager.close()
+        controller.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark du client Google Cloud Storage : démarrage et réutilisation des connexions
+
+1. Démarrage : temps d'import de services.storage et de construction du
+   client (clé de service account générée localement, aucun appel réseau),
+   mesurés dans un processus neuf comme un worker gunicorn.
+2. Connexions : N threads envoient des requêtes via la session autorisée
+   vers un serveur HTTP local ; on compte les connexions TCP ouvertes et jetées selon
+   la taille du pool (10 = défaut de requests, GCS_HTTP_POOL_SIZE sinon).
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+THREADS = 16
+REQUESTS_PER_THREAD = 20
+
+def fake_service_account():
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption()).decode()
+    return json.dumps({
+        'type': 'service_account',
+        'project_id': 'bench',
+        'private_key_id': 'bench',
+        'private_key': pem,
+        'client_email': 'bench@bench.iam.gserviceaccount.com',
+        'client_id': '1',
+        'token_uri': 'https://oauth2.googleapis.com/token'
+    })
+
+def measure_startup():
+    """Exécuté dans un processus enfant"""
+    start = time.perf_counter()
+    from services.storage import gcs_manager
+    imported = time.perf_counter()
+    gcs_manager.is_configured()
+    built = time.perf_counter()
+    print(json.dumps({'import_ms': (imported - start) * 1000, 'client_ms': (built - imported) * 1000}))
+
+class CountingHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with CountingHandler.lock:
+            CountingHandler.connections += 1
+
+    def do_GET(self):
+        time.sleep(0.002)
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+class DiscardCounter(logging.Handler):
+    """Compte les connexions jetées par urllib3 faute de place dans le pool"""
+    count = 0
+
+    def emit(self, record):
+        if 'Connection pool is full' in record.getMessage():
+            DiscardCounter.count += 1
+
+def measure_pool(pool_size, url):
+    from google.auth.credentials import AnonymousCredentials
+    from google.auth.transport.requests import AuthorizedSession
+    from requests.adapters import HTTPAdapter
+
+    session = AuthorizedSession(AnonymousCredentials())
+    session.mount('http://', HTTPAdapter(pool_connections=2, pool_maxsize=pool_size))
+
+    def worker(_):
+        for _ in range(REQUESTS_PER_THREAD):
+            session.get(url).content
+
+    CountingHandler.connections = 0
+    DiscardCounter.count = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        list(executor.map(worker, range(THREADS)))
+    return CountingHandler.connections, DiscardCounter.count, time.perf_counter() - start
+
+def main():
+    env = dict(os.environ,
+               GOOGLE_CLOUD_PROJECT_ID='bench',
+               GCS_BUCKET_NAME='bench',
+               GOOGLE_APPLICATION_CREDENTIALS_JSON=fake_service_account())
+
+    runs = [json.loads(subprocess.run([sys.executable, __file__, 'startup'], env=env,
+                                      capture_output=True, text=True, check=True).stdout)
+            for _ in range(5)]
+    import_ms = sorted(r['import_ms'] for r in runs)[2]
+    client_ms = sorted(r['client_ms'] for r in runs)[2]
+    print("🚀 Démarrage d'un worker (médiane de 5 processus)")
+    print(f"   import services.storage : {import_ms:6.0f} ms")
+    print(f"   construction du client  : {client_ms:6.0f} ms "
+          f"(à l'import avant ; au premier usage ou dans post_fork maintenant)")
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CountingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/'
+
+    print(f"🔌 {THREADS} threads x {REQUESTS_PER_THREAD} requêtes via la session partagée")
+    urllib3_logger = logging.getLogger('urllib3.connectionpool')
+    urllib3_logger.addHandler(DiscardCounter())
+    urllib3_logger.propagate = False
+    for pool_size in (10, int(os.environ.get('GCS_HTTP_POOL_SIZE', 16))):
+        connections, discarded, elapsed = measure_pool(pool_size, url)
+        print(f"   pool de {pool_size:>2} : {connections:>3} connexions ouvertes, "
+              f"{discarded:>3} jetées, {elapsed * 1000:.0f} ms")
+    server.shutdown()
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'startup':
+        measure_startup()
+    else:
+        main()
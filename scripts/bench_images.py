@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark du traitement des photos : temps CPU et pic de mémoire (RSS)
+
+Compare l'ancien chemin d'upload (décodage + encodage dans upload_photo,
+puis à nouveau dans GCSManager.upload_image) au pipeline unique
+services.images.process_image (et à process_image_set, qui produit en plus
+les déclinaisons miniature / taille moyenne / WebP), sur des photos de téléphone simulées
+(12 MP, JPEG qualité 90). Chaque variante tourne dans un processus séparé
+pour mesurer son propre pic de RSS.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import resource
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+PHOTO_SIZES = [(4032, 3024), (3024, 4032), (1920, 1080)]
+ITERATIONS = 5
+
+def make_phone_photo(size):
+    """Photo synthétique : dégradé + bruit, compressée comme un appareil photo"""
+    gradient = Image.linear_gradient('L').resize(size)
+    noise = Image.effect_noise(size, 40)
+    image = Image.merge('RGB', (gradient, noise, Image.blend(gradient, noise, 0.5)))
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=90)
+    return output.getvalue()
+
+def legacy_pipeline(image_data):
+    """Ancien chemin : upload_photo puis GCSManager.upload_image"""
+    image = Image.open(io.BytesIO(image_data))
+    if image.size[0] > 1024 or image.size[1] > 1024:
+        image.thumbnail((1024, 1024), Image.Resampling.LANCZOS)
+    first = io.BytesIO()
+    image.save(first, format='JPEG', quality=85, optimize=True)
+
+    image = Image.open(io.BytesIO(first.getvalue()))
+    if image.size[0] > 1920 or image.size[1] > 1920:
+        image.thumbnail((1920, 1920), Image.Resampling.LANCZOS)
+    second = io.BytesIO()
+    image.save(second, format='JPEG', quality=85, optimize=True)
+    return second.getvalue()
+
+def peak_rss_kb():
+    """Pic de RSS du processus (VmHWM ; ru_maxrss hérite du parent après fork/exec)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def run_variant(variant, photo_dir):
+    """Exécuté dans un processus enfant : mesure une variante"""
+    from services.images import process_image, process_image_set
+    pipeline = {
+        'legacy': legacy_pipeline,
+        'pipeline': process_image,
+        # Photo + miniature, taille moyenne et WebP, tailles cumulées
+        'derivees': lambda data: b''.join(process_image_set(data).values())
+    }[variant]
+
+    photos = []
+    for name in sorted(os.listdir(photo_dir)):
+        with open(os.path.join(photo_dir, name), 'rb') as f:
+            photos.append(f.read())
+    baseline_rss = peak_rss_kb()
+
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+    output_size = 0
+    for _ in range(ITERATIONS):
+        for photo in photos:
+            output_size = len(pipeline(photo))
+    elapsed = time.perf_counter() - start
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+
+    nb = ITERATIONS * len(photos)
+    cpu = (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime)
+    print(json.dumps({
+        'cpu_ms': cpu / nb * 1000,
+        'wall_ms': elapsed / nb * 1000,
+        'peak_rss_mb': peak_rss_kb() / 1024,
+        'extra_rss_mb': (peak_rss_kb() - baseline_rss) / 1024,
+        'output_kb': output_size / 1024,
+        'input_kb': sum(len(p) for p in photos) / len(photos) / 1024
+    }))
+
+def main():
+    # Photos générées une fois ici pour ne pas fausser le pic RSS des enfants
+    photo_dir = tempfile.mkdtemp(prefix='bench-images-')
+    for i, size in enumerate(PHOTO_SIZES):
+        with open(os.path.join(photo_dir, f'{i}.jpg'), 'wb') as f:
+            f.write(make_phone_photo(size))
+
+    print(f"🖼️  {len(PHOTO_SIZES)} photos x {ITERATIONS} itérations par variante")
+    print(f"{'variante':<10} {'CPU/photo':>10} {'mur/photo':>10} {'pic RSS':>9} {'RSS ajouté':>11} {'sortie':>8}")
+    for variant in ('legacy', 'pipeline', 'derivees'):
+        output = subprocess.run([sys.executable, __file__, variant, photo_dir],
+                                capture_output=True, text=True, check=True).stdout
+        r = json.loads(output)
+        print(f"{variant:<10} {r['cpu_ms']:>8.0f}ms {r['wall_ms']:>8.0f}ms "
+              f"{r['peak_rss_mb']:>7.0f}MB {r['extra_rss_mb']:>9.0f}MB {r['output_kb']:>6.0f}KB")
+    print(f"(taille moyenne des photos en entrée : {r['input_kb']:.0f} KB)")
+
+    for name in os.listdir(photo_dir):
+        os.remove(os.path.join(photo_dir, name))
+    os.rmdir(photo_dir)
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2:
+        run_variant(sys.argv[1], sys.argv[2])
+    else:
+        main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark du démarrage d'un worker : temps d'import de app.py et délai
+jusqu'à la première réponse, avec budget de non-régression
+
+Chaque mesure tourne dans un processus neuf avec `python -X importtime`,
+comme un worker gunicorn après un réveil de la machine Fly.io. Le script
+échoue (code de sortie 1) si :
+- la médiane de `import app` dépasse le budget (--budget-ms) ;
+- une dépendance lourde censée être chargée au premier usage (stripe,
+  Pillow, google-cloud-storage, alembic, requests) est importée au démarrage.
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules qui ne doivent pas être importés par `import app`
+DEFERRED_MODULES = ['stripe', 'PIL', 'google.cloud.storage', 'alembic', 'flask_migrate', 'requests']
+
+CHILD = """
+import sys, time, json
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/')
+answered = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'first_request_ms': (answered - start) * 1000,
+    'status': response.status_code,
+    'loaded': [m for m in %r if m in sys.modules and sys.modules[m] is not None],
+}))
+""" % (DEFERRED_MODULES,)
+
+def run_once():
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    measure = json.loads(result.stdout.strip().splitlines()[-1])
+
+    # Lignes "import time: self [us] | cumulative | module", les imports
+    # enfants (indentés de 2 espaces par niveau) avant leur parent
+    children, direct = [], {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        if depth == 1:
+            children.append((name.strip(), int(cumulative) / 1000))
+        elif depth == 0:
+            if name.strip() == 'app':
+                direct = dict(children)
+            children = []
+    return measure, direct
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps de démarrage d'un worker")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=float(os.environ.get('STARTUP_BUDGET_MS', 1000)))
+    parser.add_argument('--top', type=int, default=10, help="nombre de modules les plus lents à afficher")
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    import_ms = statistics.median(m['import_ms'] for m, _ in runs)
+    first_ms = statistics.median(m['first_request_ms'] for m, _ in runs)
+
+    print(f"🚀 Démarrage d'un worker (médiane de {args.runs} processus)")
+    print(f"   import app          : {import_ms:6.0f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"   première réponse    : {first_ms:6.0f} ms (GET /, statut {runs[0][0]['status']})")
+
+    modules = {}
+    for _, direct in runs:
+        for name, ms in direct.items():
+            modules.setdefault(name, []).append(ms)
+    print("📦 Imports directs de app.py les plus coûteux (cumulés) :")
+    for name, values in sorted(modules.items(), key=lambda m: -statistics.median(m[1]))[:args.top]:
+        print(f"   {statistics.median(values):7.1f} ms  {name}")
+
+    failed = False
+    loaded = sorted({m for measure, _ in runs for m in measure['loaded']})
+    if loaded:
+        print(f"❌ Importés au démarrage au lieu du premier usage : {', '.join(loaded)}")
+        failed = True
+    if import_ms > args.budget_ms:
+        print(f"❌ Budget dépassé : {import_ms:.0f} ms > {args.budget_ms:.0f} ms")
+        failed = True
+    if not failed:
+        print("✅ Dans le budget")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark de POST /api/upload-photo : JSON base64 contre corps binaire
+
+Pour des photos de tailles croissantes, mesure la taille envoyée, la
+latence et le pic de mémoire Python (tracemalloc) du worker web pendant
+la requête. Le bucket GCS est remplacé par un bucket en mémoire
+(scripts/fake_gcs.py) ; le redimensionnement tourne dans le pool
+d'images comme en production.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import base64
+import statistics
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Aucune requête SQL ici : une base SQLite jetable suffit à démarrer l'app
+os.environ.setdefault('DATABASE_URL', 'sqlite:////tmp/bench-upload.db')
+
+from PIL import Image
+
+# Dimensions choisies pour obtenir des JPEG d'environ 1, 3, 7 et 8.5 MB
+# (au-delà de 7.5 MB, le JSON base64 dépasse MAX_CONTENT_LENGTH)
+PHOTO_SIZES = [(1200, 900), (2000, 1500), (3200, 2400), (3600, 2700)]
+ITERATIONS = 5
+
+def make_photo(size, quality=95):
+    """Photo synthétique très bruitée (peu compressible)"""
+    noise = Image.effect_noise(size, 80)
+    gradient = Image.linear_gradient('L').resize(size)
+    image = Image.merge('RGB', (noise, gradient, Image.blend(gradient, noise, 0.7)))
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=quality)
+    return output.getvalue()
+
+def post_json(client, photo):
+    body = json.dumps({'photo': 'data:image/jpeg;base64,' + base64.b64encode(photo).decode('ascii')})
+    return len(body), client.post('/api/upload-photo', data=body, content_type='application/json')
+
+def post_binary(client, photo):
+    return len(photo), client.post('/api/upload-photo', data=photo, content_type='image/jpeg')
+
+def measure(client, send, photo):
+    """Latences (ms) et pic mémoire (MB) sur ITERATIONS envois"""
+    latencies = []
+    peak = 0
+    for _ in range(ITERATIONS):
+        tracemalloc.start()
+        start = time.perf_counter()
+        sent, response = send(client, photo)
+        latencies.append((time.perf_counter() - start) * 1000)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        if response.status_code != 200:
+            return sent, response.status_code, None, None
+    return sent, 200, statistics.median(latencies), peak / 1024 / 1024
+
+def main():
+    from app import create_app
+    from database import db
+    from services.storage import gcs_manager
+    from fake_gcs import install
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    install(gcs_manager)
+    client = app.test_client()
+
+    # Démarrer le pool d'images avant de mesurer
+    post_binary(client, make_photo((64, 64)))
+
+    print(f"📤 {ITERATIONS} uploads par variante (limite MAX_CONTENT_LENGTH : "
+          f"{app.config['MAX_CONTENT_LENGTH'] / 1024 / 1024:.0f} MB)")
+    print(f"{'photo':>8} {'variante':<8} {'envoyé':>9} {'p50':>8} {'pic mémoire':>12}")
+    for size in PHOTO_SIZES:
+        photo = make_photo(size)
+        label = f"{len(photo) / 1024 / 1024:.1f}MB"
+        for name, send in (('json', post_json), ('binaire', post_binary)):
+            sent, status, p50, peak = measure(client, send, photo)
+            if status != 200:
+                print(f"{label:>8} {name:<8} {sent / 1024 / 1024:>7.1f}MB   refusé (HTTP {status})")
+                continue
+            print(f"{label:>8} {name:<8} {sent / 1024 / 1024:>7.1f}MB {p50:>6.0f}ms {peak:>10.1f}MB")
+
+if __name__ == '__main__':
+    main()
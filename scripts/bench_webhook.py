@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Latence du webhook Stripe : traitement dans la requête contre accusé de réception immédiat
+
+Un générateur local envoie des événements Stripe signés (paiements
+réussis, échecs, doublons) à /webhook/stripe sous gunicorn, plusieurs en
+parallèle comme Stripe lors d'un pic. Deux modes sont comparés :
+
+- inline : comportement précédent, la commande est mise à jour et les
+  emails mis en file avant de répondre ;
+- ack : l'événement est seulement enregistré, le traitement se fait en
+  arrière-plan (services/stripe_events.py).
+
+Chaque requête SQL est ralentie de --db-latency-ms pour simuler
+l'aller-retour vers PostgreSQL. Affiche p50/p95/p99 du webhook et, en mode
+ack, le délai jusqu'au traitement du dernier événement.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import tempfile
+import threading
+import statistics
+import http.client
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, SCRIPTS)
+
+from bench_workers import start_server
+from fake_stripe import sign_payload, WEBHOOK_SECRET
+
+DB_PATH = os.path.join(tempfile.gettempdir(), 'bench-webhook.db')
+LOG_PATH = os.path.join(tempfile.gettempdir(), 'bench-webhook-gunicorn.log')
+
+def create_webhook_app():
+    """Application chargée par gunicorn ; BENCH_WEBHOOK_MODE=inline rétablit le traitement dans la requête"""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from app import app
+    from database import db
+    from models.stripe_events import StripeEvent, StatutEvenement
+    from services.stripe_events import stripe_event_processor
+
+    latency = float(os.environ.get('BENCH_DB_LATENCY', 0))
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _round_trip(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(latency)
+
+    if os.environ.get('BENCH_WEBHOOK_MODE') == 'inline':
+        record = stripe_event_processor.record
+
+        def record_inline(stripe_event, payload):
+            if not record(stripe_event, payload):
+                return False
+            # Ce que faisait le webhook avant de répondre
+            item = StripeEvent.query.filter_by(event_id=stripe_event['id']).one()
+            handler = stripe_event_processor.handlers.get(item.type)
+            if handler:
+                handler(item)
+            item.statut = StatutEvenement.PROCESSED
+            item.attempts = 1
+            db.session.commit()
+            return True
+
+        stripe_event_processor.record = record_inline
+    return app
+
+def prepare_database(database_url, orders):
+    """Schéma et commandes en attente de paiement"""
+    os.environ['DATABASE_URL'] = database_url
+    from app import app
+    from database import db
+    from models.commandes import Commande
+
+    with app.app_context():
+        db.create_all()
+        commandes = [Commande(nom='Bench webhook', email='client@example.com', telephone='0600000000',
+                              entreprise='Bench', total=25) for _ in range(orders)]
+        db.session.add_all(commandes)
+        db.session.commit()
+        return [commande.id for commande in commandes]
+
+def make_events(commande_ids, failure_ratio, duplicate_ratio):
+    """Événements signés dans l'ordre d'envoi (un doublon suit de près l'original)"""
+    events = []
+    for commande_id in commande_ids:
+        if random.random() < failure_ratio:
+            obj = {'id': f'pi_{uuid.uuid4().hex[:24]}', 'object': 'payment_intent',
+                   'metadata': {'commande_id': str(commande_id)},
+                   'last_payment_error': {'message': 'Votre carte a été refusée.'}}
+            event_type = 'payment_intent.payment_failed'
+        else:
+            obj = {'id': f'cs_test_{uuid.uuid4().hex}', 'object': 'checkout.session',
+                   'payment_status': 'paid', 'payment_intent': f'pi_{uuid.uuid4().hex[:24]}',
+                   'metadata': {'commande_id': str(commande_id)}}
+            event_type = 'checkout.session.completed'
+        payload = json.dumps({'id': f'evt_{uuid.uuid4().hex}', 'object': 'event', 'type': event_type,
+                              'created': int(time.time()), 'data': {'object': obj}})
+        events.append(payload)
+        if random.random() < duplicate_ratio:
+            events.append(payload)
+    return events
+
+def send_events(port, events, senders):
+    """Envoyer les événements avec `senders` connexions parallèles ; retourne (latences ms, erreurs)"""
+    latencies, errors = [], []
+    lock = threading.Lock()
+    pending = iter(events)
+
+    def sender():
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        while True:
+            with lock:
+                payload = next(pending, None)
+            if payload is None:
+                break
+            headers = {'Content-Type': 'application/json', 'Stripe-Signature': sign_payload(payload)}
+            start = time.perf_counter()
+            try:
+                connection.request('POST', '/webhook/stripe', payload, headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                status = type(e).__name__
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                if status == 200:
+                    latencies.append(elapsed)
+                else:
+                    errors.append(status)
+        connection.close()
+
+    threads = [threading.Thread(target=sender) for _ in range(senders)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+def wait_processed(database_url, timeout=120):
+    """Attendre que tous les événements enregistrés soient traités ; retourne le délai (s)"""
+    from sqlalchemy import create_engine, text
+    engine = create_engine(database_url)
+    start = time.perf_counter()
+    try:
+        while time.perf_counter() - start < timeout:
+            with engine.connect() as connection:
+                pending = connection.execute(text("SELECT COUNT(*) FROM stripe_events WHERE statut = 'PENDING'")).scalar()
+            if not pending:
+                return time.perf_counter() - start
+            time.sleep(0.05)
+        return None
+    finally:
+        engine.dispose()
+
+def percentile(values, p):
+    cuts = statistics.quantiles(values, n=100) if len(values) > 1 else values * 99
+    return cuts[p - 1]
+
+def main():
+    parser = argparse.ArgumentParser(description="Latence du webhook Stripe, traitement dans la requête contre accusé de réception")
+    parser.add_argument('--events', type=int, default=400, help="commandes payées (hors doublons)")
+    parser.add_argument('--senders', type=int, default=16, help="livraisons simultanées")
+    parser.add_argument('--failure-ratio', type=float, default=0.1, help="part de paiements en échec")
+    parser.add_argument('--duplicate-ratio', type=float, default=0.1, help="part d'événements livrés deux fois")
+    parser.add_argument('--db-latency-ms', type=float, default=2, help="aller-retour simulé par requête SQL")
+    parser.add_argument('--config', default='gthread:2x12', help="configuration gunicorn, classe:workers[xthreads]")
+    parser.add_argument('--database-url', help="base de test dédiée (défaut : SQLite jetable, écritures sérialisées)")
+    parser.add_argument('--port', type=int, default=8091)
+    args = parser.parse_args()
+
+    from loadtest import parse_config
+
+    _, overrides = parse_config(args.config)
+    env = dict(os.environ, FLASK_ENV='production', STRIPE_SECRET_KEY='sk_test_bench',
+               STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET, BENCH_DB_LATENCY=str(args.db_latency_ms / 1000),
+               **overrides)
+    env.pop('DB_POOL_SIZE', None)
+
+    print(f"📨 {args.events} paiements, {args.duplicate_ratio:.0%} de doublons, {args.senders} livraisons simultanées, "
+          f"{args.db_latency_ms:.0f} ms par requête SQL, {args.config}")
+    print(f"   logs de l'application : {LOG_PATH}")
+    print(f"   {'mode':<8} {'req':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  traitement  erreurs")
+    database_url = args.database_url or f'sqlite:///{DB_PATH}'
+    if not args.database_url and os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    # Des commandes distinctes pour chaque mode, toutes en attente de paiement
+    commande_ids = prepare_database(database_url, 2 * (args.events + 20))
+
+    log = open(LOG_PATH, 'w')
+    try:
+        for index, mode in enumerate(('inline', 'ack')):
+            ids = commande_ids[index * (args.events + 20):(index + 1) * (args.events + 20)]
+            events = make_events(ids[20:], args.failure_ratio, args.duplicate_ratio)
+            warmup = make_events(ids[:20], 0, 0)
+
+            server = start_server(args.port, dict(env, DATABASE_URL=database_url, BENCH_WEBHOOK_MODE=mode),
+                                  'bench_webhook:create_webhook_app()', log)
+            try:
+                send_events(args.port, warmup, args.senders)
+                wait_processed(database_url)
+                latencies, errors = send_events(args.port, events, args.senders)
+                lag = wait_processed(database_url)
+            finally:
+                server.terminate()
+                server.wait()
+
+            processed = f"{lag * 1000:7.0f} ms" if lag is not None else "  timeout"
+            print(f"   {mode:<8} {len(latencies):>5} {percentile(latencies, 50):6.1f}ms {percentile(latencies, 95):6.1f}ms "
+                  f"{percentile(latencies, 99):6.1f}ms {max(latencies):6.1f}ms  {processed}  {len(errors)}")
+    finally:
+        log.close()
+        if not args.database_url and os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+
+if __name__ == '__main__':
+    main()
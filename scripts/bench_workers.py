@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Test de charge local : débit de gunicorn selon le modèle de workers
+
+Lance gunicorn avec gunicorn.conf.py pour chaque configuration (sync,
+gthread, gevent si installé). Pendant quelques secondes, des clients
+envoient des photos en boucle (appels GCS lents simulés par un bucket en
+mémoire avec latence) pendant que des visiteurs consultent le catalogue
+des prestations (base SQLite). Affiche le débit et les latences p50/p95 :
+avec des workers sync, quelques uploads suffisent à bloquer le site.
+"""
+
+import io
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import threading
+import statistics
+import subprocess
+import http.client
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, SCRIPTS)
+
+DB_PATH = os.path.join(tempfile.gettempdir(), 'bench-workers.db')
+
+def create_bench_app():
+    """Application chargée par gunicorn dans chaque worker"""
+    from app import app
+    from services.storage import gcs_manager
+    from fake_gcs import install
+    install(gcs_manager, latency=float(os.environ.get('BENCH_GCS_LATENCY', 0.1)))
+    return app
+
+def make_photo():
+    """Petite photo unique (pas de déduplication), traitement rapide"""
+    from PIL import Image
+    image = Image.effect_noise((320, 240), random.randint(20, 90)).convert('RGB')
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=85)
+    return output.getvalue()
+
+def start_server(port, env, app_factory='bench_workers:create_bench_app()', output=None):
+    """Lancer gunicorn avec gunicorn.conf.py et attendre qu'il réponde"""
+    command = [sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py'),
+               '--pythonpath', f'{ROOT},{SCRIPTS}', '--bind', f'127.0.0.1:{port}',
+               '--log-level', 'warning', app_factory]
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=output, stderr=output)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', '/api/prestations')
+            if connection.getresponse().status == 200:
+                return server
+        except OSError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("gunicorn n'a pas démarré")
+
+def run_load(port, uploaders, browsers, think, duration, photos):
+    """Clients d'upload en boucle et visiteurs qui consultent le catalogue"""
+    results = {'upload-photo': [], 'prestations': []}
+    errors = []
+    lock = threading.Lock()
+    stop = time.time() + duration
+
+    def client(index, upload):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        i = index
+        while time.time() < stop:
+            if upload:
+                name, method, path, body, headers = ('upload-photo', 'POST', '/api/upload-photo',
+                                                     photos[i % len(photos)], {'Content-Type': 'image/jpeg'})
+            else:
+                name, method, path, body, headers = 'prestations', 'GET', '/api/prestations', None, {}
+            i += uploaders
+            start = time.perf_counter()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                status = type(e).__name__
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                if status == 200:
+                    results[name].append(elapsed)
+                else:
+                    errors.append(status)
+            if status == 503:
+                # Pool d'images saturé : le client réessaie après Retry-After
+                time.sleep(float(response.getheader('Retry-After', 1)))
+            elif not upload:
+                time.sleep(think)
+
+    threads = [threading.Thread(target=client, args=(i, True)) for i in range(uploaders)]
+    threads += [threading.Thread(target=client, args=(i, False)) for i in range(browsers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+def percentile(values, p):
+    if not values:
+        return float('nan')
+    return statistics.quantiles(values, n=100)[p - 1] if len(values) > 1 else values[0]
+
+def main():
+    parser = argparse.ArgumentParser(description="Débit de gunicorn selon le modèle de workers")
+    parser.add_argument('--uploaders', type=int, default=8, help="clients qui envoient des photos en boucle")
+    parser.add_argument('--browsers', type=int, default=8, help="visiteurs qui consultent le catalogue")
+    parser.add_argument('--think-ms', type=float, default=100, help="pause d'un visiteur entre deux pages")
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--gcs-latency-ms', type=float, default=100, help="latence simulée par appel GCS")
+    parser.add_argument('--port', type=int, default=8089)
+    args = parser.parse_args()
+
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{DB_PATH}', FLASK_ENV='production',
+               BENCH_GCS_LATENCY=str(args.gcs_latency_ms / 1000))
+    env.pop('DB_POOL_SIZE', None)
+
+    # Schéma créé une fois, avant le démarrage des workers
+    os.environ.update(DATABASE_URL=env['DATABASE_URL'])
+    from app import app
+    from database import db
+    with app.app_context():
+        db.create_all()
+
+    photos = [make_photo() for _ in range(200)]
+    configs = [('sync', {'GUNICORN_WORKER_CLASS': 'sync', 'GUNICORN_WORKERS': '2'}),
+               ('gthread', {'GUNICORN_WORKER_CLASS': 'gthread', 'GUNICORN_WORKERS': '2'})]
+    if importlib.util.find_spec('gevent'):
+        configs.append(('gevent', {'GUNICORN_WORKER_CLASS': 'gevent', 'GUNICORN_WORKERS': '2'}))
+
+    print(f"🔥 {args.uploaders} uploads en boucle + {args.browsers} visiteurs pendant {args.duration:.0f} s, "
+          f"latence GCS simulée {args.gcs_latency_ms:.0f} ms par appel")
+    try:
+        for name, overrides in configs:
+            server = start_server(args.port, dict(env, **overrides))
+            try:
+                # Mise en route (pool d'images, connexions SQLite), non mesurée
+                run_load(args.port, args.uploaders, args.browsers, args.think_ms / 1000, 3, photos)
+                results, errors = run_load(args.port, args.uploaders, args.browsers, args.think_ms / 1000,
+                                           args.duration, photos)
+            finally:
+                server.terminate()
+                server.wait()
+            total = sum(len(v) for v in results.values())
+            print(f"\n⚙️  {name} ({overrides['GUNICORN_WORKERS']} workers) : "
+                  f"{total / args.duration:.1f} req/s, {len(errors)} erreurs"
+                  + (f" ({', '.join(sorted(set(map(str, errors))))})" if errors else ""))
+            for endpoint, latencies in results.items():
+                print(f"   {endpoint:<13} {len(latencies):>5} req  "
+                      f"p50 {percentile(latencies, 50):7.0f} ms  p95 {percentile(latencies, 95):7.0f} ms")
+    finally:
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,9 @@
 #!/bin/bash
 
-echo "Initializing database..."
-# Initialize db tables if they don't exist
-python -c "
-from app import create_app
-from database import db
-app = create_app()
-with app.app_context():
-    db.create_all()
-    print('Database tables created/verified')
-" || echo "Database initialization warning, continuing..."
+echo "Checking database schema..."
+# Une requête si la base est à jour, migrations Alembic sous verrou sinon
+python scripts/migrate.py || exit 1
 
 echo "Starting application..."
-exec gunicorn --bind 0.0.0.0:8080 --workers 2 --timeout 120 app:app
\ No newline at end of file
+# Workers, threads et timeout : voir gunicorn.conf.py
+exec gunicorn app:app
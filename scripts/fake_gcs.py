@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Bucket Google Cloud Storage en mémoire pour les benchmarks et tests locaux
+
+Imite le sous-ensemble de google.cloud.storage utilisé par GCSManager
+(blob, get_blob, list_blobs, upload/download, copy_blob, md5_hash, delete,
+sessions d'upload et PUT du navigateur avec put()). Compte les
+téléchargements et les copies (downloads, copies).
+Usage :
+
+    from services.storage import gcs_manager
+    from fake_gcs import install
+    bucket = install(gcs_manager)
+"""
+
+import time
+import base64
+import hashlib
+import threading
+import contextlib
+from datetime import datetime, timezone
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+class FakeBlob:
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self.content_type = None
+        self.cache_control = None
+        self.metadata = None
+        self.size = None
+        self.updated = None
+        self.md5_hash = None
+        self.data = None
+
+    def upload_from_string(self, data, content_type=None, if_generation_match=None, **kwargs):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.data = data
+        self.size = len(data)
+        self.md5_hash = base64.b64encode(hashlib.md5(data).digest()).decode()
+        self.content_type = content_type
+        self.bucket._store(self, create_only=if_generation_match == 0)
+
+    def upload_from_file(self, file_obj, content_type=None, **kwargs):
+        self.upload_from_string(file_obj.read(), content_type=content_type)
+
+    def download_as_bytes(self, start=None, end=None, **kwargs):
+        data = self.bucket._load(self.name).data
+        with self.bucket._lock:
+            self.bucket.downloads += 1
+        if start is None and end is None:
+            return data
+        return data[start or 0:(end + 1) if end is not None else None]
+
+    def create_resumable_upload_session(self, content_type=None, size=None, origin=None, **kwargs):
+        upload_url = f'https://fake-gcs.local/upload/{self.name}?size={size}'
+        with self.bucket._lock:
+            self.bucket.sessions[upload_url] = (self.name, size)
+        return upload_url
+
+    def generate_signed_url(self, expiration=None, method='GET', **kwargs):
+        return f'https://fake-gcs.local/signed/{self.name}'
+
+    def exists(self, **kwargs):
+        return self.bucket._exists(self.name)
+
+    def reload(self, **kwargs):
+        stored = self.bucket._load(self.name)
+        self.data = stored.data
+        self.size = stored.size
+        self.content_type = stored.content_type
+        self.md5_hash = stored.md5_hash
+        self.metadata = stored.metadata
+        self.updated = stored.updated
+
+    def patch(self, **kwargs):
+        stored = self.bucket._load(self.name)
+        stored.metadata = self.metadata
+        stored.updated = datetime.now(timezone.utc)
+        self.updated = stored.updated
+
+    def delete(self, **kwargs):
+        self.bucket._delete(self.name)
+
+class FakeBucket:
+    def __init__(self, name='fake-bucket', latency=0):
+        self.name = name
+        # Délai simulé de chaque appel réseau (secondes), lock relâché
+        self.latency = latency
+        self.objects = {}
+        self.sessions = {}
+        self.batches = 0
+        self.downloads = 0
+        self.copies = 0
+        self._lock = threading.Lock()
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+    def get_blob(self, name, **kwargs):
+        self._wait()
+        with self._lock:
+            return self.objects.get(name)
+
+    def put(self, upload_url, data, content_type='image/jpeg'):
+        """Le PUT du navigateur sur une URL de create_resumable_upload_session()"""
+        with self._lock:
+            name, size = self.sessions.pop(upload_url)
+        if size is not None and len(data) != size:
+            raise ValueError(f'{len(data)} octets envoyés pour une session de {size}')
+        self.blob(name).upload_from_string(data, content_type=content_type)
+        return name
+
+    def copy_blob(self, blob, destination_bucket, new_name=None, if_generation_match=None, **kwargs):
+        """Copie côté serveur : les octets ne passent pas par le client"""
+        source = self._load(blob.name)
+        copy = destination_bucket.blob(new_name or blob.name)
+        copy.data = source.data
+        copy.size = source.size
+        copy.md5_hash = source.md5_hash
+        copy.content_type = source.content_type
+        copy.cache_control = source.cache_control
+        copy.metadata = dict(source.metadata) if source.metadata else None
+        destination_bucket._store(copy, create_only=if_generation_match == 0)
+        with self._lock:
+            self.copies += 1
+        return copy
+
+    def list_blobs(self, prefix=None, **kwargs):
+        with self._lock:
+            blobs = [b for n, b in sorted(self.objects.items()) if not prefix or n.startswith(prefix)]
+        return iter(blobs)
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _store(self, blob, create_only=False):
+        self._wait()
+        blob.updated = datetime.now(timezone.utc)
+        with self._lock:
+            if create_only and blob.name in self.objects:
+                raise PreconditionFailed(blob.name)
+            self.objects[blob.name] = blob
+
+    def _load(self, name):
+        self._wait()
+        with self._lock:
+            if name not in self.objects:
+                raise NotFound(name)
+            return self.objects[name]
+
+    def _exists(self, name):
+        with self._lock:
+            return name in self.objects
+
+    def _delete(self, name):
+        self._wait()
+        with self._lock:
+            if self.objects.pop(name, None) is None:
+                raise NotFound(name)
+
+class FakeClient:
+    def __init__(self, bucket):
+        self._bucket = bucket
+
+    def bucket(self, name):
+        return self._bucket
+
+    def list_blobs(self, bucket_or_name, prefix=None, page_size=None, **kwargs):
+        return FakeIterator(list(self._bucket.list_blobs(prefix=prefix)), page_size or 1000)
+
+    def batch(self, raise_exception=True):
+        # Deletions are applied immediately; the context only counts requests
+        self._bucket.batches += 1
+        return contextlib.nullcontext()
+
+class FakeIterator:
+    """Listing split in pages, like google.api_core.page_iterator.HTTPIterator"""
+
+    def __init__(self, blobs, page_size):
+        self._blobs = blobs
+        self._page_size = page_size
+
+    def __iter__(self):
+        return iter(self._blobs)
+
+    @property
+    def pages(self):
+        for i in range(0, len(self._blobs), self._page_size):
+            yield iter(self._blobs[i:i + self._page_size])
+
+def install(manager, bucket_name='fake-bucket', latency=0):
+    """Brancher un bucket en mémoire sur un GCSManager et le retourner"""
+    bucket = FakeBucket(bucket_name, latency)
+    manager.bucket_name = bucket_name
+    manager.bucket = bucket
+    manager.client = FakeClient(bucket)
+    return bucket
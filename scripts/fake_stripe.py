@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+API Stripe locale pour les tests de charge (sessions Checkout uniquement)
+
+Imite les deux appels faits par l'application, avec une latence réglable :
+POST /v1/checkout/sessions (en-tête Idempotency-Key respecté) et
+GET /v1/checkout/sessions/<id>. Les
+paiements sont simulés par pay(), qui marque la session payée et retourne
+le webhook checkout.session.completed signé comme le ferait Stripe.
+Usage :
+
+    from fake_stripe import start_fake_stripe
+    stripe_api = start_fake_stripe(latency=0.3)
+    # dans le worker : stripe.api_base = stripe_api.url
+"""
+
+import hmac
+import json
+import time
+import uuid
+import hashlib
+import threading
+from urllib.parse import parse_qsl
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+WEBHOOK_SECRET = 'whsec_loadtest'
+
+def sign_payload(payload, secret=WEBHOOK_SECRET, timestamp=None):
+    """En-tête Stripe-Signature d'un webhook (schéma v1 : HMAC-SHA256 de "t.payload")"""
+    timestamp = int(timestamp or time.time())
+    signature = hmac.new(secret.encode(), f'{timestamp}.{payload}'.encode(), hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={signature}'
+
+def _unflatten(pairs):
+    """metadata[commande_id]=12 -> {'metadata': {'commande_id': '12'}} (un niveau suffit)"""
+    result = {}
+    for key, value in pairs:
+        if '[' in key:
+            name, sub = key.split('[', 1)
+            result.setdefault(name, {})
+            if isinstance(result[name], dict):
+                result[name][sub.split(']', 1)[0]] = value
+        else:
+            result[key] = value
+    return result
+
+class FakeStripe:
+    def __init__(self, latency=0):
+        self.latency = latency
+        self.sessions = {}
+        self.idempotent = {}
+        self.calls = {'create': 0, 'retrieve': 0, 'expire': 0}
+        self._lock = threading.Lock()
+        self.server = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def create_session(self, params, idempotency_key=None):
+        with self._lock:
+            self.calls['create'] += 1
+            if idempotency_key in self.idempotent:
+                return self.idempotent[idempotency_key]
+        session_id = f'cs_test_{uuid.uuid4().hex}'
+        session = {
+            'id': session_id,
+            'object': 'checkout.session',
+            'url': f'https://checkout.stripe.com/c/pay/{session_id}',
+            'status': 'open',
+            'payment_status': 'unpaid',
+            'payment_intent': None,
+            'expires_at': int(time.time()) + 24 * 3600,
+            'customer_email': params.get('customer_email'),
+            'metadata': params.get('metadata', {}),
+        }
+        with self._lock:
+            self.sessions[session_id] = session
+            if idempotency_key:
+                self.idempotent[idempotency_key] = session
+        return session
+
+    def retrieve_session(self, session_id):
+        with self._lock:
+            self.calls['retrieve'] += 1
+            return self.sessions.get(session_id)
+
+    def expire_session(self, session_id):
+        """Comme Stripe : seule une session ouverte peut être expirée"""
+        with self._lock:
+            self.calls['expire'] += 1
+            session = self.sessions.get(session_id)
+            if session is None or session['status'] != 'open':
+                return None
+            session['status'] = 'expired'
+            return session
+
+    def pay(self, session_id):
+        """Marquer la session payée ; retourne (payload, en-tête de signature) du webhook"""
+        with self._lock:
+            session = self.sessions[session_id]
+            session.update(status='complete', payment_status='paid',
+                           payment_intent=f'pi_{uuid.uuid4().hex[:24]}')
+            event = {
+                'id': f'evt_{uuid.uuid4().hex}',
+                'object': 'event',
+                'type': 'checkout.session.completed',
+                'created': int(time.time()),
+                'data': {'object': dict(session)},
+            }
+        payload = json.dumps(event)
+        return payload, sign_payload(payload)
+
+def _handler(stripe_api):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _reply(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            params = _unflatten(parse_qsl(self.rfile.read(length).decode()))
+            time.sleep(stripe_api.latency)
+            path = self.path.rstrip('/')
+            prefix = '/v1/checkout/sessions/'
+            if path == '/v1/checkout/sessions':
+                self._reply(200, stripe_api.create_session(params, self.headers.get('Idempotency-Key')))
+            elif path.startswith(prefix) and path.endswith('/expire'):
+                session = stripe_api.expire_session(path[len(prefix):-len('/expire')])
+                if session:
+                    self._reply(200, session)
+                else:
+                    self._reply(400, {'error': {'type': 'invalid_request_error',
+                                                'message': 'Only Checkout Sessions with a status of open can be expired'}})
+            else:
+                self._reply(404, {'error': {'type': 'invalid_request_error', 'message': 'Unknown path'}})
+
+        def do_GET(self):
+            time.sleep(stripe_api.latency)
+            prefix = '/v1/checkout/sessions/'
+            session = stripe_api.retrieve_session(self.path[len(prefix):]) if self.path.startswith(prefix) else None
+            if session:
+                self._reply(200, session)
+            else:
+                self._reply(404, {'error': {'type': 'invalid_request_error', 'message': 'No such checkout.session'}})
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+def start_fake_stripe(latency=0, port=0):
+    """Démarrer l'API dans un thread ; retourne l'instance FakeStripe"""
+    stripe_api = FakeStripe(latency)
+    stripe_api.server = ThreadingHTTPServer(('127.0.0.1', port), _handler(stripe_api))
+    threading.Thread(target=stripe_api.server.serve_forever, daemon=True).start()
+    return stripe_api
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Nettoyage des photos orphelines du bucket Google Cloud Storage
+
+Supprime les photos (et leurs déclinaisons) qu'aucune paire ne référence
+et qui n'ont pas bougé depuis le délai de grâce (paniers abandonnés,
+photos reprises). À lancer périodiquement, par exemple :
+
+    fly machine run . --schedule daily --command "python scripts/gc_photos.py"
+"""
+
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def format_size(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{size} B"
+        size /= 1024
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dry-run', action='store_true', help="lister sans supprimer")
+    parser.add_argument('--grace-hours', type=int, help="délai de grâce (défaut : PHOTO_GC_GRACE_HOURS ou 48)")
+    args = parser.parse_args()
+
+    from datetime import timedelta
+    from app import create_app
+    from services.photo_gc import photo_gc
+
+    if args.grace_hours is not None:
+        photo_gc.grace_period = timedelta(hours=args.grace_hours)
+
+    app = create_app()
+    with app.app_context():
+        report = photo_gc.run(dry_run=args.dry_run)
+
+    action = "à supprimer" if args.dry_run else "supprimés"
+    print(f"🧹 {report['scanned']} objets analysés ({format_size(report['scanned_bytes'])}, {report['pages']} pages)")
+    print(f"   référencés : {report['referenced']} · récents : {report['recent']}")
+    print(f"   {action} : {report['deleted']} ({format_size(report['bytes_reclaimed'])})")
+    if report['errors']:
+        print(f"⚠️  {report['errors']} suppressions en échec")
+    print(f"⏱️  {report['duration_s']} s")
+    return 1 if report['errors'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Test de charge du parcours de commande, avec Stripe, GCS et SMTP locaux
+
+Chaque utilisateur virtuel enchaîne le parcours réel d'un client :
+/choix-prestation → /api/upload-photo → /api/commande/checkout (commande
+et session Stripe) → paiement (webhook /webhook/stripe signé) → retour
+/checkout?session_id=...
+
+L'application tourne sous gunicorn (gunicorn.conf.py) pour chaque
+configuration demandée. Stripe est remplacé par une API locale
+(fake_stripe.py), le bucket par un bucket en mémoire (fake_gcs.py), Gmail
+par le serveur SMTP de test (smtp_stub.py) ; chacun avec une latence
+réglable. Affiche débit et latences p50/p95/p99 par endpoint. --save
+enregistre les résultats, --compare les compare à une référence et échoue
+en cas de régression de capacité (avant une campagne de flyers par exemple).
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import statistics
+import http.client
+from collections import Counter, defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, SCRIPTS)
+
+from bench_workers import start_server, make_photo
+from fake_stripe import start_fake_stripe, WEBHOOK_SECRET
+
+DB_PATH = os.path.join(tempfile.gettempdir(), 'loadtest.db')
+LOG_PATH = os.path.join(tempfile.gettempdir(), 'loadtest-gunicorn.log')
+
+ENDPOINTS = ['GET /choix-prestation', 'POST /api/upload-photo', 'POST /api/commande/checkout',
+             'POST /webhook/stripe', 'GET /checkout']
+
+def create_loadtest_app():
+    """Application chargée par gunicorn dans chaque worker, branchée sur les services locaux"""
+    import stripe
+    from app import app
+    from services.storage import gcs_manager
+    from fake_gcs import install
+    install(gcs_manager, latency=float(os.environ['LOADTEST_GCS_LATENCY']))
+    stripe.api_base = os.environ['LOADTEST_STRIPE_URL']
+    return app
+
+class VirtualUser:
+    """Un client qui passe commande du début à la fin, connexion keep-alive"""
+
+    def __init__(self, port, stats, stripe_api, prestation_ids, photos, think):
+        self.port = port
+        self.stats = stats
+        self.stripe_api = stripe_api
+        self.prestation_ids = prestation_ids
+        self.photos = photos
+        self.think = think
+        self.connection = None
+
+    def request(self, name, method, path, body=None, headers=None):
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        start = time.perf_counter()
+        try:
+            self.connection.request(method, path, body=body, headers=headers or {})
+            response = self.connection.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException) as e:
+            self.connection.close()
+            self.connection = None
+            data, status = b'', type(e).__name__
+        self.stats.record(name, (time.perf_counter() - start) * 1000, status)
+        return status, data
+
+    def post_json(self, name, path, payload):
+        status, data = self.request(name, 'POST', path, json.dumps(payload), {'Content-Type': 'application/json'})
+        return json.loads(data) if status == 200 else None
+
+    def order(self, index):
+        """Un parcours complet ; retourne True si la commande est payée"""
+        status, _ = self.request('GET /choix-prestation', 'GET', '/choix-prestation')
+        if status != 200:
+            return False
+        time.sleep(self.think)
+
+        status, data = self.request('POST /api/upload-photo', 'POST', '/api/upload-photo',
+                                    self.photos[index % len(self.photos)], {'Content-Type': 'image/jpeg'})
+        if status != 200:
+            return False
+        photo = json.loads(data)
+        time.sleep(self.think)
+
+        result = self.post_json('POST /api/commande/checkout', '/api/commande/checkout', {
+            'nom': 'Test de charge',
+            'email': 'client@example.com',
+            'telephone': '0600000000',
+            'entreprise': 'Loadtest',
+            'paires': [{
+                'type_chaussure': 'HOMME',
+                'prestations': self.prestation_ids[:2],
+                'photo_url': photo['photo_url'],
+                'gcs_path': photo['gcs_path'],
+                'photo_filename': photo['filename'],
+                'thumb_url': photo.get('thumb_url'),
+                'medium_url': photo.get('medium_url'),
+                'webp_url': photo.get('webp_url'),
+            }]
+        })
+        if not result:
+            return False
+        time.sleep(self.think)
+
+        # Le client paie sur Stripe, qui appelle le webhook puis le redirige
+        payload, signature = self.stripe_api.pay(result['session_id'])
+        status, _ = self.request('POST /webhook/stripe', 'POST', '/webhook/stripe', payload,
+                                 {'Content-Type': 'application/json', 'Stripe-Signature': signature})
+        if status != 200:
+            return False
+        status, _ = self.request('GET /checkout', 'GET', f"/checkout?session_id={result['session_id']}")
+        return status == 200
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(Counter)
+        self.orders = 0
+        self._lock = threading.Lock()
+        self.enabled = True
+
+    def record(self, name, elapsed_ms, status):
+        if not self.enabled:
+            return
+        with self._lock:
+            if status == 200:
+                self.latencies[name].append(elapsed_ms)
+            else:
+                self.errors[name][str(status)] += 1
+
+    def completed(self):
+        if self.enabled:
+            with self._lock:
+                self.orders += 1
+
+    def summary(self, duration):
+        endpoints = {}
+        for name in ENDPOINTS:
+            values = sorted(self.latencies.get(name, []))
+            cuts = statistics.quantiles(values, n=100) if len(values) > 1 else values * 99
+            endpoints[name] = {
+                'count': len(values),
+                'rps': len(values) / duration,
+                'p50': cuts[49] if cuts else None,
+                'p95': cuts[94] if cuts else None,
+                'p99': cuts[98] if cuts else None,
+                'errors': dict(self.errors.get(name, {})),
+            }
+        return {'orders_per_min': self.orders / duration * 60, 'endpoints': endpoints}
+
+def run_load(port, users, duration, stripe_api, prestation_ids, photos, think, stats):
+    stop = time.time() + duration
+
+    def user_loop(index):
+        user = VirtualUser(port, stats, stripe_api, prestation_ids, photos, think)
+        i = index
+        while time.time() < stop:
+            if user.order(i):
+                stats.completed()
+            else:
+                time.sleep(think)
+            i += users
+
+    threads = [threading.Thread(target=user_loop, args=(i,)) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def parse_config(spec):
+    """'gthread:2x12' -> ('gthread:2x12', variables d'environnement gunicorn)"""
+    worker_class, _, size = spec.partition(':')
+    workers, _, threads = (size or '2').partition('x')
+    env = {'GUNICORN_WORKER_CLASS': worker_class, 'GUNICORN_WORKERS': workers}
+    if threads:
+        env['GUNICORN_THREADS' if worker_class != 'gevent' else 'GUNICORN_WORKER_CONNECTIONS'] = threads
+    return spec, env
+
+def prepare_database(database_url):
+    """Créer le schéma et les prestations (catalogue de seed_data.py)"""
+    os.environ['DATABASE_URL'] = database_url
+    from app import app
+    from database import db
+    from models.prestations import Prestation
+    from models.enums import TypeChaussure
+    from seed_data import seed_prestations
+
+    with app.app_context():
+        db.create_all()
+        if not Prestation.query.filter_by(actif=True).count():
+            seed_prestations()
+            db.session.commit()
+        return [p.id for p in Prestation.query.filter_by(type_chaussure=TypeChaussure.HOMME, actif=True)
+                .order_by(Prestation.id)]
+
+def print_summary(name, summary, received_emails):
+    print(f"\n⚙️  {name} : {summary['orders_per_min']:.1f} commandes payées/min, {received_emails} emails reçus")
+    print(f"   {'endpoint':<34} {'req':>5} {'req/s':>6} {'p50':>7} {'p95':>7} {'p99':>7}  erreurs")
+    for endpoint, result in summary['endpoints'].items():
+        def ms(value):
+            return f"{value:5.0f}ms" if value is not None else "     -"
+        errors = ', '.join(f'{status}×{count}' for status, count in result['errors'].items())
+        print(f"   {endpoint:<34} {result['count']:>5} {result['rps']:>6.1f} "
+              f"{ms(result['p50']):>7} {ms(result['p95']):>7} {ms(result['p99']):>7}  {errors}")
+
+def compare(results, baseline, max_regression, min_delta_ms):
+    """Régressions de débit ou de p95 au-delà de max_regression (%) par rapport à la référence.
+
+    Les écarts de p95 inférieurs à min_delta_ms sont ignorés (bruit sur les
+    endpoints de quelques millisecondes).
+    """
+    regressions = []
+    tolerance = max_regression / 100
+    for name, summary in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        if summary['orders_per_min'] < reference['orders_per_min'] * (1 - tolerance):
+            regressions.append(f"{name} : {summary['orders_per_min']:.1f} commandes/min "
+                               f"(référence {reference['orders_per_min']:.1f})")
+        for endpoint, result in summary['endpoints'].items():
+            before = reference['endpoints'].get(endpoint, {}).get('p95')
+            if (before and result['p95'] and result['p95'] > before * (1 + tolerance)
+                    and result['p95'] - before > min_delta_ms):
+                regressions.append(f"{name} {endpoint} : p95 {result['p95']:.0f} ms (référence {before:.0f} ms)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge du parcours de commande")
+    parser.add_argument('--configs', default='sync:2,gthread:2x12',
+                        help="configurations gunicorn à comparer, classe:workers[xthreads] séparées par des virgules")
+    parser.add_argument('--users', type=int, default=10, help="utilisateurs virtuels simultanés")
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--think-ms', type=float, default=200, help="pause entre deux étapes du parcours")
+    parser.add_argument('--stripe-latency-ms', type=float, default=300)
+    parser.add_argument('--gcs-latency-ms', type=float, default=80)
+    parser.add_argument('--database-url', help="base de test dédiée (défaut : SQLite jetable)")
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--smtp-port', type=int, default=8026)
+    parser.add_argument('--save', help="enregistrer les résultats (JSON)")
+    parser.add_argument('--compare', help="résultats de référence (JSON) à ne pas dégrader")
+    parser.add_argument('--max-regression', type=float, default=20, help="écart toléré en %% (défaut 20)")
+    parser.add_argument('--min-delta-ms', type=float, default=50, help="écart de p95 ignoré en dessous (défaut 50 ms)")
+    args = parser.parse_args()
+
+    from smtp_stub import start_stub
+
+    database_url = args.database_url or f'sqlite:///{DB_PATH}'
+    if not args.database_url and os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+
+    stripe_api = start_fake_stripe(latency=args.stripe_latency_ms / 1000)
+    smtp, mailbox = start_stub(port=args.smtp_port, quiet=True)
+    prestation_ids = prepare_database(database_url)
+    photos = [make_photo() for _ in range(200)]
+
+    env = dict(os.environ,
+               DATABASE_URL=database_url,
+               FLASK_ENV='production',
+               STRIPE_SECRET_KEY='sk_test_loadtest',
+               STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET,
+               LOADTEST_STRIPE_URL=stripe_api.url,
+               LOADTEST_GCS_LATENCY=str(args.gcs_latency_ms / 1000),
+               SMTP_HOST='localhost', SMTP_PORT=str(args.smtp_port), SMTP_USER='test', SMTP_PASSWORD='test',
+               FROM_EMAIL='conciergerie@example.com', ADMIN_EMAIL='admin@example.com')
+    env.pop('DB_POOL_SIZE', None)
+
+    print(f"🔥 {args.users} utilisateurs pendant {args.duration:.0f} s, pause {args.think_ms:.0f} ms · "
+          f"latences simulées : Stripe {args.stripe_latency_ms:.0f} ms, GCS {args.gcs_latency_ms:.0f} ms")
+    print(f"   logs de l'application : {LOG_PATH}")
+    results = {}
+    log = open(LOG_PATH, 'w')
+    try:
+        for spec in args.configs.split(','):
+            name, overrides = parse_config(spec.strip())
+            server = start_server(args.port, dict(env, **overrides), 'loadtest:create_loadtest_app()', log)
+            stats = Stats()
+            try:
+                # Mise en route (pool d'images, connexions), non mesurée
+                stats.enabled = False
+                run_load(args.port, args.users, 3, stripe_api, prestation_ids, photos, args.think_ms / 1000, stats)
+                stats.enabled = True
+                emails_before = len(mailbox.messages)
+                run_load(args.port, args.users, args.duration, stripe_api, prestation_ids, photos,
+                         args.think_ms / 1000, stats)
+            finally:
+                server.terminate()
+                server.wait()
+            results[name] = stats.summary(args.duration)
+            print_summary(name, results[name], len(mailbox.messages) - emails_before)
+    finally:
+        log.close()
+        smtp.stop()
+        if not args.database_url and os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Résultats enregistrés dans {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.max_regression, args.min_delta_ms)
+        if regressions:
+            print(f"\n❌ Régressions (> {args.max_regression:.0f} %) :")
+            for regression in regressions:
+                print(f"   {regression}")
+            return 1
+        print(f"\n✅ Pas de régression par rapport à {args.compare}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
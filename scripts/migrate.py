@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Mise à jour du schéma de la base au démarrage d'une machine
+
+Appelé par scripts/entrypoint.sh avant gunicorn. Chemin rapide : une seule
+requête compare `alembic_version` à la révision head de migrations/versions
+et rend la main si elles correspondent, sans créer l'application Flask ni
+réfléchir le schéma. Sinon, `flask db upgrade` est appliqué sous un verrou
+consultatif PostgreSQL : si plusieurs machines démarrent en même temps, une
+seule migre, les autres attendent puis constatent que la base est à jour.
+Une base vide est créée depuis les modèles puis marquée à la révision head.
+"""
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MIGRATIONS_DIR = os.path.join(ROOT, 'migrations')
+
+# Clé arbitraire du verrou consultatif (pg_advisory_lock), propre à cette application
+ADVISORY_LOCK_KEY = 7240116
+
+def head_revisions():
+    """Révisions head des fichiers de migration (aucun accès à la base)"""
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+    alembic_config = Config(os.path.join(MIGRATIONS_DIR, 'alembic.ini'))
+    alembic_config.set_main_option('script_location', MIGRATIONS_DIR)
+    return set(ScriptDirectory.from_config(alembic_config).get_heads())
+
+def current_revisions(connection):
+    """Révisions appliquées, None si la table alembic_version n'existe pas"""
+    from sqlalchemy import text
+    from sqlalchemy.exc import DBAPIError
+    try:
+        return {row[0] for row in connection.execute(text('SELECT version_num FROM alembic_version'))}
+    except DBAPIError:
+        return None
+    finally:
+        connection.rollback()
+
+def upgrade():
+    """`flask db upgrade` dans un contexte applicatif"""
+    from flask_migrate import upgrade as alembic_upgrade
+    from app import create_app
+    from database import init_migrate
+
+    app = create_app()
+    init_migrate(app)
+    with app.app_context():
+        alembic_upgrade(directory=MIGRATIONS_DIR)
+
+def create():
+    """Base vide : tables créées depuis les modèles, marquées à la révision head"""
+    from flask_migrate import stamp
+    from app import create_app
+    from database import db, init_migrate
+
+    app = create_app()
+    init_migrate(app)
+    with app.app_context():
+        db.create_all()
+        stamp(directory=MIGRATIONS_DIR)
+
+def main():
+    from sqlalchemy import create_engine, inspect, text
+    from sqlalchemy.pool import NullPool
+    from config import config
+
+    start = time.perf_counter()
+    url = config[os.environ.get('FLASK_ENV', 'development')].SQLALCHEMY_DATABASE_URI
+    engine = create_engine(url, poolclass=NullPool)
+    heads = head_revisions()
+
+    with engine.connect() as connection:
+        current = current_revisions(connection)
+        if current == heads:
+            print(f"✅ Base à jour ({', '.join(sorted(heads))}), "
+                  f"vérifiée en {(time.perf_counter() - start) * 1000:.0f} ms")
+            return 0
+
+        postgres = engine.dialect.name == 'postgresql'
+        if postgres:
+            print("🔒 Attente du verrou de migration...")
+            connection.execute(text('SELECT pg_advisory_lock(:key)'), {'key': ADVISORY_LOCK_KEY})
+            connection.commit()
+        try:
+            # Une autre machine a pu migrer pendant l'attente du verrou
+            current = current_revisions(connection)
+            if current == heads:
+                print("✅ Base migrée par une autre machine")
+                return 0
+
+            if current is None and inspect(connection).has_table('commandes'):
+                # Base créée par db.create_all() sans historique Alembic : la révision
+                # s'indique à la main, le schéma ne suffit pas à la deviner.
+                # Démarrer quand même laisserait tourner le code sur un schéma inconnu.
+                print("❌ Tables existantes sans table alembic_version : lancer une fois "
+                      "`flask db stamp 002b` (base créée par l'ancien db.create_all(), "
+                      "voir deploy-production.md), puis redémarrer.",
+                      file=sys.stderr)
+                return 1
+
+            if current is None:
+                # 001 ne décrit pas les modèles : schéma de head créé directement
+                print(f"🆕 Base vide : création des tables (révision {', '.join(sorted(heads))})")
+                create()
+                print(f"✅ Base créée en {time.perf_counter() - start:.1f} s")
+                return 0
+
+            print(f"⬆️  Migration {', '.join(sorted(current))} → {', '.join(sorted(heads))}")
+            upgrade()
+            print(f"✅ Migrations appliquées en {time.perf_counter() - start:.1f} s")
+            return 0
+        finally:
+            if postgres:
+                connection.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': ADVISORY_LOCK_KEY})
+                connection.commit()
+
+if __name__ == '__main__':
+    sys.exit(main())
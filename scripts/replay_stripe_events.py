@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Rejeu des événements Stripe enregistrés par le webhook
+
+Remet en file des événements de la table stripe_events (par défaut ceux en
+échec) et les applique immédiatement à partir du payload stocké, sans
+attendre une nouvelle livraison de Stripe. Un paiement réussi ne modifie
+jamais deux fois une commande ; un échec de paiement renvoie son email si
+la commande attend toujours son paiement.
+
+    ./scripts/replay_stripe_events.py                      # événements en échec
+    ./scripts/replay_stripe_events.py --event evt_1Nx...   # un événement précis
+    ./scripts/replay_stripe_events.py --commande 42        # tous ceux d'une commande
+"""
+
+import os
+import sys
+import argparse
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--event', action='append', default=[], help="identifiant d'événement Stripe (répétable)")
+    parser.add_argument('--commande', type=int, action='append', default=[], help="identifiant de commande (répétable)")
+    parser.add_argument('--since', type=datetime.fromisoformat, help="événements reçus depuis (ex. 2026-10-18T09:00)")
+    parser.add_argument('--all', action='store_true', help="tous les statuts (défaut : en échec seulement)")
+    parser.add_argument('--dry-run', action='store_true', help="lister sans rejouer")
+    args = parser.parse_args()
+
+    from app import create_app
+    from database import db
+    from models.stripe_events import StripeEvent, StatutEvenement
+    from services.stripe_events import stripe_event_processor
+
+    app = create_app()
+    with app.app_context():
+        query = StripeEvent.query
+        if args.event:
+            query = query.filter(StripeEvent.event_id.in_(args.event))
+        if args.commande:
+            query = query.filter(StripeEvent.commande_id.in_(args.commande))
+        if args.since:
+            query = query.filter(StripeEvent.created_at >= args.since)
+        if not (args.all or args.event or args.commande):
+            query = query.filter(StripeEvent.statut == StatutEvenement.FAILED)
+        items = query.order_by(StripeEvent.created_at, StripeEvent.id).all()
+
+        for item in items:
+            print(f"   {item.event_id}  {item.type:<32} commande #{item.commande_id}  {item.statut.value}")
+        if args.dry_run or not items:
+            print(f"🔁 {len(items)} événements à rejouer")
+            return 0
+
+        stripe_event_processor.replay(items)
+        db.session.commit()
+        while stripe_event_processor.process_due() == stripe_event_processor.batch_size:
+            pass
+
+        ids = [item.id for item in items]
+        counts = dict(db.session.query(StripeEvent.statut, db.func.count())
+                      .filter(StripeEvent.id.in_(ids)).group_by(StripeEvent.statut).all())
+
+    print(f"🔁 {len(items)} événements rejoués : {counts.get(StatutEvenement.PROCESSED, 0)} traités")
+    failed = len(items) - counts.get(StatutEvenement.PROCESSED, 0)
+    if failed:
+        print(f"⚠️  {failed} en échec (nouvel essai en arrière-plan, voir last_error)")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -105,6 +105,22 @@ gcloud storage buckets add-iam-policy-binding gs://$BUCKET_NAME \
     --member=allUsers \
     --role=roles/storage.objectViewer
 
+# Autoriser l'upload direct des photos depuis le navigateur (URLs d'upload signées)
+echo "🌐 Configuration CORS pour l'upload direct..."
+CORS_FILE=$(mktemp)
+cat > $CORS_FILE <<EOF
+[
+  {
+    "origin": ["https://conciergeriecordo.com", "https://conciergerie-cordo.fly.dev", "http://localhost:8000", "http://localhost:5000"],
+    "method": ["PUT", "GET"],
+    "responseHeader": ["Content-Type"],
+    "maxAgeSeconds": 3600
+  }
+]
+EOF
+gcloud storage buckets update gs://$BUCKET_NAME --cors-file=$CORS_FILE
+rm -f $CORS_FILE
+
 # Vérifier si le service account existe déjà
 echo "🔍 Vérification de l'existence du service account..."
 SERVICE_ACCOUNT_EMAIL="$SERVICE_ACCOUNT_NAME@$PROJECT_ID.iam.gserviceaccount.com"
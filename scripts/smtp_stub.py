@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Serveur SMTP local de test (STARTTLS + AUTH acceptés, aucun email délivré)
+
+Remplace Gmail pour les tests et benchmarks d'envoi d'emails :
+
+    pip install aiosmtpd
+    ./scripts/smtp_stub.py --port 8025
+
+puis dans .env :
+
+    SMTP_HOST=localhost
+    SMTP_PORT=8025
+    SMTP_USER=test
+    SMTP_PASSWORD=test
+"""
+
+import os
+import ssl
+import sys
+import time
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+try:
+    from aiosmtpd.controller import Controller
+    from aiosmtpd.smtp import AuthResult
+except ImportError:
+    print("❌ aiosmtpd n'est pas installé : pip install aiosmtpd")
+    sys.exit(1)
+
+def create_tls_context():
+    """Créer un contexte TLS avec un certificat auto-signé (smtplib ne le vérifie pas)"""
+    from cryptography import x509
+    from cryptography.x509.oid import NameOID
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'localhost')])
+    cert = (x509.CertificateBuilder()
+            .subject_name(name)
+            .issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(datetime.utcnow() - timedelta(days=1))
+            .not_valid_after(datetime.utcnow() + timedelta(days=30))
+            .sign(key, hashes.SHA256()))
+
+    directory = tempfile.mkdtemp(prefix='smtp-stub-')
+    cert_path = os.path.join(directory, 'cert.pem')
+    key_path = os.path.join(directory, 'key.pem')
+    with open(cert_path, 'wb') as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, 'wb') as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM,
+                                  serialization.PrivateFormat.TraditionalOpenSSL,
+                                  serialization.NoEncryption()))
+
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert_path, key_path)
+    return context
+
+class RecordingHandler:
+    """Garde les messages reçus en mémoire"""
+
+    def __init__(self, quiet=False):
+        self.messages = []
+        self.quiet = quiet
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        if not self.quiet:
+            print(f"📧 {envelope.mail_from} -> {', '.join(envelope.rcpt_tos)} ({len(envelope.content)} octets)")
+        return '250 Message accepted for delivery'
+
+def accept_any_login(server, session, envelope, mechanism, auth_data):
+    return AuthResult(success=True)
+
+def start_stub(host='localhost', port=8025, quiet=False):
+    """Démarrer le serveur dans un thread ; retourne (controller, handler)"""
+    handler = RecordingHandler(quiet=quiet)
+    controller = Controller(
+        handler,
+        hostname=host,
+        port=port,
+        tls_context=create_tls_context(),
+        authenticator=accept_any_login,
+        auth_require_tls=True
+    )
+    controller.start()
+    return controller, handler
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serveur SMTP local de test')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args()
+
+    controller, handler = start_stub(args.host, args.port, args.quiet)
+    print(f"🚀 Serveur SMTP de test sur {args.host}:{args.port} (Ctrl+C pour arrêter)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        controller.stop()
+        print(f"\n✅ {len(handler.messages)} email(s) reçu(s)")
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Script pour tester l'upload direct des photos vers GCS
+
+Parcours /api/upload-url puis /api/upload-photo/finalize contre un bucket
+en mémoire (fake_gcs.py) : session signée, PUT du navigateur, finalisation,
+déclinaisons en arrière-plan, déduplication, déclinaisons enregistrées avec
+la commande, chemins refusés, contenu invalide et taille excessive.
+Base SQLite jetable, aucune configuration Google Cloud nécessaire.
+"""
+
+import io
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+DB_PATH = os.path.join(tempfile.gettempdir(), 'test-direct-upload.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+
+from PIL import Image
+from app import create_app
+from database import db
+from services.storage import gcs_manager
+from services.derivatives import derivative_builder
+from models.prestations import Prestation
+from models.enums import TypeChaussure
+from fake_gcs import install
+
+def make_jpeg(color, size=(640, 480)):
+    output = io.BytesIO()
+    Image.new('RGB', size, color).save(output, format='JPEG', quality=85)
+    return output.getvalue()
+
+def start_upload(client, data):
+    """/upload-url : session signée pour `data`"""
+    response = client.post('/api/upload-url', json={'size': len(data), 'content_type': 'image/jpeg'})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+def finalize(client, session):
+    return client.post('/api/upload-photo/finalize',
+                       json={'temp_id': session['temp_id'], 'gcs_path': session['gcs_path']})
+
+def test_direct_upload(client, bucket):
+    """Session signée, PUT du navigateur puis finalisation"""
+    print("🧪 Test de l'upload direct...")
+    photo = make_jpeg((200, 40, 40))
+
+    session = start_upload(client, photo)
+    assert session['upload_url'] in bucket.sessions
+    assert f"/{session['temp_id']}/{session['temp_id']}_" in session['gcs_path']
+    bucket.put(session['upload_url'], photo)
+
+    downloads = bucket.downloads
+    response = finalize(client, session)
+    data = response.get_json()
+    assert response.status_code == 200 and data['success'], data
+    assert data['gcs_path'] in bucket.objects and data['photo_url'].endswith(data['gcs_path'])
+    assert session['gcs_path'] not in bucket.objects, "objet temporaire conservé"
+    assert bucket.objects[data['gcs_path']].data == photo
+    assert not data['deduplicated'] and bucket.copies == 1
+    print(f"✅ Photo copiée dans le bucket sous {data['gcs_path']}, objet temporaire supprimé")
+
+    # Déclinaisons générées en arrière-plan (seul téléchargement de la photo,
+    # hors de la requête) : aucune URL tant qu'elles n'existent pas
+    assert data['derivatives_pending']
+    assert not any(f'{name}_url' in data for name in ('thumb', 'medium', 'webp')), data
+    derivative_builder.join()
+    assert bucket.downloads == downloads + 1, bucket.downloads - downloads
+    for name in ('thumb', 'medium', 'webp'):
+        assert gcs_manager.derivative_path(data['gcs_path'], name) in bucket.objects, name
+    assert set(bucket.objects[data['gcs_path']].metadata['derivatives'].split(',')) == {'thumb', 'medium', 'webp'}
+    print("✅ Déclinaisons générées hors de la requête")
+
+    # La même photo envoyée une seconde fois réutilise l'objet existant
+    again = start_upload(client, photo)
+    bucket.put(again['upload_url'], photo)
+    downloads = bucket.downloads
+    response = finalize(client, again)
+    second = response.get_json()
+    assert response.status_code == 200 and second['deduplicated'], second
+    assert not second['derivatives_pending'] and derivative_builder.pending() == 0
+    assert bucket.downloads == downloads and bucket.copies == 1
+    assert second['gcs_path'] == data['gcs_path'] and again['gcs_path'] not in bucket.objects
+    for name in ('thumb', 'medium', 'webp'):
+        assert second[f'{name}_url'].endswith(gcs_manager.derivative_path(data['gcs_path'], name))
+    print("✅ Photo identique dédupliquée par son MD5, sans copie ni téléchargement")
+    return data
+
+def test_order_derivatives(client, bucket, photo):
+    """La commande n'enregistre que les déclinaisons qui existent"""
+    print("🧪 Test des déclinaisons enregistrées avec la commande...")
+    with client.application.app_context():
+        prestation = Prestation(nom='Patins', prix=15, type_chaussure=TypeChaussure.HOMME, actif=True)
+        db.session.add(prestation)
+        db.session.commit()
+        prestation_id = prestation.id
+
+    # Photo dont la génération a été perdue (redémarrage avant la file)
+    lost = 'photos/md5/ee/' + 'e' * 32 + '.jpg'
+    bucket.blob(lost).upload_from_string(make_jpeg((40, 40, 200)), content_type='image/jpeg')
+
+    paires = [
+        # Déclinaisons terminées après la réponse de /finalize
+        {'gcs_path': photo['gcs_path'], 'photo_url': photo['photo_url']},
+        {'gcs_path': lost, 'photo_url': gcs_manager.public_url(lost),
+         'thumb_url': gcs_manager.public_url(gcs_manager.derivative_path(lost, 'thumb'))},
+    ]
+    response = client.post('/api/commande', json={
+        'nom': 'Test', 'email': 'test@example.com', 'telephone': '0000000000', 'entreprise': 'Test',
+        'paires': [{'type_chaussure': 'HOMME', 'prestations': [prestation_id], **paire} for paire in paires]
+    })
+    assert response.status_code == 200, response.get_json()
+    built, missing = response.get_json()['commande']['paires']
+
+    for name in ('thumb', 'medium', 'webp'):
+        assert built[f'photo_{name}_url'].endswith(gcs_manager.derivative_path(photo['gcs_path'], name))
+        assert missing[f'photo_{name}_url'] is None, missing
+    print("✅ Déclinaisons lues dans les métadonnées de la photo, absentes : photo complète")
+
+def test_invalid_path(client, bucket):
+    """Seuls les objets créés par /upload-url pour ce temp_id sont acceptés"""
+    print("🧪 Test des chemins refusés...")
+    photo = make_jpeg((40, 200, 40))
+    session = start_upload(client, photo)
+    bucket.put(session['upload_url'], photo)
+    other = start_upload(client, photo)
+
+    for gcs_path in ('photos/md5/aa/' + 'a' * 32 + '.jpg',
+                     other['gcs_path'],
+                     session['gcs_path'].replace('photos/', 'commandes/', 1)):
+        response = client.post('/api/upload-photo/finalize',
+                               json={'temp_id': session['temp_id'], 'gcs_path': gcs_path})
+        assert response.status_code == 400, (gcs_path, response.get_json())
+
+    response = client.post('/api/upload-photo/finalize',
+                           json={'temp_id': 'pas-un-uuid', 'gcs_path': session['gcs_path']})
+    assert response.status_code == 400
+    assert session['gcs_path'] in bucket.objects
+    print("✅ Chemin hors du préfixe temporaire : 400, objet intact")
+
+def test_invalid_content(client, bucket):
+    """Un objet qui n'est pas un JPEG de taille admise est supprimé"""
+    print("🧪 Test du contenu invalide...")
+    data = b'<html>pas une photo</html>'
+    session = start_upload(client, data)
+    bucket.put(session['upload_url'], data, content_type='text/html')
+
+    response = finalize(client, session)
+    assert response.status_code == 400, response.get_json()
+    assert session['gcs_path'] not in bucket.objects
+    print("✅ Contenu invalide : 400, objet temporaire supprimé")
+
+def test_oversize(app, client, bucket):
+    """Taille annoncée ou envoyée au-delà de MAX_CONTENT_LENGTH"""
+    print("🧪 Test des photos trop volumineuses...")
+    max_size = app.config['MAX_CONTENT_LENGTH']
+
+    sessions = len(bucket.sessions)
+    response = client.post('/api/upload-url', json={'size': max_size + 1, 'content_type': 'image/jpeg'})
+    assert response.status_code == 413 and len(bucket.sessions) == sessions
+    for size in (0, -1, '1000', None):
+        response = client.post('/api/upload-url', json={'size': size, 'content_type': 'image/jpeg'})
+        assert response.status_code == 400, size
+
+    # Objet plus grand que la limite écrit sans passer par la session
+    session = start_upload(client, b'x' * 1000)
+    bucket.blob(session['gcs_path']).upload_from_string(b'x' * (max_size + 1), content_type='image/jpeg')
+    response = finalize(client, session)
+    assert response.status_code == 400, response.get_json()
+    assert session['gcs_path'] not in bucket.objects
+    print("✅ Taille excessive : 413 à la création de la session, objet rejeté à la finalisation")
+
+if __name__ == '__main__':
+    try:
+        app = create_app()
+        bucket = install(gcs_manager)
+        # Tables des files d'attente démarrées à la première requête
+        with app.app_context():
+            db.create_all()
+        client = app.test_client()
+        photo = test_direct_upload(client, bucket)
+        test_order_derivatives(client, bucket, photo)
+        test_invalid_path(client, bucket)
+        test_invalid_content(client, bucket)
+        test_oversize(app, client, bucket)
+    finally:
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+    print("✅ Tests terminés !")
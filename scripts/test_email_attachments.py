@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Script pour tester le téléchargement des photos jointes à l'email admin
+
+Un serveur HTTP local (http.server dans un thread) remplace l'hébergement
+des photos : vérifie que les pièces jointes sont lues en flux, dans l'ordre
+des paires, et que le téléchargement est abandonné dès que la limite de
+taille est dépassée, annoncée par Content-Length ou non.
+"""
+
+import os
+import sys
+import time
+import threading
+from types import SimpleNamespace
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.email import EmailManager
+
+CHUNK = 64 * 1024
+# Envoyé sans Content-Length : bien au-delà de la limite et des tampons TCP
+STREAM_SIZE = 64 * 1024 * 1024
+
+class PhotoHandler(BaseHTTPRequestHandler):
+    """/small/<n> : n octets ; /declared : Content-Length trop grand ; /stream : flux sans longueur"""
+
+    sent = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, size):
+        written = 0
+        try:
+            while written < size:
+                chunk = b'x' * min(CHUNK, size - written)
+                self.wfile.write(chunk)
+                written += len(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            PhotoHandler.sent[self.path] = written
+
+    def do_GET(self):
+        if self.path.startswith('/small/'):
+            size = int(self.path.rsplit('/', 1)[1])
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/jpeg')
+            self.send_header('Content-Length', str(size))
+            self.end_headers()
+            self._send(size)
+        elif self.path == '/declared':
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/jpeg')
+            self.send_header('Content-Length', str(STREAM_SIZE))
+            self.end_headers()
+            self._send(STREAM_SIZE)
+        elif self.path == '/stream':
+            # Pas de Content-Length : fin du corps à la fermeture de la connexion
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/jpeg')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self._send(STREAM_SIZE)
+        else:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+def start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PhotoHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def paire(id, url):
+    return SimpleNamespace(id=id, photo_gcs_path=None, photo_url=url, photo_filename=f'{id}.jpg')
+
+def test_attachments(base):
+    """Photos valides jointes dans l'ordre des paires, les autres ignorées"""
+    print("🧪 Test des pièces jointes de l'email admin...")
+    manager = EmailManager()
+    manager.max_attachment_size = 1024 * 1024
+
+    paires = [
+        paire(1, f'{base}/small/300000'),
+        paire(2, f'{base}/declared'),
+        paire(3, f'{base}/small/2000'),
+        paire(4, f'{base}/missing'),
+        paire(5, f'{base}/stream'),
+        paire(6, f'{base}/small/{manager.max_attachment_size}'),
+        paire(7, None),
+    ]
+    attachments = manager._fetch_attachments(paires)
+
+    assert [a['filename'] for a in attachments] == ['paire_1_1.jpg', 'paire_3_3.jpg'], attachments
+    assert [len(a['data']) for a in attachments] == [300000, 2000]
+    print("✅ Pièces jointes dans l'ordre des paires, photos trop grandes ou absentes ignorées")
+
+def test_early_abort(base):
+    """Le téléchargement s'arrête à la limite au lieu de lire tout le corps"""
+    print("🧪 Test de l'abandon des photos trop grandes...")
+    manager = EmailManager()
+    manager.max_attachment_size = 1024 * 1024
+
+    PhotoHandler.sent.clear()
+    assert manager._download_photo(f'{base}/declared') is None
+    assert manager._download_photo(f'{base}/stream') is None
+
+    # Le serveur n'a pu écrire que ce que les tampons TCP acceptent avant la fermeture
+    for path in ('/declared', '/stream'):
+        deadline = time.monotonic() + 10
+        while path not in PhotoHandler.sent and time.monotonic() < deadline:
+            time.sleep(0.05)
+        sent = PhotoHandler.sent.get(path, STREAM_SIZE)
+        print(f"   {path} : {sent / 1024 / 1024:.1f} Mo envoyés sur {STREAM_SIZE / 1024 / 1024:.0f} Mo")
+        assert sent < STREAM_SIZE / 4, (path, sent)
+    print("✅ Téléchargement abandonné dès le dépassement de la limite")
+
+if __name__ == '__main__':
+    server = start_server()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    try:
+        test_attachments(base)
+        test_early_abort(base)
+    finally:
+        server.shutdown()
+    print("✅ Tests terminés !")
@@ -56,12 +56,7 @@ def test_gcs_upload():
         test_image_data = create_test_image()
 
         print("☁️  Upload vers Google Cloud Storage...")
-        result = gcs_manager.upload_image(
-            image_data=test_image_data,
-            commande_id="test-commande",
-            paire_id="test-paire",
-            original_filename="test-photo.jpg"
-        )
+        result = gcs_manager.upload_image(image_data=test_image_data)
 
         print("✅ Upload réussi !")
         print(f"   📁 Chemin GCS: {result['gcs_path']}")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Script pour tester le nombre de requêtes SQL du chargement d'une commande
+
+Commande.get_full_order() doit charger commande, paires, prestations des
+paires et prestations en un nombre constant de requêtes, quel que soit le
+nombre de paires, sérialisation (to_dict) et total compris. Base SQLite
+jetable, aucune configuration nécessaire.
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_PATH = os.path.join(tempfile.gettempdir(), 'test-order-queries.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+
+from sqlalchemy import event
+from app import create_app
+from database import db
+from models.commandes import Commande
+from models.paires import Paire, PairePrestation
+from models.prestations import Prestation
+from models.enums import TypeChaussure
+
+EXPECTED_QUERIES = 3
+
+def create_order(prestation_ids, paires):
+    prestations = Prestation.query.filter(Prestation.id.in_(prestation_ids)).all()
+    commande = Commande(nom='Test', email='test@example.com', telephone='0000000000',
+                        entreprise='Test', total=0)
+    for i in range(paires):
+        paire = Paire(type_chaussure=TypeChaussure.HOMME, ordre=i + 1)
+        for prestation in prestations:
+            paire.paire_prestations.append(PairePrestation(prestation=prestation, prix_unitaire=prestation.prix))
+        commande.paires.append(paire)
+    db.session.add(commande)
+    db.session.commit()
+    return commande.id
+
+def count_queries(commande_id):
+    """Requêtes émises pour charger la commande puis la sérialiser"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    db.session.expunge_all()
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        commande = Commande.get_full_order(commande_id)
+        commande.to_dict()
+        commande.calculate_total()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    db.session.rollback()
+    return len(statements)
+
+def test_order_queries():
+    """Même nombre de requêtes pour 1 et 10 paires"""
+    print("🧪 Test du nombre de requêtes de Commande.get_full_order()...")
+    app = create_app()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        prestations = [
+            Prestation(nom=f'Prestation {i}', prix=10 + i, type_chaussure=TypeChaussure.HOMME, actif=True)
+            for i in range(3)
+        ]
+        db.session.add_all(prestations)
+        db.session.commit()
+
+        prestation_ids = [prestation.id for prestation in prestations]
+        counts = {paires: count_queries(create_order(prestation_ids, paires)) for paires in (1, 10)}
+        assert counts[1] == counts[10] == EXPECTED_QUERIES, counts
+        print(f"✅ {EXPECTED_QUERIES} requêtes pour 1 comme pour 10 paires")
+
+        db.drop_all()
+
+if __name__ == '__main__':
+    try:
+        test_order_queries()
+    finally:
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+    print("✅ Tests terminés !")
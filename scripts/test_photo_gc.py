@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Script pour tester le nettoyage des photos orphelines (services/photo_gc.py)
+
+Tourne entièrement en local : bucket en mémoire (fake_gcs.py) et base
+SQLite jetable, aucune configuration Google Cloud nécessaire.
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+DB_PATH = os.path.join(tempfile.gettempdir(), 'test-photo-gc.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+
+from app import create_app
+from database import db
+from models.commandes import Commande
+from models.paires import Paire
+from models.enums import TypeChaussure
+from services.storage import gcs_manager
+from services.photo_gc import photo_gc
+from fake_gcs import install
+
+def add_photo(bucket, path, age_hours, size=1000):
+    """Ajouter une photo et ses déclinaisons, modifiées il y a age_hours"""
+    updated = datetime.now(timezone.utc) - timedelta(hours=age_hours)
+    names = [path] + [gcs_manager.derivative_path(path, name) for name in ('thumb', 'medium', 'webp')]
+    for name in names:
+        blob = bucket.blob(name)
+        blob.upload_from_string(b'x' * size, content_type='image/jpeg')
+        blob.updated = updated
+    return names
+
+def test_photo_gc():
+    """Seules les photos non référencées et anciennes sont supprimées"""
+    print("🧪 Test du nettoyage des photos orphelines...")
+    app = create_app()
+    bucket = install(gcs_manager)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        referenced = add_photo(bucket, 'photos/sha256/aa/' + 'a' * 64 + '.jpg', age_hours=500)
+        legacy = add_photo(bucket, 'photos/2024/01/12/12_0a1b2c3d.jpg', age_hours=9000)
+        add_photo(bucket, 'photos/sha256/bb/' + 'b' * 64 + '.jpg', age_hours=100, size=2000)
+        add_photo(bucket, 'photos/2024/02/tmp/tmp_deadbeef.jpg', age_hours=9000, size=3000)
+        # Paire enregistrée avant photo_gcs_path : seule photo_url la référence
+        url_only = add_photo(bucket, 'photos/2023/11/7/photo_7_ab12cd34.jpg', age_hours=12000)
+        recent = add_photo(bucket, 'photos/sha256/cc/' + 'c' * 64 + '.jpg', age_hours=1)
+        # Photo renvoyée pour un panier pas encore commandé : seule la photo
+        # est rafraîchie (_touch), ses déclinaisons gardent leur ancienne date
+        retaken = add_photo(bucket, 'photos/md5/dd/' + 'd' * 32 + '.jpg', age_hours=100)
+        bucket.objects[retaken[0]].updated = datetime.now(timezone.utc)
+
+        commande = Commande(nom='Test', email='test@example.com', telephone='0000000000',
+                            entreprise='Test', total=0)
+        commande.paires.append(Paire(type_chaussure=TypeChaussure.HOMME, photo_gcs_path=referenced[0]))
+        commande.paires.append(Paire(type_chaussure=TypeChaussure.FEMME, photo_gcs_path=legacy[0]))
+        commande.paires.append(Paire(type_chaussure=TypeChaussure.FEMME,
+                                     photo_url=gcs_manager.public_url(url_only[0])))
+        db.session.add(commande)
+        db.session.commit()
+
+        photo_gc.page_size = 3
+        photo_gc.batch_size = 2
+
+        report = photo_gc.run(dry_run=True)
+        assert report['deleted'] == 8 and len(bucket.objects) == 28, report
+        print("✅ Dry run : rien n'est supprimé")
+
+        # Même verdict quand une photo et ses déclinaisons sont sur des pages différentes
+        for page_size in (1, 2, 5):
+            photo_gc.page_size = page_size
+            assert photo_gc.run(dry_run=True)['deleted'] == 8, page_size
+        photo_gc.page_size = 3
+
+        report = photo_gc.run()
+        remaining = set(bucket.objects)
+        assert remaining == set(referenced + legacy + url_only + recent + retaken), sorted(remaining)
+        assert report['bytes_reclaimed'] == 4 * 2000 + 4 * 3000, report
+        assert report['pages'] == 10 and report['errors'] == 0, report
+        print(f"✅ {report['deleted']} objets supprimés, {report['bytes_reclaimed']} octets récupérés "
+              f"({report['pages']} pages, {bucket.batches} lots)")
+        print("✅ Déclinaisons d'une photo réutilisée conservées avec elle")
+        print("✅ Photo des paires sans photo_gcs_path conservée grâce à photo_url")
+
+        # delete_commande_images : ne supprime que les photos non partagées
+        other = Commande(nom='Autre', email='autre@example.com', telephone='0000000000',
+                         entreprise='Test', total=0)
+        other.paires.append(Paire(type_chaussure=TypeChaussure.HOMME, photo_gcs_path=referenced[0]))
+        db.session.add(other)
+        db.session.commit()
+
+        gcs_manager.delete_commande_images(commande.id)
+        assert referenced[0] in bucket.objects and legacy[0] not in bucket.objects
+        print("✅ delete_commande_images conserve les photos partagées, quel que soit le mois")
+
+        db.drop_all()
+
+if __name__ == '__main__':
+    try:
+        test_photo_gc()
+    finally:
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+    print("✅ Tests terminés !")
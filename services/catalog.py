@@ -0,0 +1,89 @@
+import os
+import time
+import threading
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from models.prestations import Prestation
+from models.enums import TypeChaussure
+
+class PrestationCatalog:
+    """In-process cache of the active prestations catalog.
+
+    The catalog only changes when seed_data.py runs, so each worker keeps a
+    serialized copy for `ttl` seconds. Any write on a Prestation in this
+    process bumps the version and forces a reload on the next read; writes
+    made by another process (seed script, other gunicorn worker) are picked
+    up once the TTL expires.
+    """
+
+    def __init__(self):
+        self.ttl = int(os.environ.get('PRESTATION_CACHE_TTL', 300))
+        self.version = 0
+        self._lock = threading.Lock()
+        self._entry = None
+
+    def invalidate(self):
+        """Drop the cached catalog and bump its version"""
+        with self._lock:
+            self.version += 1
+            self._entry = None
+
+    def _load(self):
+        prestations = Prestation.query.filter_by(actif=True).order_by(Prestation.id).all()
+        by_type = {type_chaussure: [] for type_chaussure in TypeChaussure}
+        all_prestations = []
+        for prestation in prestations:
+            data = prestation.to_dict()
+            by_type[prestation.type_chaussure].append(data)
+            all_prestations.append(data)
+        return {'all': all_prestations, 'by_type': by_type}
+
+    def _get_entry(self):
+        now = time.monotonic()
+        entry = self._entry
+        if entry and entry['version'] == self.version and entry['expires_at'] > now:
+            return entry
+
+        with self._lock:
+            entry = self._entry
+            if entry and entry['version'] == self.version and entry['expires_at'] > now:
+                return entry
+
+            version = self.version
+            data = self._load()
+            entry = {
+                'version': version,
+                'expires_at': now + self.ttl,
+                'data': data
+            }
+            self._entry = entry
+            return entry
+
+    def get_prestations(self, type_chaussure=None):
+        """Return the active prestations as dicts, optionally filtered by TypeChaussure"""
+        data = self._get_entry()['data']
+        if type_chaussure is None:
+            return data['all']
+        return data['by_type'][type_chaussure]
+
+# Global instance
+prestation_catalog = PrestationCatalog()
+
+@event.listens_for(Prestation, 'after_insert')
+@event.listens_for(Prestation, 'after_update')
+@event.listens_for(Prestation, 'after_delete')
+def _mark_catalog_dirty(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info['prestation_catalog_dirty'] = True
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_catalog_on_commit(session):
+    # Invalidate only once the write is visible, so a concurrent reload
+    # cannot cache the pre-commit catalog under the new version
+    if session.info.pop('prestation_catalog_dirty', False):
+        prestation_catalog.invalidate()
+
+@event.listens_for(Session, 'after_rollback')
+def _reset_catalog_flag(session):
+    session.info.pop('prestation_catalog_dirty', None)
@@ -0,0 +1,159 @@
+import os
+import time
+import threading
+from decimal import Decimal, ROUND_HALF_UP
+from datetime import datetime, timedelta
+from services.timing import request_timing
+
+class StripeCheckout:
+    """Stripe Checkout sessions: creation, reuse per order and cached lookups.
+
+    Each order keeps its session id, URL and expiry: a double click, a
+    back-button return or a retry gets the same session back while it is
+    open, without calling Stripe. Creations carry an idempotency key derived
+    from the order, so concurrent requests share one session too. A session
+    close to expiry is expired at Stripe before it is replaced, so an order
+    never has two payable sessions.
+
+    The /checkout page only asks Stripe while the order is still pending
+    (webhook not processed yet); the answer is kept for `ttl` seconds so
+    a customer refreshing the page, or several tabs, cost one round-trip.
+    """
+
+    def __init__(self):
+        self.api_key = os.environ.get('STRIPE_SECRET_KEY')
+        self.ttl = int(os.environ.get('CHECKOUT_SESSION_CACHE_TTL', 10))
+        # A session about to expire is not handed out again
+        self.reuse_margin = timedelta(minutes=10)
+        self.max_entries = 1000
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._stripe = None
+
+    @property
+    def stripe(self):
+        """The stripe module, configured once per process.
+
+        Imported on first use: stripe takes ~450 ms to import and most
+        workers serve other pages first (see scripts/bench_startup.py).
+        """
+        if self._stripe is None:
+            import stripe
+            stripe.api_key = self.api_key
+            self._stripe = stripe
+        return self._stripe
+
+    def session_for(self, commande, domain):
+        """Return (session id, URL) of an open Checkout session for a pending commande.
+
+        `commande` must be loaded with its full order graph; the caller
+        commits the session stored on it.
+        """
+        now = datetime.utcnow()
+        if (commande.stripe_session_id and commande.stripe_session_url and commande.stripe_session_expires_at
+                and commande.stripe_session_expires_at > now + self.reuse_margin):
+            return commande.stripe_session_id, commande.stripe_session_url
+
+        # Un ancien onglet Stripe encore ouvert ne doit pas permettre un second paiement
+        if commande.stripe_session_id and (commande.stripe_session_expires_at is None
+                                           or commande.stripe_session_expires_at > now):
+            self.expire_session(commande.stripe_session_id)
+
+        fields = self.create_session(commande.id, commande.email, self.line_items(commande), domain,
+                                     commande.stripe_session_id)
+        for name, value in fields.items():
+            setattr(commande, name, value)
+        return commande.stripe_session_id, commande.stripe_session_url
+
+    def expire_session(self, session_id):
+        """Expire an open Checkout session so it can no longer be paid.
+
+        Raises ValueError if it was paid in the meantime (webhook not
+        processed yet): the order must not get another session.
+        """
+        stripe = self.stripe
+        with request_timing.track('stripe'):
+            try:
+                stripe.checkout.Session.expire(session_id)
+            except stripe.error.InvalidRequestError:
+                # Plus ouverte : déjà expirée, ou payée
+                if stripe.checkout.Session.retrieve(session_id).status == 'complete':
+                    raise ValueError('Paiement déjà reçu pour cette commande')
+
+    def create_session(self, commande_id, email, line_items, domain, previous_session_id=None):
+        """Create a Checkout session; returns the Commande column values to store.
+
+        Takes plain values so it can run after the order is committed,
+        without reloading it and without holding a transaction open during
+        the call to Stripe.
+        """
+        # Même clé pour les requêtes simultanées ; nouvelle clé une fois la session précédente expirée
+        idempotency_key = f'checkout-commande-{commande_id}-{previous_session_id or "initial"}'
+        with request_timing.track('stripe'):
+            checkout_session = self.stripe.checkout.Session.create(
+                payment_method_types=['card'],
+                line_items=line_items,
+                mode='payment',
+                success_url=f"{domain}/checkout?session_id={{CHECKOUT_SESSION_ID}}",
+                cancel_url=f"{domain}/checkout/cancel",
+                metadata={
+                    'commande_id': str(commande_id)
+                },
+                customer_email=email,
+                billing_address_collection='required',
+                idempotency_key=idempotency_key
+            )
+
+        return {
+            'stripe_session_id': checkout_session.id,
+            'stripe_session_url': checkout_session.url,
+            'stripe_session_expires_at': datetime.utcfromtimestamp(checkout_session.expires_at)
+        }
+
+    def line_items(self, commande):
+        """Stripe line items of a commande, from its already loaded paires"""
+        line_items = []
+        for paire in commande.paires:
+            for paire_prestation in paire.paire_prestations:
+                prestation = paire_prestation.prestation
+                line_items.append({
+                    'price_data': {
+                        'currency': 'eur',
+                        'product_data': {
+                            'name': f"{prestation.nom} - {paire.type_chaussure.value.title()}",
+                            'description': prestation.description or f"Service de cordonnerie - {prestation.nom}",
+                        },
+                        'unit_amount': _cents(paire_prestation.prix_unitaire),  # Prix en centimes
+                    },
+                    'quantity': 1,
+                })
+        return line_items
+
+    def retrieve(self, session_id):
+        """Return {'status', 'payment_status', 'commande_id'} of a Checkout session"""
+        now = time.monotonic()
+        entry = self._sessions.get(session_id)
+        if entry and entry['expires_at'] > now:
+            return entry['data']
+
+        with request_timing.track('stripe'):
+            checkout_session = self.stripe.checkout.Session.retrieve(session_id)
+
+        data = {
+            'status': checkout_session.status,
+            'payment_status': checkout_session.payment_status,
+            'commande_id': (checkout_session.metadata or {}).get('commande_id')
+        }
+        with self._lock:
+            if len(self._sessions) >= self.max_entries:
+                self._sessions = {key: value for key, value in self._sessions.items()
+                                  if value['expires_at'] > now}
+            self._sessions[session_id] = {'expires_at': now + self.ttl, 'data': data}
+        return data
+
+def _cents(prix):
+    """Montant en centimes, arrondi au centime le plus proche (19.99 -> 1999, pas 1998)"""
+    return int((Decimal(str(prix)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+# Global instance
+stripe_checkout = StripeCheckout()
@@ -0,0 +1,84 @@
+import os
+import time
+import queue
+import logging
+import threading
+from services.images import image_pool, ImagePoolBusy
+from services.storage import gcs_manager
+
+logger = logging.getLogger(__name__)
+
+class DerivativeBuilder:
+    """Background generation of the derivatives of directly uploaded photos.
+
+    /upload-photo/finalize only stores the photo and queues its path; a
+    daemon thread reads the photo back from the bucket, encodes the
+    DERIVATIVES in the image pool, uploads them next to it and lists them
+    in the photo's metadata. Only listed derivatives are linked: the order
+    reads the metadata again for paires uploaded while the build was
+    pending, and a queue lost on restart leaves the full photo in use until
+    the photo's next upload queues the build again.
+    """
+
+    def __init__(self):
+        # The request threads come first: wait for a free pool slot
+        self.busy_delay = float(os.environ.get('DERIVATIVES_BUSY_DELAY', 2))
+        self.max_attempts = int(os.environ.get('DERIVATIVES_MAX_ATTEMPTS', 5))
+        self._queue = queue.Queue()
+        self._queued = set()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, gcs_path):
+        """Build the derivatives of a stored photo in the background (idempotent while queued)"""
+        with self._lock:
+            if gcs_path in self._queued:
+                return
+            self._queued.add(gcs_path)
+        self._queue.put(gcs_path)
+        self.start()
+
+    def start(self):
+        """Start the background thread (idempotent)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='photo-derivatives', daemon=True)
+            self._thread.start()
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            gcs_path = self._queue.get()
+            try:
+                self.build(gcs_path)
+            except Exception as e:
+                logger.warning(f'Derivatives not generated for {gcs_path}: {e}')
+            finally:
+                with self._lock:
+                    self._queued.discard(gcs_path)
+                self._queue.task_done()
+
+    def build(self, gcs_path):
+        """Generate and upload the derivatives of one photo"""
+        image_data = gcs_manager.download_image(gcs_path)
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                images = image_pool.process_set(image_data, include_photo=False)
+                break
+            except ImagePoolBusy:
+                if attempt == self.max_attempts:
+                    raise
+                time.sleep(self.busy_delay)
+        gcs_manager.store_derivatives(gcs_path, images)
+
+    def join(self):
+        """Wait until the queue is empty (scripts and tests)"""
+        self._queue.join()
+
+# Global instance
+derivative_builder = DerivativeBuilder()
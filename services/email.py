@@ -1,10 +1,16 @@
 import os
+import time
 import smtplib
+import logging
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.image import MIMEImage
-from datetime import datetime
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from services.storage import gcs_manager
+from services.timing import request_timing
+
+logger = logging.getLogger(__name__)
 
 class EmailManager:
     def __init__(self):
@@ -14,6 +20,17 @@ class EmailManager:
         self.smtp_password = os.environ.get('SMTP_PASSWORD')
         self.from_email = os.environ.get('FROM_EMAIL')
         self.admin_email = os.environ.get('ADMIN_EMAIL')
+        self.smtp_timeout = int(os.environ.get('SMTP_TIMEOUT', 30))
+        # Keep-alive session: reused between emails, checked with NOOP after
+        # a short idle period and dropped once idle for longer than the server allows
+        self.smtp_health_check_after = int(os.environ.get('SMTP_HEALTH_CHECK_AFTER', 10))
+        self.smtp_idle_timeout = int(os.environ.get('SMTP_IDLE_TIMEOUT', 60))
+        # Photos attached to the admin notification
+        self.max_attachment_size = 5 * 1024 * 1024  # 5MB max
+        self.attachment_workers = int(os.environ.get('EMAIL_ATTACHMENT_WORKERS', 4))
+        self._connection = None
+        self._last_used = 0
+        self._lock = threading.Lock()
 
     def is_configured(self):
         """Check if email is properly configured"""
@@ -25,49 +42,130 @@ class EmailManager:
             self.admin_email
         ])
 
+    def _build_message(self, to_email, subject, html_content, text_content=None, attachments=None):
+        """Build the MIME message for an email"""
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subject
+        msg['From'] = self.from_email
+        msg['To'] = to_email
+
+        # Add text content
+        if text_content:
+            text_part = MIMEText(text_content, 'plain', 'utf-8')
+            msg.attach(text_part)
+
+        # Add HTML content
+        html_part = MIMEText(html_content, 'html', 'utf-8')
+        msg.attach(html_part)
+
+        # Add attachments if any
+        if attachments:
+            for attachment in attachments:
+                if 'data' in attachment and 'filename' in attachment:
+                    img = MIMEImage(attachment['data'])
+                    img.add_header('Content-Disposition', f'attachment; filename="{attachment["filename"]}"')
+                    msg.attach(img)
+
+        return msg
+
+    def _connect(self):
+        """Open an authenticated SMTP session"""
+        server = smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=self.smtp_timeout)
+        try:
+            server.starttls()
+            server.login(self.smtp_user, self.smtp_password)
+        except Exception:
+            server.close()
+            raise
+        return server
+
+    def _get_connection(self):
+        """Return the keep-alive session, reconnecting if it is idle for too long or unhealthy"""
+        now = time.monotonic()
+        if self._connection is not None:
+            idle = now - self._last_used
+            if idle > self.smtp_idle_timeout:
+                self.close()
+            elif idle > self.smtp_health_check_after:
+                try:
+                    if self._connection.noop()[0] != 250:
+                        self.close()
+                except (smtplib.SMTPException, OSError):
+                    self.close()
+
+        if self._connection is None:
+            self._connection = self._connect()
+        self._last_used = now
+        return self._connection
+
+    def close(self):
+        """Close the keep-alive SMTP session"""
+        if self._connection is not None:
+            try:
+                self._connection.quit()
+            except (smtplib.SMTPException, OSError):
+                self._connection.close()
+            self._connection = None
+
+    def _send_messages(self, messages):
+        """Send MIME messages over a single session; returns one bool per message"""
+        results = []
+        with self._lock:
+            for msg in messages:
+                try:
+                    with request_timing.track('smtp'):
+                        try:
+                            self._get_connection().send_message(msg)
+                        except (smtplib.SMTPServerDisconnected, ConnectionError):
+                            # The server dropped the session: reconnect once and retry
+                            self.close()
+                            self._get_connection().send_message(msg)
+                    self._last_used = time.monotonic()
+                    logger.info(f"Email sent successfully to {msg['To']}")
+                    results.append(True)
+                except Exception as e:
+                    if isinstance(e, (smtplib.SMTPServerDisconnected, OSError)):
+                        self.close()
+                    logger.error(f"Error sending email: {e}")
+                    results.append(False)
+        return results
+
     def send_email(self, to_email, subject, html_content, text_content=None, attachments=None):
         """Send an email"""
         if not self.is_configured():
-            print("Warning: Email not configured")
+            logger.warning("Email not configured")
             return False
 
         try:
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = self.from_email
-            msg['To'] = to_email
-
-            # Add text content
-            if text_content:
-                text_part = MIMEText(text_content, 'plain', 'utf-8')
-                msg.attach(text_part)
-
-            # Add HTML content
-            html_part = MIMEText(html_content, 'html', 'utf-8')
-            msg.attach(html_part)
-
-            # Add attachments if any
-            if attachments:
-                for attachment in attachments:
-                    if 'data' in attachment and 'filename' in attachment:
-                        img = MIMEImage(attachment['data'])
-                        img.add_header('Content-Disposition', f'attachment; filename="{attachment["filename"]}"')
-                        msg.attach(img)
-
-            # Send email
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_user, self.smtp_password)
-                server.send_message(msg)
-
-            print(f"Email sent successfully to {to_email}")
-            return True
-
+            msg = self._build_message(to_email, subject, html_content, text_content, attachments)
         except Exception as e:
-            print(f"Error sending email: {e}")
+            logger.error(f"Error sending email: {e}")
             return False
 
+        return self._send_messages([msg])[0]
+
+    def send_many(self, emails):
+        """Send several emails over one authenticated session.
+
+        `emails` is a list of dicts with the send_email() keyword arguments;
+        returns one bool per email.
+        """
+        if not self.is_configured():
+            logger.warning("Email not configured")
+            return [False] * len(emails)
+
+        messages = []
+        for email in emails:
+            messages.append(self._build_message(
+                email['to_email'],
+                email['subject'],
+                email['html_content'],
+                email.get('text_content'),
+                email.get('attachments')
+            ))
+
+        return self._send_messages(messages)
+
     def send_order_confirmation(self, commande):
         """Send order confirmation email to customer"""
         subject = f"Confirmation de commande #{commande.id} - Conciergerie Cordo"
@@ -129,23 +227,14 @@ class EmailManager:
                 'services': services,
                 'total': paire_total,
                 'photo_url': paire.photo_url,
+                'photo_thumb_url': paire.photo_thumb_url,
+                'photo_medium_url': paire.photo_medium_url,
                 'description': paire.description
             })
             total += paire_total
 
-        # Download images for attachment (if small enough)
-        attachments = []
-        try:
-            for paire in commande.paires:
-                if paire.photo_url and paire.photo_url.startswith('http'):
-                    response = requests.get(paire.photo_url, timeout=10)
-                    if response.status_code == 200 and len(response.content) < 5 * 1024 * 1024:  # 5MB max
-                        attachments.append({
-                            'data': response.content,
-                            'filename': f"paire_{paire.id}_{paire.photo_filename or 'photo.jpg'}"
-                        })
-        except Exception as e:
-            print(f"Error downloading images for email: {e}")
+        # Download images for attachment (if small enough), in parallel
+        attachments = self._fetch_attachments(commande.paires)
 
         # Generate HTML content
         html_content = self._generate_admin_email_html(commande, order_details, total)
@@ -153,6 +242,61 @@ class EmailManager:
 
         return self.send_email(self.admin_email, subject, html_content, text_content, attachments)
 
+    def _download_photo(self, url):
+        """Stream a photo over HTTP, giving up as soon as it exceeds the attachment limit"""
+        import requests
+
+        with requests.get(url, timeout=10, stream=True) as response:
+            if response.status_code != 200:
+                return None
+
+            content_length = response.headers.get('Content-Length')
+            if content_length and content_length.isdigit() and int(content_length) >= self.max_attachment_size:
+                return None
+
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                size += len(chunk)
+                if size >= self.max_attachment_size:
+                    return None
+                chunks.append(chunk)
+            return b''.join(chunks)
+
+    def _fetch_attachment(self, photo):
+        """Fetch a photo, straight from the bucket when its GCS path is known"""
+        data = None
+        try:
+            if photo['gcs_path'] and gcs_manager.is_configured():
+                data = gcs_manager.download_image(photo['gcs_path'], max_size=self.max_attachment_size - 1)
+            elif photo['url'] and photo['url'].startswith('http'):
+                data = self._download_photo(photo['url'])
+        except Exception as e:
+            logger.warning(f"Error downloading image for email ({photo['filename']}): {e}")
+
+        if not data:
+            return None
+        return {'data': data, 'filename': photo['filename']}
+
+    def _fetch_attachments(self, paires):
+        """Fetch the photos of all paires with a bounded thread pool, keeping pair order"""
+        # Plain values only: ORM objects are not shared with the pool threads
+        photos = [
+            {
+                'gcs_path': paire.photo_gcs_path,
+                'url': paire.photo_url,
+                'filename': f"paire_{paire.id}_{paire.photo_filename or 'photo.jpg'}"
+            }
+            for paire in paires
+            if paire.photo_gcs_path or (paire.photo_url and paire.photo_url.startswith('http'))
+        ]
+        if not photos:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(self.attachment_workers, len(photos))) as executor:
+            results = list(executor.map(self._fetch_attachment, photos))
+        return [attachment for attachment in results if attachment]
+
     def send_payment_failed_email(self, commande, error_message=None):
         """Send payment failed notification"""
         subject = f"Échec de paiement - Commande #{commande.id}"
@@ -280,6 +424,21 @@ class EmailManager:
         Bordeaux • Pessac • Talence • Mérignac • Bègles • Villenave d'Ornon
         """
 
+    def _photo_img_html(self, item, width=200):
+        """<img> tag using the medium derivative, with a srcset when derivatives exist"""
+        if not item.get('photo_medium_url'):
+            return f'<img src="{item["photo_url"]}" class="photo" alt="Photo paire {item["numero"]}">'
+
+        srcset = ', '.join(
+            f'{url} {w}w' for url, w in (
+                (item.get('photo_thumb_url'), 120),
+                (item['photo_medium_url'], 480),
+                (item['photo_url'], 1024)
+            ) if url
+        )
+        return (f'<img src="{item["photo_medium_url"]}" srcset="{srcset}" sizes="{width}px" '
+                f'width="{width}" class="photo" alt="Photo paire {item["numero"]}">')
+
     def _generate_admin_email_html(self, commande, order_details, total):
         """Generate HTML email content for admin"""
         return f"""
@@ -328,7 +487,7 @@ class EmailManager:
                                 </ul>
                                 <p><strong>Sous-total : {item["total"]:.2f} €</strong></p>
                             </div>
-                            {f'<div><img src="{item["photo_url"]}" class="photo" alt="Photo paire {item["numero"]}"></div>' if item.get("photo_url") else ''}
+                            {f'<div>{self._photo_img_html(item)}</div>' if item.get("photo_url") else ''}
                         </div>
                     </div>
                     ''' for item in order_details])}
@@ -0,0 +1,200 @@
+import io
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+MAX_SIZE = (1024, 1024)
+JPEG_QUALITY = 85
+
+# Derivatives served instead of the full photo: name -> (max size, format, file suffix)
+DERIVATIVES = {
+    'thumb': ((120, 120), 'JPEG', 'thumb'),
+    'medium': ((480, 480), 'JPEG', 'medium'),
+    'webp': ((480, 480), 'WEBP', 'medium'),
+}
+CONTENT_TYPES = {'JPEG': 'image/jpeg', 'WEBP': 'image/webp'}
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+def _open_rgb(image_data, max_size):
+    # Pillow is only needed in the pool processes, not in the web worker
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(image_data))
+
+    if image.format == 'JPEG':
+        image.draft('RGB', max_size)
+
+    # Convert to RGB, flattening transparency on a white background
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    # Resize if too large
+    if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
+        image.thumbnail(max_size, Image.Resampling.LANCZOS)
+    return image
+
+def _encode(image, format='JPEG', quality=JPEG_QUALITY):
+    output = io.BytesIO()
+    if format == 'WEBP':
+        image.save(output, format='WEBP', quality=quality - 5, method=4)
+    else:
+        image.save(output, format='JPEG', quality=quality, optimize=True)
+    return output.getvalue()
+
+def process_image(image_data, max_size=MAX_SIZE, quality=JPEG_QUALITY):
+    """Decode an uploaded photo once and return it as an optimized JPEG.
+
+    For JPEG input, Image.draft() lets libjpeg decode directly at 1/2, 1/4
+    or 1/8 scale while staying at least as large as max_size, so a 12 MP
+    phone photo is never fully materialized; LANCZOS then does the rest.
+    """
+    return _encode(_open_rgb(image_data, max_size), quality=quality)
+
+def process_image_set(image_data, max_size=MAX_SIZE, quality=JPEG_QUALITY, include_photo=True):
+    """Like process_image(), plus the DERIVATIVES, from a single decode.
+
+    Returns {'photo': bytes, 'thumb': bytes, ...}; each derivative is
+    downscaled from the previous, larger one. With include_photo=False
+    (photo already in the bucket) only the derivatives are encoded.
+    """
+    from PIL import Image
+
+    image = _open_rgb(image_data, max_size)
+    result = {'photo': _encode(image, quality=quality)} if include_photo else {}
+
+    resized = {}
+    source = image
+    for name, (size, format, _) in sorted(DERIVATIVES.items(), key=lambda item: item[1][0], reverse=True):
+        if size not in resized:
+            source = source.copy()
+            source.thumbnail(size, Image.Resampling.LANCZOS)
+            resized[size] = source
+        result[name] = _encode(resized[size], format, quality)
+    return result
+
+class ImagePoolBusy(Exception):
+    """Raised when too many photos are already waiting to be processed"""
+
+def _lower_priority():
+    # Image work must not starve page rendering on our shared CPU
+    try:
+        os.nice(10)
+    except OSError:
+        pass
+
+class ImageProcessingPool:
+    """Bounded process pool running process_image() outside the request thread.
+
+    At most `max_pending` photos per gunicorn worker are accepted (queued or
+    being processed); beyond that submit() raises ImagePoolBusy so the route
+    can answer 503 right away instead of piling requests up. The pool is
+    created lazily, with 'spawn' so no thread state of the web worker is
+    inherited, and its processes run at a lower CPU priority.
+    """
+
+    def __init__(self):
+        self.workers = int(os.environ.get('IMAGE_POOL_WORKERS', 1))
+        self.max_pending = int(os.environ.get('IMAGE_POOL_MAX_PENDING', 4))
+        self.timeout = int(os.environ.get('IMAGE_POOL_TIMEOUT', 30))
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pending = 0
+        self._processed = 0
+        self._rejected = 0
+        self._failed = 0
+        self._total_seconds = 0.0
+        self._max_seconds = 0.0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_lower_priority
+                )
+            return self._executor
+
+    def _reset_executor(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def process_set(self, image_data, **kwargs):
+        """Run process_image_set() in the pool and wait for the result"""
+        return self._run(process_image_set, image_data, **kwargs)
+
+    def _release(self, future=None):
+        with self._lock:
+            self._pending -= 1
+        # Imported here: the pool processes also import this module
+        from services.metrics import IMAGE_POOL_PENDING
+        IMAGE_POOL_PENDING.dec()
+        self._slots.release()
+
+    def _run(self, fn, image_data, **kwargs):
+        from services.metrics import IMAGE_PROCESSING, IMAGE_POOL_PENDING
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise ImagePoolBusy('Trop de photos en cours de traitement')
+
+        with self._lock:
+            self._pending += 1
+        IMAGE_POOL_PENDING.inc()
+        start = time.perf_counter()
+        try:
+            future = self._get_executor().submit(fn, image_data, **kwargs)
+        except Exception:
+            self._release()
+            with self._lock:
+                self._failed += 1
+            raise
+
+        # The slot is freed when the job ends, not when we stop waiting for
+        # it: a timed out photo still occupies a pool process
+        future.add_done_callback(self._release)
+        try:
+            result = future.result(timeout=self.timeout)
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._reset_executor()
+            with self._lock:
+                self._failed += 1
+            raise
+
+        elapsed = time.perf_counter() - start
+        IMAGE_PROCESSING.observe(elapsed)
+        with self._lock:
+            self._processed += 1
+            self._total_seconds += elapsed
+            self._max_seconds = max(self._max_seconds, elapsed)
+        return result
+
+    def stats(self):
+        """Queue depth and processing time counters for this worker"""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'pending': self._pending,
+                'processed': self._processed,
+                'rejected': self._rejected,
+                'failed': self._failed,
+                'avg_processing_ms': round(self._total_seconds / self._processed * 1000, 1) if self._processed else 0,
+                'max_processing_ms': round(self._max_seconds * 1000, 1)
+            }
+
+# Global instance
+image_pool = ImageProcessingPool()
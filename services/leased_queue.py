@@ -0,0 +1,147 @@
+import os
+import logging
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from database import db
+
+_workers = []
+
+class LeasedQueueWorker:
+    """Daemon thread draining a table of jobs, with leases and retries.
+
+    Base of the email outbox and the Stripe event processor. Due rows
+    (`pending` status, next_attempt_at reached) are claimed with FOR UPDATE
+    SKIP LOCKED and leased: next_attempt_at moves `lease` ahead, so several
+    gunicorn workers drain the table without running a job twice, and a
+    job left by a dead worker runs again once its lease expires. Failures
+    are retried with exponential backoff, up to `max_attempts`.
+
+    Subclasses set `model`, `pending`, `failed` and `thread_name` and
+    implement process(); settings are read from `<env_prefix>_*`.
+    """
+
+    model = None
+    pending = None
+    failed = None
+    thread_name = None
+
+    def __init__(self, env_prefix):
+        self.poll_interval = int(os.environ.get(f'{env_prefix}_POLL_INTERVAL', 30))
+        self.max_attempts = int(os.environ.get(f'{env_prefix}_MAX_ATTEMPTS', 8))
+        self.backoff_base = int(os.environ.get(f'{env_prefix}_BACKOFF_BASE', 30))
+        self.backoff_max = int(os.environ.get(f'{env_prefix}_BACKOFF_MAX', 3600))
+        self.lease = timedelta(seconds=int(os.environ.get(f'{env_prefix}_LEASE', 300)))
+        self.batch_size = 10
+        self.app = None
+        self.logger = logging.getLogger(type(self).__module__)
+        self._wakeup_flag = f'{self.thread_name}_wakeup'
+        self._thread = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        _workers.append(self)
+
+    def init_app(self, app):
+        self.app = app
+
+        # Drain any backlog left by a previous process on the first request
+        app.before_request(self.start)
+
+    def wake_after_commit(self):
+        """Wake the thread once the current transaction commits (new job visible)"""
+        db.session.info[self._wakeup_flag] = True
+
+    def start(self):
+        """Start the background thread (idempotent)"""
+        if self.app is None:
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        self.start()
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                with self.app.app_context():
+                    while self.process_due() == self.batch_size:
+                        pass
+            except Exception as e:
+                self.logger.error(f'{self.thread_name} worker error: {e}')
+            self._wakeup.wait(self.poll_interval)
+
+    def _claim_due(self):
+        """Lease due jobs so no other worker runs them at the same time"""
+        now = datetime.utcnow()
+        items = (self.model.query
+                 .filter(self.model.statut == self.pending,
+                         self.model.next_attempt_at <= now)
+                 .order_by(self.model.next_attempt_at, self.model.id)
+                 .limit(self.batch_size)
+                 .with_for_update(skip_locked=True)
+                 .all())
+        claimed = []
+        for item in items:
+            item.attempts += 1
+            item.next_attempt_at = now + self.lease
+            claimed.append((item.id, item.attempts, self.job(item)))
+        db.session.commit()
+        return claimed
+
+    def _backoff(self, attempts):
+        return timedelta(seconds=min(self.backoff_base * 2 ** (attempts - 1), self.backoff_max))
+
+    def process_due(self):
+        """Run the jobs currently due; returns the number of jobs processed"""
+        claimed = self._claim_due()
+
+        for item_id, attempts, job in claimed:
+            try:
+                self.process(item_id, job)
+                continue
+            except Exception as e:
+                db.session.rollback()
+                error = str(e)
+
+            item = db.session.get(self.model, item_id)
+            item.last_error = error
+            if attempts >= self.max_attempts:
+                item.statut = self.failed
+                self.logger.error(f'{self.describe(item)} abandonné après {attempts} tentatives: {error}')
+            else:
+                item.next_attempt_at = datetime.utcnow() + self._backoff(attempts)
+                self.logger.warning(f'{self.describe(item)} en échec, nouvel essai prévu: {error}')
+            db.session.commit()
+
+        return len(claimed)
+
+    def job(self, item):
+        """Plain values process() needs, read while the claimed row is loaded"""
+        return None
+
+    def process(self, item_id, job):
+        """Run one job and mark it done (committing); raise to retry it later"""
+        raise NotImplementedError
+
+    def describe(self, item):
+        return f'{self.model.__name__} #{item.id}'
+
+@event.listens_for(Session, 'after_commit')
+def _wake_workers_on_commit(session):
+    for worker in _workers:
+        if session.info.pop(worker._wakeup_flag, False):
+            worker.wake()
+
+@event.listens_for(Session, 'after_rollback')
+def _reset_wakeup_flags(session):
+    for worker in _workers:
+        session.info.pop(worker._wakeup_flag, None)
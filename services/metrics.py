@@ -0,0 +1,124 @@
+import os
+import hmac
+import time
+from prometheus_client import (CollectorRegistry, Counter, Gauge, Histogram, REGISTRY,
+                               CONTENT_TYPE_LATEST, generate_latest, multiprocess)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event, func
+from sqlalchemy.pool import Pool, QueuePool
+
+# Shared across gunicorn workers when PROMETHEUS_MULTIPROC_DIR is set (see gunicorn.conf.py)
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency',
+    ['method', 'endpoint', 'status'])
+EXTERNAL_LATENCY = Histogram(
+    'external_call_duration_seconds', 'Outbound call latency (stripe, gcs, smtp, images)',
+    ['service'], buckets=(.01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30))
+IMAGE_PROCESSING = Histogram(
+    'image_processing_seconds', 'Photo processing time in the image pool, queueing included',
+    buckets=(.05, .1, .25, .5, 1, 2, 4, 8, 15, 30))
+UPLOAD_BYTES = Histogram(
+    'photo_upload_bytes', 'Size of the photos received',
+    buckets=(100e3, 250e3, 500e3, 1e6, 2e6, 4e6, 6e6, 8e6, 10e6))
+DB_POOL_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds', 'Time spent waiting for a database connection from the pool',
+    buckets=(.0005, .001, .005, .01, .05, .1, .5, 1, 5, 20))
+DB_POOL_CHECKED_OUT = Gauge(
+    'db_pool_checked_out', 'Database connections currently checked out',
+    multiprocess_mode='livesum')
+IMAGE_POOL_PENDING = Gauge(
+    'image_pool_pending', 'Photos queued or being processed',
+    multiprocess_mode='livesum')
+ORDERS_CREATED = Counter('orders_created_total', 'Orders created')
+ORDERS_PAID = Counter('orders_paid_total', 'Orders paid (Stripe webhook)')
+PHOTOS_UPLOADED = Counter('photos_uploaded_total', 'Photos uploaded', ['deduplicated'])
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - start)
+
+class MetricsExporter:
+    """Prometheus exposition for /metrics.
+
+    Metrics recorded by each gunicorn worker are merged from
+    PROMETHEUS_MULTIPROC_DIR; queue depths stored in the database are read
+    at scrape time.
+    """
+
+    def __init__(self):
+        self.multiprocess = bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+        self.token = os.environ.get('METRICS_TOKEN')
+
+    def authorized(self, request):
+        """Internal endpoints: private network scrapes, or the METRICS_TOKEN bearer token.
+
+        Fly's proxy adds Fly-Client-IP to every public request; its metrics
+        scraper and the other machines reach the app directly, without it.
+        """
+        if self.token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {self.token}'):
+            return True
+        return 'Fly-Client-IP' not in request.headers
+
+    def init_app(self, app):
+        """Time pool checkouts; must run before db.init_app() builds the engine"""
+        uri = app.config['SQLALCHEMY_DATABASE_URI']
+        options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        if 'poolclass' not in options and uri not in ('sqlite://', 'sqlite:///:memory:'):
+            options['poolclass'] = TimedQueuePool
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    def render(self):
+        """Return (body, content type) of the current metrics"""
+        if self.multiprocess:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+
+        queues = CollectorRegistry()
+        queues.register(QueueDepthCollector())
+        return generate_latest(registry) + generate_latest(queues), CONTENT_TYPE_LATEST
+
+class QueueDepthCollector:
+    """Depth of the background queues (email outbox, Stripe events), read
+    from the database on each scrape"""
+
+    def collect(self):
+        from models.outbox import EmailOutbox, StatutEmail
+        from models.stripe_events import StripeEvent, StatutEvenement
+
+        yield from self._by_statut('email_outbox_emails', 'Emails in the outbox by status',
+                                   EmailOutbox, StatutEmail)
+        yield from self._by_statut('stripe_webhook_events', 'Stripe webhook events by processing status',
+                                   StripeEvent, StatutEvenement)
+
+    def _by_statut(self, name, documentation, model, statuts):
+        from database import db
+
+        gauge = GaugeMetricFamily(name, documentation, labels=['statut'])
+        try:
+            counts = dict(db.session.query(model.statut, func.count()).group_by(model.statut).all())
+            db.session.rollback()
+        except Exception:
+            db.session.rollback()
+            return
+        for statut in statuts:
+            gauge.add_metric([statut.value], counts.get(statut, 0))
+        yield gauge
+
+# Global instance
+metrics_exporter = MetricsExporter()
+
+@event.listens_for(Pool, 'checkout')
+def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+    DB_POOL_CHECKED_OUT.inc()
+
+@event.listens_for(Pool, 'checkin')
+def _count_checkin(dbapi_connection, connection_record):
+    DB_POOL_CHECKED_OUT.dec()
@@ -0,0 +1,76 @@
+from datetime import datetime
+from database import db
+from models.commandes import Commande
+from models.outbox import EmailOutbox, StatutEmail, TypeEmail
+from services.email import email_manager
+from services.leased_queue import LeasedQueueWorker
+
+class EmailOutboxWorker(LeasedQueueWorker):
+    """Background sender for the email_outbox table.
+
+    Emails are enqueued in the same transaction as the change that triggers
+    them (e.g. the order status update in the Stripe webhook) and sent by a
+    daemon thread, leased and retried with backoff (LeasedQueueWorker), so
+    several gunicorn workers can drain the table without double sending.
+    """
+
+    model = EmailOutbox
+    pending = StatutEmail.PENDING
+    failed = StatutEmail.FAILED
+    thread_name = 'email-outbox'
+
+    def __init__(self):
+        super().__init__('EMAIL_OUTBOX')
+
+    def enqueue(self, type_email, commande, payload=None):
+        """Add an email to the outbox; it is sent once the current transaction commits.
+
+        `commande` is a Commande or just its id (no need to load the order).
+        """
+        item = EmailOutbox(
+            type_email=type_email,
+            payload=payload,
+            statut=StatutEmail.PENDING,
+            attempts=0,
+            next_attempt_at=datetime.utcnow()
+        )
+        if isinstance(commande, Commande):
+            item.commande = commande
+        else:
+            item.commande_id = commande
+        db.session.add(item)
+        self.wake_after_commit()
+        return item
+
+    def job(self, item):
+        return item.type_email, item.commande_id, item.payload
+
+    def _send(self, type_email, commande_id, payload):
+        commande = Commande.get_full_order(commande_id)
+        if commande is None:
+            raise Exception(f'Commande #{commande_id} introuvable')
+
+        if type_email == TypeEmail.ORDER_CONFIRMATION:
+            return email_manager.send_order_confirmation(commande)
+        if type_email == TypeEmail.ADMIN_NOTIFICATION:
+            return email_manager.send_admin_notification(commande)
+        if type_email == TypeEmail.PAYMENT_FAILED:
+            return email_manager.send_payment_failed_email(commande, (payload or {}).get('error_message'))
+        raise Exception(f'Type d\'email inconnu: {type_email}')
+
+    def process(self, item_id, job):
+        type_email, commande_id, payload = job
+        if not self._send(type_email, commande_id, payload):
+            raise Exception('Envoi refusé par EmailManager')
+
+        item = db.session.get(EmailOutbox, item_id)
+        item.statut = StatutEmail.SENT
+        item.sent_at = datetime.utcnow()
+        item.last_error = None
+        db.session.commit()
+
+    def describe(self, item):
+        return f'Email #{item.id} ({item.type_email.value})'
+
+# Global instance
+email_outbox = EmailOutboxWorker()
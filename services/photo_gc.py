@@ -0,0 +1,121 @@
+import os
+import time
+import logging
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import or_
+from database import db
+from models.paires import Paire
+from services.storage import gcs_manager
+
+logger = logging.getLogger(__name__)
+
+class PhotoGarbageCollector:
+    """Delete bucket photos that no paire references.
+
+    Photos are uploaded before the order exists (under a temporary id, or a
+    content hash since deduplication), so abandoned carts leave objects
+    behind. The bucket listing under `photos/` is reconciled page by page
+    with Paire.photo_gcs_path, or Paire.photo_url for the paires saved
+    before the path was recorded; derivatives follow their photo, judged by
+    its `updated` and references. Photos updated within the grace period are
+    kept: they may belong to an order still being filled in.
+    """
+
+    def __init__(self):
+        self.grace_period = timedelta(hours=int(os.environ.get('PHOTO_GC_GRACE_HOURS', 48)))
+        self.page_size = int(os.environ.get('PHOTO_GC_PAGE_SIZE', 1000))
+        # The GCS batch API accepts at most 100 calls per request
+        self.batch_size = min(int(os.environ.get('PHOTO_GC_BATCH_SIZE', 100)), 100)
+        self.prefix = 'photos/'
+
+    def run(self, dry_run=False, now=None):
+        """Reconcile the bucket with the database and return a report dict"""
+        if not gcs_manager.is_configured():
+            raise Exception("Google Cloud Storage not configured")
+
+        now = now or datetime.now(timezone.utc)
+        cutoff = now - self.grace_period
+        report = {
+            'dry_run': dry_run,
+            'scanned': 0,
+            'scanned_bytes': 0,
+            'referenced': 0,
+            'recent': 0,
+            'deleted': 0,
+            'bytes_reclaimed': 0,
+            'errors': 0,
+            'pages': 0
+        }
+        start = time.perf_counter()
+
+        blobs = gcs_manager.client.list_blobs(
+            gcs_manager.bucket,
+            prefix=self.prefix,
+            page_size=self.page_size,
+            fields='items(name,size,updated),nextPageToken'
+        )
+        # `updated` of each photo listed so far, for the derivatives that follow it
+        photos = {}
+        for page in blobs.pages:
+            report['pages'] += 1
+            self._collect_page(list(page), cutoff, dry_run, report, photos)
+
+        report['duration_s'] = round(time.perf_counter() - start, 2)
+        logger.info(f'Photo GC: {report}')
+        return report
+
+    def _collect_page(self, page, cutoff, dry_run, report, photos):
+        candidates = []
+        for blob in page:
+            report['scanned'] += 1
+            report['scanned_bytes'] += blob.size or 0
+            parent = gcs_manager.photo_path(blob.name)
+            if parent == blob.name:
+                photos[blob.name] = blob.updated
+            # A derivative is listed after its photo ('.' < '_') and shares
+            # its fate: a reused photo is touched, its derivatives are not
+            updated = photos.get(parent, blob.updated)
+            if updated is None or updated > cutoff:
+                report['recent'] += 1
+            else:
+                candidates.append(blob)
+
+        if not candidates:
+            return
+
+        # One query per page: which of these photos are still referenced?
+        # Older paires only have photo_url (photo_gcs_path is NULL)
+        parents = {blob.name: gcs_manager.photo_path(blob.name) for blob in candidates}
+        paths = set(parents.values())
+        urls = {gcs_manager.public_url(path): path for path in paths}
+        referenced = set()
+        for path, url in (db.session.query(Paire.photo_gcs_path, Paire.photo_url)
+                          .filter(or_(Paire.photo_gcs_path.in_(paths), Paire.photo_url.in_(urls)))
+                          .distinct()):
+            referenced.update((path, urls.get(url)))
+        db.session.rollback()
+
+        orphans = [blob for blob in candidates if parents[blob.name] not in referenced]
+        report['referenced'] += len(candidates) - len(orphans)
+
+        for i in range(0, len(orphans), self.batch_size):
+            batch = orphans[i:i + self.batch_size]
+            if not dry_run and not self._delete_batch(batch):
+                report['errors'] += len(batch)
+                continue
+            report['deleted'] += len(batch)
+            report['bytes_reclaimed'] += sum(blob.size or 0 for blob in batch)
+
+    def _delete_batch(self, blobs):
+        """Delete up to 100 objects in a single HTTP request"""
+        try:
+            with gcs_manager.client.batch():
+                for blob in blobs:
+                    blob.delete()
+            return True
+        except Exception as e:
+            logger.error(f'Photo GC batch delete failed ({len(blobs)} objects): {e}')
+            return False
+
+# Global instance
+photo_gc = PhotoGarbageCollector()
@@ -1,35 +1,120 @@
 import os
 import uuid
 import json
+import base64
+import hashlib
+import logging
+import threading
 from datetime import datetime
-from google.cloud import storage
-from google.oauth2 import service_account
-from PIL import Image
-import io
+from concurrent.futures import ThreadPoolExecutor
+from services.images import DERIVATIVES, CONTENT_TYPES, EXTENSIONS
+
+# Derivative names never change for a given path: let browsers keep them
+DERIVATIVE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+logger = logging.getLogger(__name__)
 
 class GCSManager:
+    """Google Cloud Storage access for the photos.
+
+    The storage client is built on first use, not at import: google-cloud-storage
+    alone takes ~350 ms to import. All calls go through one authorized
+    session whose connection pool is sized for our concurrent uploads and
+    downloads (GCS_HTTP_POOL_SIZE). The client is rebuilt after a fork, so
+    each gunicorn worker has its own connections; call preload() from
+    post_fork to pay the setup before the first request.
+    """
+
     def __init__(self):
         self.project_id = os.environ.get('GOOGLE_CLOUD_PROJECT_ID')
         self.bucket_name = os.environ.get('GCS_BUCKET_NAME')
-        self.client = None
-        self.bucket = None
+        self.http_pool_size = int(os.environ.get('GCS_HTTP_POOL_SIZE', 16))
+        self._client = None
+        self._bucket = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._pid != os.getpid():
+            self._connect()
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+        self._pid = os.getpid()
+
+    @property
+    def bucket(self):
+        if self._pid != os.getpid():
+            self._connect()
+        return self._bucket
+
+    @bucket.setter
+    def bucket(self, bucket):
+        self._bucket = bucket
+        self._pid = os.getpid()
+
+    def _connect(self):
+        """Build the client once per process (a failed attempt is not retried)"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._client = None
+            self._bucket = None
+            self._pid = os.getpid()
+
+            if not (self.project_id and self.bucket_name):
+                return
 
-        if self.project_id and self.bucket_name:
             try:
+                from google.cloud import storage
+                from google.auth.transport.requests import AuthorizedSession
+                from requests.adapters import HTTPAdapter
+
                 # Try to get credentials from JSON environment variable first
                 credentials_json = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS_JSON')
                 if credentials_json:
-                    # Use JSON credentials from environment variable
+                    from google.oauth2 import service_account
                     credentials_info = json.loads(credentials_json)
-                    credentials = service_account.Credentials.from_service_account_info(credentials_info)
-                    self.client = storage.Client(project=self.project_id, credentials=credentials)
+                    credentials = service_account.Credentials.from_service_account_info(
+                        credentials_info, scopes=storage.Client.SCOPE
+                    )
                 else:
                     # Fallback to default credentials (file path)
-                    self.client = storage.Client(project=self.project_id)
+                    import google.auth
+                    credentials, _ = google.auth.default(scopes=storage.Client.SCOPE)
 
-                self.bucket = self.client.bucket(self.bucket_name)
+                # Shared session: keep-alive connections reused by every thread
+                session = AuthorizedSession(credentials)
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.http_pool_size)
+                session.mount('https://', adapter)
+
+                self._client = storage.Client(project=self.project_id, credentials=credentials, _http=session)
+                self._bucket = self._client.bucket(self.bucket_name)
             except Exception as e:
-                print(f"Warning: Could not initialize GCS client: {e}")
+                logger.warning(f"Could not initialize GCS client: {e}")
+
+    def preload(self, warm=True):
+        """Build the client now, e.g. in gunicorn's post_fork hook.
+
+        With warm=True, a background thread also fetches the OAuth token and
+        opens a pooled TLS connection with a cheap metadata request, so the
+        first photo upload after a cold start does not pay for them.
+        """
+        if not self.is_configured():
+            return False
+
+        if warm:
+            threading.Thread(target=self._warm_up, name='gcs-warmup', daemon=True).start()
+        return True
+
+    def _warm_up(self):
+        try:
+            self.bucket.get_blob('photos/.warmup')
+        except Exception as e:
+            logger.warning(f"GCS warm-up failed: {e}")
 
     def is_configured(self):
         """Check if GCS is properly configured"""
@@ -53,54 +138,251 @@ class GCSManager:
 
         return f"photos/{year}/{month:02d}/{commande_id}/{filename}"
 
-    def upload_image(self, image_data, commande_id, paire_id, original_filename=None):
-        """Upload image to Google Cloud Storage"""
+    def public_url(self, gcs_path):
+        """Public URL of an object (the bucket is publicly readable)"""
+        return f"https://storage.googleapis.com/{self.bucket_name}/{gcs_path}"
+
+    def derivative_path(self, gcs_path, name):
+        """Path of a derivative next to its photo, e.g. ..._ab12cd34_medium.webp"""
+        _, format, suffix = DERIVATIVES[name]
+        stem, _ = os.path.splitext(gcs_path)
+        return f"{stem}_{suffix}.{EXTENSIONS[format]}"
+
+    def photo_path(self, gcs_path):
+        """Photo a path belongs to: the photo itself, or the parent of a derivative"""
+        for _, format, suffix in DERIVATIVES.values():
+            ending = f"_{suffix}.{EXTENSIONS[format]}"
+            if gcs_path.endswith(ending):
+                return gcs_path[:-len(ending)] + '.jpg'
+        return gcs_path
+
+    def content_path(self, image_data):
+        """Content-addressed path of a photo: identical bytes, identical object"""
+        digest = hashlib.sha256(image_data).hexdigest()
+        return f"photos/sha256/{digest[:2]}/{digest}.jpg"
+
+    def upload_image(self, image_data, derivatives=None):
+        """Upload a JPEG image to Google Cloud Storage.
+
+        `image_data` is uploaded as is: run it through services.images.process_image
+        first, so each photo is decoded and encoded only once. `derivatives`
+        ({'thumb': bytes, ...} from process_image_set) are uploaded alongside.
+
+        Objects are named after the SHA-256 of `image_data`: when the same
+        photo was already uploaded (retake, resubmission, client retry) the
+        upload is skipped and the existing object returned, with
+        'deduplicated': True. Photos can therefore be shared between paires;
+        see delete_commande_images() for cleanup.
+        """
         if not self.is_configured():
             raise Exception("Google Cloud Storage not configured")
 
         try:
-            # Process image
-            image = Image.open(io.BytesIO(image_data))
-
-            # Convert to RGB if necessary
-            if image.mode in ('RGBA', 'LA', 'P'):
-                background = Image.new('RGB', image.size, (255, 255, 255))
-                if image.mode == 'RGBA':
-                    background.paste(image, mask=image.split()[-1])
-                else:
-                    background.paste(image)
-                image = background
+            gcs_path = self.content_path(image_data)
 
-            # Resize if too large
-            max_size = (1920, 1920)
-            if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
-                image.thumbnail(max_size, Image.Resampling.LANCZOS)
+            # One metadata request; the photo's metadata lists its derivatives
+            existing = self.bucket.get_blob(gcs_path)
+            if existing is not None:
+                self._touch(existing)
+                return self._upload_result(gcs_path, self.derivative_names(existing), True)
 
-            # Save to bytes
-            img_byte_arr = io.BytesIO()
-            image.save(img_byte_arr, format='JPEG', quality=85, optimize=True)
-            img_byte_arr.seek(0)
+            # Derivatives first: once the photo exists, its derivatives do too
+            uploads = self._derivative_uploads(gcs_path, derivatives or {})
+            self._upload_all(uploads)
+            names = [name for name in (derivatives or {}) if name in DERIVATIVES]
 
-            # Generate filename
-            gcs_path = self.generate_filename(commande_id, paire_id, original_filename)
-
-            # Upload to GCS
             blob = self.bucket.blob(gcs_path)
-            blob.upload_from_file(img_byte_arr, content_type='image/jpeg')
+            blob.metadata = {'derivatives': ','.join(names)}
+            from google.api_core.exceptions import PreconditionFailed
+            try:
+                # Only create: a concurrent upload of the same photo may have won
+                blob.upload_from_string(image_data, content_type='image/jpeg', if_generation_match=0)
+            except PreconditionFailed:
+                return self._upload_result(gcs_path, names, True)
 
             # With uniform bucket-level access, objects are automatically public if bucket is public
-            # Generate public URL manually
-            public_url = f"https://storage.googleapis.com/{self.bucket_name}/{gcs_path}"
-
-            return {
-                'gcs_path': gcs_path,
-                'public_url': public_url,
-                'filename': os.path.basename(gcs_path)
-            }
+            return self._upload_result(gcs_path, names, False)
 
         except Exception as e:
             raise Exception(f"Failed to upload image to GCS: {str(e)}")
 
+    def _touch(self, blob):
+        """Refresh `updated` on a reused photo so the orphan GC grace period restarts"""
+        try:
+            blob.metadata = {**(blob.metadata or {}), 'last_used': datetime.utcnow().isoformat()}
+            blob.patch()
+        except Exception as e:
+            logger.warning(f"Could not refresh {blob.name}: {e}")
+
+    def _upload_result(self, gcs_path, derivative_names, deduplicated):
+        return {
+            'gcs_path': gcs_path,
+            'public_url': self.public_url(gcs_path),
+            'filename': os.path.basename(gcs_path),
+            'derivatives': self.derivative_urls(gcs_path, derivative_names),
+            'deduplicated': deduplicated
+        }
+
+    def derivative_names(self, blob):
+        """Derivatives listed in a photo's metadata (those uploaded with it)"""
+        names = (blob.metadata or {}).get('derivatives', '')
+        return [name for name in names.split(',') if name in DERIVATIVES]
+
+    def stored_derivative_urls(self, gcs_path):
+        """URLs of the derivatives that exist for a stored photo (one metadata request)"""
+        if not self.is_configured():
+            return {}
+        blob = self.bucket.get_blob(gcs_path)
+        if blob is None:
+            return {}
+        return self.derivative_urls(gcs_path, self.derivative_names(blob))
+
+    def store_derivatives(self, gcs_path, derivatives):
+        """Upload the derivatives of a stored photo, then list them in its metadata"""
+        if not self.is_configured():
+            raise Exception("Google Cloud Storage not configured")
+
+        self._upload_all(self._derivative_uploads(gcs_path, derivatives))
+        blob = self.bucket.blob(gcs_path)
+        blob.metadata = {'derivatives': ','.join(name for name in derivatives if name in DERIVATIVES)}
+        blob.patch()
+
+    def has_image(self, gcs_path):
+        """Cheap existence check (metadata request only)"""
+        if not self.is_configured():
+            return False
+        return self.bucket.get_blob(gcs_path) is not None
+
+    def _derivative_uploads(self, gcs_path, derivatives):
+        return [
+            (self.derivative_path(gcs_path, name), data,
+             CONTENT_TYPES[DERIVATIVES[name][1]], DERIVATIVE_CACHE_CONTROL)
+            for name, data in derivatives.items()
+            if name in DERIVATIVES
+        ]
+
+    def derivative_urls(self, gcs_path, derivatives=DERIVATIVES):
+        """{'thumb_url': ..., ...} of the named derivatives of a photo"""
+        return {
+            f'{name}_url': self.public_url(self.derivative_path(gcs_path, name))
+            for name in derivatives
+            if name in DERIVATIVES
+        }
+
+    def _upload_blob(self, upload):
+        gcs_path, data, content_type, cache_control = upload
+        blob = self.bucket.blob(gcs_path)
+        if cache_control:
+            blob.cache_control = cache_control
+        blob.upload_from_string(data, content_type=content_type)
+
+    def _upload_all(self, uploads):
+        """Upload small objects concurrently (one HTTP request each)"""
+        if not uploads:
+            return
+        if len(uploads) == 1:
+            self._upload_blob(uploads[0])
+            return
+        with ThreadPoolExecutor(max_workers=len(uploads)) as executor:
+            list(executor.map(self._upload_blob, uploads))
+
+    def create_upload_session(self, commande_id, paire_id, size, origin=None):
+        """Start a resumable upload session the browser can PUT the image to directly.
+
+        The session URI is a signed capability limited to one object and to
+        exactly `size` bytes, so the image never goes through our workers.
+        """
+        if not self.is_configured():
+            raise Exception("Google Cloud Storage not configured")
+
+        gcs_path = self.generate_filename(commande_id, paire_id)
+        blob = self.bucket.blob(gcs_path)
+        upload_url = blob.create_resumable_upload_session(
+            content_type='image/jpeg',
+            size=size,
+            origin=origin
+        )
+
+        return {
+            'gcs_path': gcs_path,
+            'upload_url': upload_url
+        }
+
+    def checksum_path(self, md5_hash):
+        """Content-addressed path of a direct upload, from the MD5 computed by GCS.
+
+        A separate namespace from content_path(): the same photo sent through
+        both upload routes is stored twice, which the orphan GC tolerates.
+        """
+        digest = base64.b64decode(md5_hash).hex()
+        return f"photos/md5/{digest[:2]}/{digest}.jpg"
+
+    def finalize_upload(self, gcs_path, max_size):
+        """Move a directly uploaded image to its content-addressed path.
+
+        The bytes never go through the worker: duplicates are found with the
+        MD5 GCS computed on upload, and a new photo is copied within the
+        bucket (server-side rewrite) before the temporary object is deleted.
+        Returns the same dict as upload_image(), plus the object 'size'.
+        """
+        if not self.is_configured():
+            raise Exception("Google Cloud Storage not configured")
+
+        blob = self.bucket.get_blob(gcs_path)
+        if blob is None:
+            raise ValueError("Image introuvable dans le bucket")
+
+        if blob.content_type != 'image/jpeg' or blob.size > max_size:
+            blob.delete()
+            raise ValueError("Image invalide")
+
+        # Objet composite (sans MD5) : la photo reste à son chemin d'upload
+        if not blob.md5_hash:
+            return {**self._upload_result(gcs_path, [], False), 'size': blob.size}
+
+        target = self.checksum_path(blob.md5_hash)
+        existing = self.bucket.get_blob(target)
+        if existing is not None:
+            self._touch(existing)
+            result = self._upload_result(target, self.derivative_names(existing), True)
+        else:
+            from google.api_core.exceptions import PreconditionFailed
+            try:
+                # Only create: a concurrent finalize of the same photo may have won
+                self.bucket.copy_blob(blob, self.bucket, target, if_generation_match=0)
+                result = self._upload_result(target, [], False)
+            except PreconditionFailed:
+                result = self._upload_result(target, [], True)
+
+        self.discard_upload(gcs_path)
+        return {**result, 'size': blob.size}
+
+    def discard_upload(self, gcs_path):
+        """Delete a temporary direct upload (no derivatives)"""
+        from google.api_core.exceptions import NotFound
+        try:
+            self.bucket.blob(gcs_path).delete()
+        except NotFound:
+            pass
+
+    def download_image(self, gcs_path, max_size=None):
+        """Download an image from Google Cloud Storage.
+
+        With max_size, at most max_size + 1 bytes are requested (ranged read)
+        and None is returned if the object is larger than max_size.
+        """
+        if not self.is_configured():
+            raise Exception("Google Cloud Storage not configured")
+
+        blob = self.bucket.blob(gcs_path)
+        if max_size is None:
+            return blob.download_as_bytes()
+
+        data = blob.download_as_bytes(start=0, end=max_size)
+        if len(data) > max_size:
+            return None
+        return data
+
     def get_signed_url(self, gcs_path, expiration_minutes=60):
         """Generate a signed URL for private access to the image"""
         if not self.is_configured():
@@ -118,7 +400,7 @@ class GCSManager:
 
             return url
         except Exception as e:
-            print(f"Error generating signed URL: {e}")
+            logger.error(f"Error generating signed URL: {e}")
             return None
 
     def delete_image(self, gcs_path):
@@ -126,31 +408,56 @@ class GCSManager:
         if not self.is_configured():
             return False
 
+        from google.api_core.exceptions import NotFound
         try:
             blob = self.bucket.blob(gcs_path)
             blob.delete()
+
+            # Derivatives (absent for photos uploaded before they existed)
+            for name in DERIVATIVES:
+                try:
+                    self.bucket.blob(self.derivative_path(gcs_path, name)).delete()
+                except NotFound:
+                    pass
             return True
         except Exception as e:
-            print(f"Error deleting image from GCS: {e}")
+            logger.error(f"Error deleting image from GCS: {e}")
             return False
 
     def delete_commande_images(self, commande_id):
-        """Delete all images for a specific commande"""
+        """Delete the photos of a commande that no other commande uses.
+
+        Content-addressed photos can be shared between paires, so the
+        Paire.photo_gcs_path column acts as the reference count: a photo
+        is deleted only when no paire of another commande points to it.
+        """
         if not self.is_configured():
             return False
 
+        # Imported here so the storage layer stays usable without the app models
+        from database import db
+        from models.paires import Paire
+
         try:
-            # List all blobs with the commande prefix
-            prefix = f"photos/{datetime.now().year}/{datetime.now().month:02d}/{commande_id}/"
-            blobs = self.client.list_blobs(self.bucket, prefix=prefix)
+            paths = {
+                path for (path,) in db.session.query(Paire.photo_gcs_path)
+                .filter(Paire.commande_id == commande_id, Paire.photo_gcs_path.isnot(None))
+            }
+            if not paths:
+                return True
+
+            shared = {
+                path for (path,) in db.session.query(Paire.photo_gcs_path)
+                .filter(Paire.photo_gcs_path.in_(paths), Paire.commande_id != commande_id)
+                .distinct()
+            }
 
-            # Delete all blobs
-            for blob in blobs:
-                blob.delete()
+            for path in paths - shared:
+                self.delete_image(path)
 
             return True
         except Exception as e:
-            print(f"Error deleting commande images: {e}")
+            logger.error(f"Error deleting commande images: {e}")
             return False
 
 # Global instance
@@ -0,0 +1,143 @@
+import json
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from database import db
+from models.commandes import Commande, StatutCommande
+from models.outbox import TypeEmail
+from models.stripe_events import StripeEvent, StatutEvenement
+from services.outbox import email_outbox
+from services.leased_queue import LeasedQueueWorker
+
+class StripeEventProcessor(LeasedQueueWorker):
+    """Background processing of the Stripe webhook events.
+
+    The webhook only verifies the signature and stores the raw event
+    (record()), so Stripe gets its 200 within a few milliseconds. A daemon
+    thread then applies the handlers, each event in its own transaction
+    with the emails it queues. Events are leased and retried with backoff
+    like the email outbox (LeasedQueueWorker), and can be replayed from the
+    stored payloads (scripts/replay_stripe_events.py).
+    """
+
+    model = StripeEvent
+    pending = StatutEvenement.PENDING
+    failed = StatutEvenement.FAILED
+    thread_name = 'stripe-events'
+
+    def __init__(self):
+        super().__init__('STRIPE_EVENTS')
+        self.handlers = {
+            'checkout.session.completed': self._checkout_completed,
+            'payment_intent.payment_failed': self._payment_failed
+        }
+
+    def record(self, stripe_event, payload):
+        """Store a verified event; returns False if it was already received.
+
+        Commits the current session: the processor is woken once the event
+        is visible to it.
+        """
+        obj = stripe_event['data']['object']
+        db.session.add(StripeEvent(
+            event_id=stripe_event['id'],
+            type=stripe_event['type'],
+            commande_id=_commande_id((obj.get('metadata') or {}).get('commande_id')),
+            payload=json.loads(payload),
+            statut=StatutEvenement.PENDING,
+            attempts=0,
+            next_attempt_at=datetime.utcnow()
+        ))
+        self.wake_after_commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return False
+        return True
+
+    def replay(self, items):
+        """Mark stored events as due again; the caller commits, then runs
+        process_due() or lets the background threads pick them up.
+
+        A paid checkout never updates an order twice; a payment failure
+        sends its email again while the order is still pending.
+        """
+        now = datetime.utcnow()
+        for item in items:
+            item.statut = StatutEvenement.PENDING
+            item.attempts = 0
+            item.next_attempt_at = now
+            item.last_error = None
+        return len(items)
+
+    def process(self, item_id, job):
+        item = db.session.get(StripeEvent, item_id)
+        handler = self.handlers.get(item.type)
+        paid = handler(item) if handler else False
+        item.statut = StatutEvenement.PROCESSED
+        item.processed_at = datetime.utcnow()
+        item.last_error = None
+        db.session.commit()
+        if paid:
+            from services.metrics import ORDERS_PAID
+            ORDERS_PAID.inc()
+            self.logger.info(f'Order #{item.commande_id} paid, confirmation emails queued')
+
+    def describe(self, item):
+        return f'Événement Stripe {item.event_id} ({item.type})'
+
+    def _checkout_completed(self, item):
+        """Paiement réussi : commande pending -> paid et emails de confirmation"""
+        session = item.payload['data']['object']
+        if session.get('payment_status') != 'paid' or not item.commande_id:
+            return False
+
+        # Un seul UPDATE conditionnel : seul le premier événement payé pour la
+        # commande la modifie et envoie les emails (rejeu sans effet)
+        updated = Commande.query.filter(
+            Commande.id == item.commande_id,
+            Commande.statut == StatutCommande.PENDING
+        ).update({
+            'statut': StatutCommande.PAID,
+            'stripe_session_id': session.get('id'),
+            'stripe_payment_intent_id': session.get('payment_intent'),
+            'updated_at': datetime.utcnow()
+        }, synchronize_session=False)
+        if updated != 1:
+            # Rejeu du paiement déjà enregistré, sinon second paiement à rembourser
+            commande = db.session.query(Commande.statut, Commande.stripe_session_id).filter_by(id=item.commande_id).first()
+            if commande is None or commande.stripe_session_id != session.get('id'):
+                self.logger.warning(
+                    f"Paiement {session.get('payment_intent')} (session {session.get('id')}) reçu pour la commande "
+                    f"#{item.commande_id} {'introuvable' if commande is None else commande.statut.name} : à rembourser"
+                )
+            return False
+
+        # Emails de confirmation (client + admin), dans la même transaction
+        email_outbox.enqueue(TypeEmail.ORDER_CONFIRMATION, item.commande_id)
+        email_outbox.enqueue(TypeEmail.ADMIN_NOTIFICATION, item.commande_id)
+        return True
+
+    def _payment_failed(self, item):
+        """Échec de paiement : email au client si la commande attend toujours son paiement"""
+        if not item.commande_id:
+            return False
+        statut = db.session.query(Commande.statut).filter_by(id=item.commande_id).scalar()
+        if statut != StatutCommande.PENDING:
+            return False
+
+        payment_intent = item.payload['data']['object']
+        error_message = (payment_intent.get('last_payment_error') or {}).get('message')
+        email_outbox.enqueue(TypeEmail.PAYMENT_FAILED, item.commande_id,
+                             {'error_message': error_message})
+        return False
+
+def _commande_id(value):
+    """Identifiant de commande des métadonnées Stripe, None s'il est absent ou invalide"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+# Global instance
+stripe_event_processor = StripeEventProcessor()
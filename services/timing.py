@@ -0,0 +1,130 @@
+import os
+import json
+import time
+import logging
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from services.metrics import metrics_exporter, REQUEST_LATENCY, EXTERNAL_LATENCY
+
+logger = logging.getLogger(__name__)
+
+class RequestTiming:
+    """Per-request timing: wall time, SQL time and count, outbound calls.
+
+    SQL statements are timed by engine-wide cursor events; outbound calls
+    (Stripe, GCS, SMTP, image pool) by wrapping them in track(). Each
+    request gets one JSON log line, logged as a warning when it is slow or
+    repeats the same SELECT often enough to look like an N+1 pattern. Outbound calls also feed the Prometheus
+    histograms; outside a request (outbox thread, scripts) nothing else is
+    recorded. With SERVER_TIMING_HEADER, internal requests (private network
+    or METRICS_TOKEN, like /metrics) also get a Server-Timing header.
+    """
+
+    # Probes polled every few seconds: no log line, no latency histogram
+    quiet_endpoints = {'static', 'main.healthz', 'main.metrics'}
+
+    def __init__(self):
+        self.slow_ms = float(os.environ.get('REQUEST_SLOW_MS', 1000))
+        self.n_plus_one_threshold = int(os.environ.get('REQUEST_N_PLUS_ONE_THRESHOLD', 5))
+        self.server_timing = os.environ.get('SERVER_TIMING_HEADER', 'false').lower() == 'true'
+
+    def init_app(self, app):
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def current(self):
+        """Timing record of the current request, None outside a request"""
+        if not has_request_context():
+            return None
+        return g.get('request_timing')
+
+    @contextmanager
+    def track(self, name):
+        """Time an outbound call under `name` (stripe, gcs, smtp...)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            EXTERNAL_LATENCY.labels(name).observe(elapsed)
+            timing = self.current()
+            if timing is not None:
+                timing['external'][name] += elapsed * 1000
+                timing['calls'][name] += 1
+
+    def record_query(self, statement, elapsed_ms):
+        timing = self.current()
+        if timing is not None:
+            timing['db_ms'] += elapsed_ms
+            timing['statements'][statement] += 1
+
+    def _start(self):
+        g.request_timing = {
+            'start': time.perf_counter(),
+            'db_ms': 0.0,
+            'statements': Counter(),
+            'external': defaultdict(float),
+            'calls': Counter()
+        }
+
+    def _finish(self, response):
+        timing = g.pop('request_timing', None)
+        if timing is None or request.endpoint in self.quiet_endpoints:
+            return response
+
+        total_ms = (time.perf_counter() - timing['start']) * 1000
+        REQUEST_LATENCY.labels(request.method, request.endpoint or 'unknown',
+                               response.status_code).observe(total_ms / 1000)
+        queries = sum(timing['statements'].values())
+        repeated = [
+            {'statement': ' '.join(statement.split())[:200], 'count': count}
+            for statement, count in timing['statements'].most_common()
+            if count >= self.n_plus_one_threshold and statement.lstrip().upper().startswith('SELECT')
+        ]
+
+        # Temps SQL et appels sortants : pas pour les visiteurs
+        if self.server_timing and metrics_exporter.authorized(request):
+            metrics = [f'db;dur={timing["db_ms"]:.1f};desc="{queries} SQL"']
+            metrics += [f'{name};dur={ms:.1f}' for name, ms in timing['external'].items()]
+            metrics.append(f'total;dur={total_ms:.1f}')
+            response.headers.add('Server-Timing', ', '.join(metrics))
+
+        line = {
+            'event': 'request',
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round(total_ms, 1),
+            'db_ms': round(timing['db_ms'], 1),
+            'db_queries': queries,
+            'external_ms': {name: round(ms, 1) for name, ms in timing['external'].items()},
+            'external_calls': dict(timing['calls'])
+        }
+        flags = []
+        if total_ms >= self.slow_ms:
+            flags.append('slow')
+        if repeated:
+            flags.append('n_plus_one')
+            line['repeated_statements'] = repeated
+        if flags:
+            line['flags'] = flags
+            logger.warning(json.dumps(line, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(line, ensure_ascii=False))
+        return response
+
+# Global instance
+request_timing = RequestTiming()
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_start'] = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info.pop('query_start')) * 1000
+    request_timing.record_query(statement, elapsed_ms)
@@ -6,7 +6,8 @@ class CameraManager {
         this.canvas = null;
         this.stream = null;
         this.isInitialized = false;
-        this.photoDataUrl = null;
+        this.photoBlob = null;
+        this.previewUrl = null;
 
         this.initializeElements();
         this.bindEvents();
@@ -122,11 +123,14 @@ class CameraManager {
             const ctx = this.canvas.getContext('2d');
             ctx.drawImage(this.video, 0, 0);
 
-            // Get image data as base64
-            this.photoDataUrl = this.canvas.toDataURL('image/jpeg', 0.8);
-
-            // Show preview
-            this.showPhotoPreview();
+            // Get image data as a binary JPEG blob (no base64 copy)
+            this.canvas.toBlob((blob) => {
+                if (!blob) {
+                    showToast('Erreur lors de la prise de photo', 'error');
+                    return;
+                }
+                this.setPhoto(blob);
+            }, 'image/jpeg', 0.8);
 
         } catch (error) {
             console.error('Error taking photo:', error);
@@ -134,9 +138,24 @@ class CameraManager {
         }
     }
 
+    setPhoto(blob) {
+        this.clearPhoto();
+        this.photoBlob = blob;
+        this.previewUrl = URL.createObjectURL(blob);
+        this.showPhotoPreview();
+    }
+
+    clearPhoto() {
+        if (this.previewUrl) {
+            URL.revokeObjectURL(this.previewUrl);
+        }
+        this.photoBlob = null;
+        this.previewUrl = null;
+    }
+
     showPhotoPreview() {
-        if (this.previewImg && this.photoDataUrl) {
-            this.previewImg.src = this.photoDataUrl;
+        if (this.previewImg && this.previewUrl) {
+            this.previewImg.src = this.previewUrl;
         }
 
         if (this.video) this.video.style.display = 'none';
@@ -147,7 +166,7 @@ class CameraManager {
     }
 
     retryPhoto() {
-        this.photoDataUrl = null;
+        this.clearPhoto();
         this.showCameraControls();
         if (this.confirmPhotoBtn) this.confirmPhotoBtn.disabled = true;
     }
@@ -169,18 +188,13 @@ class CameraManager {
             return;
         }
 
-        const reader = new FileReader();
-        reader.onload = (e) => {
-            this.photoDataUrl = e.target.result;
-            this.showPhotoPreview();
+        // The File is already a Blob: keep it as is, no FileReader/base64
+        this.setPhoto(file);
 
-            // Hide camera controls since we're using file input
-            if (this.video) this.video.style.display = 'none';
-            if (this.startCameraBtn) this.startCameraBtn.style.display = 'none';
-            if (this.takePhotoBtn) this.takePhotoBtn.style.display = 'none';
-        };
-
-        reader.readAsDataURL(file);
+        // Hide camera controls since we're using file input
+        if (this.video) this.video.style.display = 'none';
+        if (this.startCameraBtn) this.startCameraBtn.style.display = 'none';
+        if (this.takePhotoBtn) this.takePhotoBtn.style.display = 'none';
     }
 
     stopCamera() {
@@ -195,7 +209,7 @@ class CameraManager {
         }
 
         this.isInitialized = false;
-        this.photoDataUrl = null;
+        this.clearPhoto();
 
         // Reset UI
         if (this.startCameraBtn) this.startCameraBtn.style.display = 'inline-block';
@@ -206,12 +220,12 @@ class CameraManager {
         if (this.fileInput) this.fileInput.value = '';
     }
 
-    getPhotoDataUrl() {
-        return this.photoDataUrl;
+    getPhotoBlob() {
+        return this.photoBlob;
     }
 
     hasPhoto() {
-        return !!this.photoDataUrl;
+        return !!this.photoBlob;
     }
 
     reset() {
@@ -242,14 +256,17 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 });
 
-// Utility function to compress image
-function compressImage(dataUrl, quality = 0.8, maxWidth = 1024, maxHeight = 1024) {
-    return new Promise((resolve) => {
+// Utility function to compress image (Blob in, JPEG Blob out)
+function compressImage(blob, quality = 0.8, maxWidth = 1024, maxHeight = 1024) {
+    return new Promise((resolve, reject) => {
         const canvas = document.createElement('canvas');
         const ctx = canvas.getContext('2d');
         const img = new Image();
+        const url = URL.createObjectURL(blob);
 
         img.onload = function() {
+            URL.revokeObjectURL(url);
+
             // Calculate new dimensions
             let { width, height } = img;
 
@@ -264,13 +281,50 @@ function compressImage(dataUrl, quality = 0.8, maxWidth = 1024, maxHeight = 1024
 
             // Draw and compress
             ctx.drawImage(img, 0, 0, width, height);
-            const compressedDataUrl = canvas.toDataURL('image/jpeg', quality);
-            resolve(compressedDataUrl);
+            canvas.toBlob((compressed) => {
+                compressed ? resolve(compressed) : reject(new Error('Image compression failed'));
+            }, 'image/jpeg', quality);
         };
 
-        img.src = dataUrl;
+        img.onerror = function() {
+            URL.revokeObjectURL(url);
+            reject(new Error('Invalid image'));
+        };
+
+        img.src = url;
+    });
+}
+
+// Upload a photo straight to Google Cloud Storage through a signed upload URL,
+// so the image bytes never go through our server. Falls back to the binary upload.
+async function uploadPhotoDirect(blob) {
+    let session;
+    try {
+        session = await api.post('/upload-url', {
+            size: blob.size,
+            content_type: 'image/jpeg'
+        });
+    } catch (error) {
+        console.warn('Direct upload unavailable, falling back to server upload:', error);
+        return api.uploadPhoto(blob);
+    }
+
+    const uploadResponse = await fetch(session.upload_url, {
+        method: 'PUT',
+        headers: { 'Content-Type': 'image/jpeg' },
+        body: blob
+    });
+
+    if (!uploadResponse.ok) {
+        throw new Error(`Upload failed with status ${uploadResponse.status}`);
+    }
+
+    return api.post('/upload-photo/finalize', {
+        temp_id: session.temp_id,
+        gcs_path: session.gcs_path
     });
 }
 
 // Export for use in other modules
-window.compressImage = compressImage;
\ No newline at end of file
+window.compressImage = compressImage;
+window.uploadPhotoDirect = uploadPhotoDirect;
\ No newline at end of file
@@ -6,6 +6,8 @@ class OrderManager {
         this.prestations = {};
         this.currentStep = 1;
         this.currentPaireIndex = -1;
+        // Order created by a checkout attempt that failed on Stripe's side
+        this.pendingCommande = null;
 
         this.initializeElements();
         this.bindEvents();
@@ -99,6 +101,10 @@ class OrderManager {
             type_chaussure: '',
             photo_url: '',
             photo_filename: '',
+            gcs_path: '',
+            thumb_url: '',
+            medium_url: '',
+            webp_url: '',
             prestations: [],
             description: ''
         };
@@ -141,7 +147,7 @@ class OrderManager {
                     <div class="collapsed-view">
                         <div class="row align-items-center">
                             <div class="col-3">
-                                <img src="${paire.photo_url}" class="img-fluid rounded" alt="Paire ${index + 1}" style="max-height: 60px; object-fit: cover;">
+                                ${this.photoTag(paire, '60px', `class="img-fluid rounded" alt="Paire ${index + 1}" style="max-height: 60px; object-fit: cover;"`)}
                             </div>
                             <div class="col-9">
                                 <div class="d-flex justify-content-between align-items-center">
@@ -192,7 +198,7 @@ class OrderManager {
                                 <label class="form-label">Photo de la paire *</label>
                                 <div class="photo-upload-area ${paire.photo_url ? 'has-photo' : ''}" onclick="orderManager.ouvrirCamera('${paire.id}')">
                                     ${paire.photo_url ?
-                                        `<img src="${paire.photo_url}" class="paire-photo" alt="Photo paire ${index + 1}">` :
+                                        this.photoTag(paire, '100px', `class="paire-photo" alt="Photo paire ${index + 1}"`) :
                                         `<div>
                                             <i class="bi bi-camera fs-1 text-muted mb-2"></i>
                                             <p class="text-muted mb-0">Prendre une photo</p>
@@ -369,16 +375,21 @@ class OrderManager {
             showLoading();
 
             // Compress and upload photo
-            const photoDataUrl = cameraManager.getPhotoDataUrl();
-            const compressedPhoto = await compressImage(photoDataUrl, 0.8, 1024, 1024);
+            const photoBlob = cameraManager.getPhotoBlob();
+            const compressedPhoto = await compressImage(photoBlob, 0.8, 1024, 1024);
 
-            const response = await api.uploadPhoto(compressedPhoto);
+            const response = await uploadPhotoDirect(compressedPhoto);
 
             // Update paire with photo info
             const paire = this.paires[this.currentPaireIndex];
             if (paire) {
                 paire.photo_url = response.photo_url;
                 paire.photo_filename = response.filename;
+                paire.gcs_path = response.gcs_path;
+                paire.thumb_url = response.thumb_url || '';
+                paire.medium_url = response.medium_url || '';
+                // Absentes tant qu'elles sont en cours de génération : photo complète
+                paire.webp_url = response.webp_url || '';
 
                 // Update UI
                 this.renderAllPaires();
@@ -537,9 +548,29 @@ class OrderManager {
         if (!hasPrestation) {
             paire.photo_url = '';
             paire.photo_filename = '';
+            paire.gcs_path = '';
+            paire.thumb_url = '';
+            paire.medium_url = '';
+            paire.webp_url = '';
         }
     }
 
+    // Responsive pair photo: the browser picks the thumbnail, medium or full
+    // JPEG from the displayed size, and the WebP version for larger views
+    photoTag(paire, sizes, attributes, withWebp = false) {
+        const srcset = [
+            paire.thumb_url && `${paire.thumb_url} 120w`,
+            paire.medium_url && `${paire.medium_url} 480w`,
+            `${paire.photo_url} 1024w`
+        ].filter(Boolean).join(', ');
+        const img = `<img src="${paire.thumb_url || paire.photo_url}" srcset="${srcset}" sizes="${sizes}" ${attributes}>`;
+
+        if (!withWebp || !paire.webp_url) {
+            return img;
+        }
+        return `<picture><source type="image/webp" srcset="${paire.webp_url} 480w" sizes="${sizes}">${img}</picture>`;
+    }
+
     renderRecapitulatif() {
         let total = 0;
         let recapHtml = '';
@@ -567,7 +598,7 @@ class OrderManager {
                     <div class="card-body">
                         <div class="row">
                             <div class="col-md-3">
-                                <img src="${paire.photo_url}" class="img-fluid rounded" alt="Paire ${index + 1}">
+                                ${this.photoTag(paire, '(min-width: 768px) 25vw, 100vw', `class="img-fluid rounded" alt="Paire ${index + 1}"`, true)}
                             </div>
                             <div class="col-md-9">
                                 <h6>Paire ${index + 1} - ${paire.type_chaussure === 'HOMME' ? 'Homme' : 'Femme'}</h6>
@@ -741,17 +772,41 @@ class OrderManager {
                     type_chaussure: paire.type_chaussure,
                     photo_url: paire.photo_url,
                     photo_filename: paire.photo_filename,
+                    gcs_path: paire.gcs_path,
+                    thumb_url: paire.thumb_url,
+                    medium_url: paire.medium_url,
+                    webp_url: paire.webp_url,
                     description: paire.description,
                     prestations: paire.prestations
                 }))
             };
 
-            // Create order
-            const orderResponse = await api.post('/commande', orderData);
-            const commande = orderResponse.commande;
-
-            // Create Stripe checkout session
-            const checkoutResponse = await api.post(`/commande/${commande.id}/checkout`, {});
+            // Create order and Stripe checkout session in a single request.
+            // If the order was created but Stripe failed, retry the payment of
+            // that same order instead of creating a new one (unless the form changed)
+            const orderKey = JSON.stringify(orderData);
+            let checkoutResponse;
+            if (this.pendingCommande && this.pendingCommande.key === orderKey) {
+                try {
+                    checkoutResponse = await api.post(`/commande/${this.pendingCommande.id}/checkout`, {});
+                } catch (error) {
+                    // Order gone or no longer payable: the next attempt starts over
+                    if (error.status === 400 || error.status === 404) {
+                        this.pendingCommande = null;
+                    }
+                    throw error;
+                }
+            } else {
+                try {
+                    checkoutResponse = await api.post('/commande/checkout', orderData);
+                } catch (error) {
+                    const commande = error.data && error.data.commande;
+                    if (commande) {
+                        this.pendingCommande = { id: commande.id, key: orderKey };
+                    }
+                    throw error;
+                }
+            }
 
             // Redirect to Stripe
             window.location.href = checkoutResponse.checkout_url;
@@ -61,7 +61,11 @@ document.addEventListener('DOMContentLoaded', function() {
                 const data = await response.json();
 
                 if (!response.ok) {
-                    throw new Error(data.error || `HTTP error! status: ${response.status}`);
+                    const error = new Error(data.error || `HTTP error! status: ${response.status}`);
+                    // Keep the response body (e.g. the order created before a Stripe failure)
+                    error.status = response.status;
+                    error.data = data;
+                    throw error;
                 }
 
                 return data;
@@ -82,8 +86,16 @@ document.addEventListener('DOMContentLoaded', function() {
             });
         },
 
-        async uploadPhoto(photoDataUrl) {
-            return this.post('/upload-photo', { photo: photoDataUrl });
+        async uploadPhoto(photo) {
+            // Blob/File: raw binary body, no base64 inflation
+            if (photo instanceof Blob) {
+                return this.call('/upload-photo', {
+                    method: 'POST',
+                    headers: { 'Content-Type': photo.type || 'image/jpeg' },
+                    body: photo,
+                });
+            }
+            return this.post('/upload-photo', { photo: photo });
         }
     };
 